@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Identity:
+    """``total`` = sum of ``terms`` - sum of ``negated``, over named values.
+
+    Statements print amounts rounded to the unit, so each term may be off
+    by one; the default tolerance allows that per term.
+    """
+    name: str
+    description: str
+    total: str
+    terms: Tuple[str, ...]
+    negated: Tuple[str, ...] = ()
+    tolerance: Optional[int] = None
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return (self.total,) + self.terms + self.negated
+
+    def check(self, values: Dict[str, Optional[int]]) -> Dict[str, Any]:
+        """Evaluate against ``values``; an identity with a missing value is 'skipped', not failed"""
+        result = {'identity': self.name, 'description': self.description, 'fields': list(self.fields)}
+        if any(values.get(name) is None for name in self.fields):
+            return {**result, 'status': 'skipped'}
+        expected = sum(values[name] for name in self.terms) - sum(values[name] for name in self.negated)
+        difference = values[self.total] - expected
+        tolerance = self.tolerance if self.tolerance is not None else len(self.terms) + len(self.negated)
+        return {
+            **result,
+            'status': 'pass' if abs(difference) <= tolerance else 'fail',
+            'expected': expected,
+            'actual': values[self.total],
+            'difference': difference
+        }
+
+
+# Identities over FIELD_REGISTRY keys
+FIELD_IDENTITIES = [
+    Identity('assets_split', '資産合計 = 流動資産合計 + 固定資産合計',
+             'total_assets', ('current_assets', 'fixed_assets')),
+    Identity('balance_sheet', '資産合計 = 負債合計 + 純資産合計',
+             'total_assets', ('total_liabilities', 'total_equity')),
+    Identity('ordinary_result', '経常収益 − 経常費用 = 経常損益',
+             'operating_loss', ('total_revenue',), ('ordinary_expenses',))
+]
+
+SEGMENT_TOTAL_ROW = '合計'
+
+
+def check_identities(identities: Sequence[Identity], values: Dict[str, Optional[int]]) -> List[Dict[str, Any]]:
+    return [identity.check(values) for identity in identities]
+
+
+def failing_fields(checks: Sequence[Dict[str, Any]]) -> List[str]:
+    """Every value taking part in a failed identity, in first-seen order"""
+    fields: Dict[str, None] = {}
+    for check in checks:
+        if check['status'] == 'fail':
+            fields.update(dict.fromkeys(check['fields']))
+    return list(fields)
+
+
+def identity_confidence(checks: Sequence[Dict[str, Any]]) -> str:
+    """'high' when every identity holds, 'low' when any fails, 'medium' when some could not be checked"""
+    statuses = {check['status'] for check in checks}
+    if 'fail' in statuses:
+        return 'low'
+    if 'skipped' in statuses or not checks:
+        return 'medium'
+    return 'high'
+
+
+def _score(checks: Sequence[Dict[str, Any]]) -> int:
+    return sum(1 for check in checks if check['status'] == 'pass')
+
+
+def reconcile(values: Dict[str, Optional[int]], candidates: Dict[str, Sequence[Optional[int]]],
+              identities: Sequence[Identity]) -> Dict[str, Optional[int]]:
+    """Pick one candidate per field so that as many identities as possible hold.
+
+    ``candidates`` lists the alternatives for the re-extracted fields, the
+    original value first; on a tie the choice changing fewer fields wins.
+    """
+    names = list(candidates)
+    best, best_score = dict(values), None
+    for choice in product(*(range(len(candidates[name])) for name in names)):
+        trial = dict(values)
+        trial.update({name: candidates[name][index] for name, index in zip(names, choice)})
+        score = (_score(check_identities(identities, trial)), -sum(1 for index in choice if index))
+        if best_score is None or score > best_score:
+            best, best_score = trial, score
+    return best
+
+
+def _amount(node: Any) -> Optional[int]:
+    # The statement prompts use 0 as the placeholder the model fills in, so a 0 is not trusted
+    if isinstance(node, bool) or not isinstance(node, int) or node == 0:
+        return None
+    return node
+
+
+def statement_values(statements: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[int]]:
+    """Named values the statement identities read, from statements keyed by extractor method"""
+    values: Dict[str, Optional[int]] = {}
+    segments = (statements.get('extract_segment_information') or {}).get('data') or {}
+    for table in ('operatingProfitLoss', 'segmentAssets'):
+        for row in segments.get(table) or []:
+            if isinstance(row, dict) and row.get('segment'):
+                values[f"extract_segment_information:{table}:{row['segment']}"] = _amount(row.get('amount'))
+    income = (statements.get('extract_income_statement') or {}).get('data') or {}
+    values['extract_income_statement:ordinaryLoss'] = _amount(income.get('ordinaryLoss'))
+    assets = (statements.get('extract_balance_sheet_assets') or {}).get('data') or {}
+    values['extract_balance_sheet_assets:totalAssets'] = _amount(assets.get('totalAssets'))
+    return values
+
+
+def statement_identities(values: Dict[str, Optional[int]]) -> List[Identity]:
+    """Segment rows summing to the 合計 row, and the 合計 row agreeing with the income statement and balance sheet"""
+    identities = []
+    for table, label, counterpart in (
+        ('operatingProfitLoss', '業務損益', 'extract_income_statement:ordinaryLoss'),
+        ('segmentAssets', 'セグメント資産', 'extract_balance_sheet_assets:totalAssets')
+    ):
+        prefix = f'extract_segment_information:{table}:'
+        total = prefix + SEGMENT_TOTAL_ROW
+        if total not in values:
+            continue
+        rows = tuple(name for name in values if name.startswith(prefix) and name != total)
+        identities.append(Identity(f'segment_{table}', f'セグメント{label}の合計 = 各セグメントの{label}', total, rows))
+        identities.append(Identity(f'segment_{table}_total', f'セグメント{label}の合計 = {counterpart.split(":")[-1]}',
+                                   counterpart, (total,), tolerance=0))
+    return identities
+
+
+def check_statements(statements: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    values = statement_values(statements)
+    return check_identities(statement_identities(values), values)
+
+
+def failing_statements(checks: Sequence[Dict[str, Any]]) -> List[str]:
+    """Extractor methods whose statements take part in a failed identity"""
+    return list(dict.fromkeys(name.split(':')[0] for name in failing_fields(checks)))
+
+
+def verified_statements(checks: Sequence[Dict[str, Any]]) -> List[str]:
+    """Extractor methods whose statements take part in a passing identity and in no failing one"""
+    failing = set(failing_statements(checks))
+    passing = [name.split(':')[0] for check in checks if check['status'] == 'pass' for name in check['fields']]
+    return [name for name in dict.fromkeys(passing) if name not in failing]
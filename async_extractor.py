@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+from gemini_client import ModelTransport, DocumentSession
+from extraction_cache import ExtractionCache
+from cassette_transport import transport_from_env
+from field_registry import FIELD_REGISTRY, VOTING_FIELDS, apply_sign_rule
+from self_consistency import vote_async
+from data_extractor import ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS, build_financial_data, extraction_confidence
+from accounting_identities import FIELD_IDENTITIES, check_identities, failing_fields, reconcile
+
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class AsyncFinancialDataExtractor:
+    """Awaitable counterpart of ComprehensiveFinancialExtractor for asyncio services.
+
+    Every FIELD_REGISTRY field has an awaitable method named like the
+    blocking extractor's (``await extractor.extract_total_assets(pdf)``).
+    Model calls use the SDK's async generate call on the event loop, and at
+    most ``semaphore`` of them are in flight at once; hand the same
+    semaphore to several extractors to bound a whole service. Prompts, the
+    cache, the text layer and number parsing are the blocking extractor's;
+    reading and hashing the PDF, cache reads and writes, uploads and the
+    text-layer parse run on worker threads so they never stall the loop.
+    Cancelling an awaiting task cancels its in-flight calls. With
+    ``voting`` the VOTING_FIELDS are decided by self-consistency voting, each
+    sample holding the semaphore like any other call.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, transport: Optional[ModelTransport] = None,
+                 cache: Optional[ExtractionCache] = None, use_text_layer: bool = False,
+                 semaphore: Optional[asyncio.Semaphore] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 voting: bool = False):
+        self.extractor = ComprehensiveFinancialExtractor(api_key, transport, cache, use_text_layer, voting)
+        self.semaphore = semaphore or asyncio.Semaphore(max_concurrency)
+
+    @property
+    def on_field(self) -> Optional[Callable[[str, Dict[str, Any], str, float], None]]:
+        return self.extractor.on_field
+
+    @on_field.setter
+    def on_field(self, listener: Optional[Callable[[str, Dict[str, Any], str, float], None]]) -> None:
+        self.extractor.on_field = listener
+
+    async def open_document(self, pdf_path: Union[str, DocumentSession]) -> DocumentSession:
+        """The shared session for ``pdf_path``; the PDF is read and hashed on a worker thread"""
+        if isinstance(pdf_path, DocumentSession):
+            return pdf_path
+        return await asyncio.to_thread(self.extractor.open_document, pdf_path)
+
+    async def close_document(self, pdf_path: Union[str, DocumentSession]) -> None:
+        await asyncio.to_thread(self.extractor.close_document, pdf_path)
+
+    async def extract_field(self, pdf_path: Union[str, DocumentSession], key: str,
+                            refresh: bool = False) -> Dict[str, Any]:
+        """Extract one FIELD_REGISTRY field with its own prompt; ``refresh`` skips the cache read"""
+        session = await self.open_document(pdf_path)
+        prompt = FIELD_REGISTRY[key].prompt
+        policy = VOTING_FIELDS.get(key) if self.extractor.voting else None
+        cache_prompt = f'{prompt}\n[vote {policy.agree}/{policy.samples}]' if policy else prompt
+        cache = self.extractor.cache
+        model_name = self.extractor.transport.model_name
+        result = None
+        if cache is not None and not refresh:
+            result = await asyncio.to_thread(cache.get, session.sha256, cache_prompt, model_name)
+
+        async def draw(index: int = 0) -> Dict[str, Any]:
+            try:
+                async with self.semaphore:
+                    response = await session.generate_async(
+                        prompt, generation_config={'temperature': policy.temperature} if policy else None, field=key,
+                        sample=index if policy else None)
+            except Exception as error:
+                return {
+                    'raw_string': None,
+                    'numeric_value': None,
+                    'success': False,
+                    'error': str(error)
+                }
+            extracted_value = response.text.strip()
+            numeric_value = self.extractor._parse_japanese_number(extracted_value)
+            return {
+                'raw_string': extracted_value,
+                'numeric_value': numeric_value,
+                'success': numeric_value is not None
+            }
+
+        if result is None:
+            if policy:
+                answer, votes = await vote_async(draw, lambda answer: answer['numeric_value'], policy)
+                result = dict(answer, votes=votes)
+                cacheable = result['success'] and votes['agreed']
+            else:
+                result = await draw()
+                cacheable = result['success']
+            if cache is not None and cacheable:
+                await asyncio.to_thread(cache.put, session.sha256, cache_prompt, model_name, result)
+        if result['success']:
+            result = dict(result, numeric_value=apply_sign_rule(key, result['numeric_value']))
+        return result
+
+    async def extract_many(self, pdf_path: Union[str, DocumentSession], names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Extract ``names`` concurrently and return their results in request order.
+
+        Fields the text layer resolves skip the model; the text layer is
+        parsed on a worker thread so the event loop keeps serving other
+        documents meanwhile.
+        """
+        session = await self.open_document(pdf_path)
+        resolved = await asyncio.to_thread(self.extractor.resolve_from_text_layer, session, names)
+
+        async def run(name: str) -> Dict[str, Any]:
+            started = time.time()
+            result = await self.extract_field(session, name)
+            self.extractor.report_field(session, name, result, 'model', time.time() - started)
+            return result
+
+        pending = [name for name in names if name not in resolved]
+        resolved.update(zip(pending, await asyncio.gather(*(run(name) for name in pending))))
+        return {name: resolved[name] for name in names}
+
+    async def check_identities(self, pdf_path: Union[str, DocumentSession],
+                               results: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+        """Awaitable ComprehensiveFinancialExtractor.check_identities; suspect fields are asked again concurrently"""
+        session = await self.open_document(pdf_path)
+        values = {name: result.get('numeric_value') for name, result in results.items()}
+        checks = check_identities(FIELD_IDENTITIES, values)
+        suspects = [name for name in failing_fields(checks) if name in results]
+        if not suspects:
+            return results, checks
+
+        print(f"🧮 {sum(1 for check in checks if check['status'] == 'fail')} accounting identity check(s) failed, "
+              f"re-extracting {suspects}")
+        started = time.time()
+        retried = dict(zip(suspects, await asyncio.gather(
+            *(self.extract_field(session, name, refresh=True) for name in suspects))))
+        latency = time.time() - started
+
+        candidates = {
+            name: [values[name]] + ([retried[name]['numeric_value']]
+                                    if retried[name]['success'] and retried[name]['numeric_value'] != values[name] else [])
+            for name in suspects
+        }
+        chosen = reconcile(values, candidates, FIELD_IDENTITIES)
+        results = dict(results)
+        for name in suspects:
+            if chosen[name] != values[name]:
+                results[name] = retried[name]
+                self.extractor.report_field(session, name, retried[name], 'identity_check', latency)
+        return results, check_identities(FIELD_IDENTITIES, chosen)
+
+    async def extract_segment_profit_loss(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract segment profit/loss from financial statements"""
+        return await self.extract_field(pdf_path, 'segment_profit_loss')
+
+    async def extract_total_liabilities(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract total liabilities from balance sheet"""
+        return await self.extract_field(pdf_path, 'total_liabilities')
+
+    async def extract_current_liabilities(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract current liabilities from balance sheet"""
+        return await self.extract_field(pdf_path, 'current_liabilities')
+
+    async def extract_ordinary_expenses(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract ordinary expenses from income statement"""
+        return await self.extract_field(pdf_path, 'ordinary_expenses')
+
+    async def extract_total_assets(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract total assets from balance sheet"""
+        return await self.extract_field(pdf_path, 'total_assets')
+
+    async def extract_current_assets(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract current assets from balance sheet"""
+        return await self.extract_field(pdf_path, 'current_assets')
+
+    async def extract_fixed_assets(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract fixed assets from balance sheet"""
+        return await self.extract_field(pdf_path, 'fixed_assets')
+
+    async def extract_total_revenue(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract total revenue from income statement"""
+        return await self.extract_field(pdf_path, 'total_revenue')
+
+    async def extract_total_equity(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract total equity from balance sheet"""
+        return await self.extract_field(pdf_path, 'total_equity')
+
+    async def extract_hospital_revenue(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract hospital revenue from income statement"""
+        return await self.extract_field(pdf_path, 'hospital_revenue')
+
+    async def extract_operating_grant_revenue(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract operating grant revenue from income statement"""
+        return await self.extract_field(pdf_path, 'operating_grant_revenue')
+
+    async def extract_tuition_revenue(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract tuition revenue from income statement"""
+        return await self.extract_field(pdf_path, 'tuition_revenue')
+
+    async def extract_research_revenue(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract research revenue from income statement"""
+        return await self.extract_field(pdf_path, 'research_revenue')
+
+    async def extract_personnel_costs(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract personnel costs from income statement"""
+        return await self.extract_field(pdf_path, 'personnel_costs')
+
+    async def extract_medical_costs(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract medical costs from income statement"""
+        return await self.extract_field(pdf_path, 'medical_costs')
+
+    async def extract_education_costs(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract education costs from income statement"""
+        return await self.extract_field(pdf_path, 'education_costs')
+
+    async def extract_research_costs(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract research costs from income statement"""
+        return await self.extract_field(pdf_path, 'research_costs')
+
+    async def extract_operating_loss(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract operating loss from income statement"""
+        return await self.extract_field(pdf_path, 'operating_loss')
+
+    async def extract_net_loss(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract net loss from income statement"""
+        return await self.extract_field(pdf_path, 'net_loss')
+
+    async def extract_operating_cash_flow(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract operating cash flow from cash flow statement"""
+        return await self.extract_field(pdf_path, 'operating_cf')
+
+    async def extract_investing_cash_flow(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract investing cash flow from cash flow statement"""
+        return await self.extract_field(pdf_path, 'investing_cf')
+
+    async def extract_financing_cash_flow(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract financing cash flow from cash flow statement"""
+        return await self.extract_field(pdf_path, 'financing_cf')
+
+    async def extract_academic_segment_profit(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract academic segment profit from segment information"""
+        return await self.extract_field(pdf_path, 'academic_segment')
+
+    async def extract_school_segment_loss(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract school segment loss from segment information"""
+        return await self.extract_field(pdf_path, 'school_segment')
+
+    async def extract_business_implementation_cost(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract business implementation cost from page 8"""
+        return await self.extract_field(pdf_path, 'business_implementation_cost')
+
+    async def extract_fixed_asset_details(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract fixed asset acquisition and disposal details from page 11"""
+        return await self.extract_field(pdf_path, 'fixed_asset_details')
+
+    async def extract_borrowing_details(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract borrowing details from page 13"""
+        return await self.extract_field(pdf_path, 'borrowing_details')
+
+    async def extract_operational_cost_details(self, pdf_path: Union[str, DocumentSession]) -> Dict[str, Any]:
+        """Extract operational cost details from pages 15-16"""
+        return await self.extract_field(pdf_path, 'operational_cost_details')
+
+
+async def extract_financial_data_async(pdf_path: str = './b67155c2806c76359d1b3637d7ff2ac7.pdf',
+                                       transport: Optional[ModelTransport] = None,
+                                       cache: Optional[ExtractionCache] = None,
+                                       use_text_layer: bool = True,
+                                       semaphore: Optional[asyncio.Semaphore] = None,
+                                       max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                                       on_field: Optional[Callable[[str, Dict[str, Any], str, float], None]] = None,
+                                       verify_identities: bool = True,
+                                       previous_fields: Optional[Dict[str, Dict[str, Any]]] = None,
+                                       voting: bool = False) -> Dict[str, Any]:
+    """
+    Awaitable extract_financial_data: same output, every field requested concurrently.
+
+    Pass one ``semaphore`` to every concurrent call to bound the model calls
+    in flight across all documents; otherwise each call gets its own, of
+    ``max_concurrency``. Cancelling the task cancels the outstanding calls
+    and still releases the uploaded document. ``voting`` is as for
+    extract_financial_data.
+    """
+    api_key = os.getenv('EXPO_PUBLIC_GEMINI_API_KEY')
+    transport = transport or transport_from_env(api_key)
+
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f'Target PDF not found: {pdf_path}')
+    if transport is None:
+        return {
+            'error': 'API key not configured - cannot extract financial data from PDF',
+            'extraction_metadata': {
+                'extracted_at': datetime.now().isoformat(),
+                'confidence': 'failed',
+                'warnings': ['API key not configured - no fallback data provided to ensure data integrity']
+            }
+        }
+
+    extractor = AsyncFinancialDataExtractor(api_key, transport, cache or ExtractionCache.from_env(), use_text_layer,
+                                            semaphore, max_concurrency, voting)
+    extractor.on_field = on_field
+    document = await extractor.open_document(pdf_path)
+    print(f"🔍 Extracting financial data from: {pdf_path}")
+    try:
+        all_results = extractor.extractor.reuse_fields(document, list(FINANCIAL_DATA_FIELDS), previous_fields)
+        pending = [name for name in FINANCIAL_DATA_FIELDS if name not in all_results]
+        if pending:
+            all_results.update(await extractor.extract_many(document, pending))
+        all_results = {name: all_results[name] for name in FINANCIAL_DATA_FIELDS}
+
+        identity_checks = []
+        if verify_identities:
+            all_results, identity_checks = await extractor.check_identities(document, all_results)
+
+        financial_data = build_financial_data(all_results, pdf_path)
+        upload_stats = document.stats()
+        print(f"📤 Uploaded {upload_stats['bytes_uploaded'] / 1024:.2f} KB for {upload_stats['model_calls']} model calls")
+        financial_data['extraction_metadata'].update({
+            'extracted_at': datetime.now().isoformat(),
+            'document': await asyncio.to_thread(document.identity),
+            **upload_stats,
+            'timings': document.timing_summary(),
+            'fields': extractor.extractor.store_fields(document, all_results)
+        })
+        if verify_identities:
+            financial_data['extraction_metadata']['identity_checks'] = identity_checks
+        if verify_identities or financial_data['extraction_metadata']['failed_fields']:
+            financial_data['extraction_metadata']['confidence'] = extraction_confidence(all_results, identity_checks)
+        votes = {name: result['votes'] for name, result in all_results.items() if result.get('votes')}
+        if votes:
+            financial_data['extraction_metadata']['votes'] = votes
+        if extractor.extractor.cache is not None:
+            financial_data['extraction_metadata']['cache'] = extractor.extractor.cache.stats()
+        return financial_data
+    finally:
+        await extractor.close_document(document)
+
+
+async def extract_many_documents(pdf_paths: List[str], max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                                 **options: Any) -> Dict[str, Dict[str, Any]]:
+    """extract_financial_data_async for every PDF on one event loop, under one shared semaphore"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(*(extract_financial_data_async(pdf_path, semaphore=semaphore, **options)
+                                     for pdf_path in pdf_paths), return_exceptions=True)
+    return {
+        pdf_path: result if not isinstance(result, BaseException) else {'error': str(result)}
+        for pdf_path, result in zip(pdf_paths, results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract financial data from several PDFs on one event loop')
+    parser.add_argument('pdf_paths', nargs='+')
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help='model calls in flight across all documents')
+    parser.add_argument('--no-text-layer', action='store_true', help='send every field to the model')
+    parser.add_argument('--vote', action='store_true', help='decide sign-prone segment fields by self-consistency voting')
+    args = parser.parse_args()
+
+    sys.stdout, output = sys.stderr, sys.stdout
+    results = asyncio.run(extract_many_documents(args.pdf_paths, args.max_concurrency,
+                                                 use_text_layer=not args.no_text_layer, voting=args.vote))
+    output.write(json.dumps(results, ensure_ascii=False, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
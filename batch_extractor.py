@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+from pypdf import PdfReader
+from gemini_client import ModelTransport, GeminiTransport
+from cassette_transport import CassetteTransport
+from extraction_cache import ExtractionCache
+from rate_limiter import DEFAULT_REQUESTS_PER_MINUTE
+from pdf_text_layer import cover_identity
+from data_extractor import _run_worker_job
+
+
+# Per-process state set up once by _init_process and reused by every document that process handles
+_transport: Optional[ModelTransport] = None
+_cache: Optional[ExtractionCache] = None
+
+
+def _manifest_entries(source: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(absolute pdf path, manifest record) per manifest line; a plain-text line is a record with just pdf_path"""
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            record = json.loads(line) if line.startswith('{') else {'pdf_path': line}
+            yield os.path.abspath(os.path.join(base, record['pdf_path'])), record
+
+
+def find_documents(source: str) -> List[str]:
+    """List the PDFs to process from a directory (searched recursively) or a manifest file.
+
+    A manifest is either plain text with one path per line (blank lines and
+    ``#`` comments ignored) or JSONL with a ``pdf_path`` per record, and
+    optionally its ``institution`` and ``fiscal_year``. Relative paths are
+    resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        documents = []
+        for root, _, files in os.walk(source):
+            documents.extend(os.path.join(root, name) for name in files if name.lower().endswith('.pdf'))
+        return sorted(os.path.abspath(path) for path in documents)
+    return [path for path, _ in _manifest_entries(source)]
+
+
+def manifest_identities(source: str) -> Dict[str, Dict[str, Any]]:
+    """``institution`` and ``fiscal_year`` given per PDF by a JSONL manifest; empty for a directory"""
+    if os.path.isdir(source):
+        return {}
+    return {
+        path: {key: record[key] for key in ('institution', 'fiscal_year') if record.get(key)}
+        for path, record in _manifest_entries(source)
+    }
+
+
+def document_identity(pdf_path: str, given: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The manifest's institution and fiscal year for one PDF, completed from its cover page"""
+    identity = dict(given or {})
+    if 'institution' not in identity or 'fiscal_year' not in identity:
+        try:
+            identity = {**cover_identity(PdfReader(pdf_path)), **identity}
+        except Exception:
+            pass
+    return identity
+
+
+def _successful_records(output_path: str) -> Dict[str, Dict[str, Any]]:
+    """The last successful record per PDF path in ``output_path``; a truncated last line is ignored"""
+    records = {}
+    if not os.path.exists(output_path):
+        return records
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('status') == 'ok':
+                records[record['pdf_path']] = record
+    return records
+
+
+def completed_documents(output_path: str) -> Set[str]:
+    """PDF paths that already have a successful record in ``output_path``.
+
+    A truncated last line from an interrupted run is ignored, so that
+    document is processed again.
+    """
+    return set(_successful_records(output_path))
+
+
+def previous_fields(output_path: str) -> Dict[str, Dict[str, Any]]:
+    """Stored field results (extraction_metadata.fields) per PDF from the successful records in ``output_path``"""
+    fields = {}
+    for pdf_path, record in _successful_records(output_path).items():
+        metadata = record['result'].get('financial_data', {}).get('extraction_metadata', {})
+        if metadata.get('fields'):
+            fields[pdf_path] = metadata['fields']
+    return fields
+
+
+def _init_process(requests_per_minute: float) -> None:
+    """Create the transport and cache once per worker process; progress logging goes to stderr"""
+    global _transport, _cache
+    sys.stdout = sys.stderr
+    api_key = os.getenv('EXPO_PUBLIC_GEMINI_API_KEY')
+    inner = GeminiTransport(api_key, requests_per_minute=requests_per_minute) if api_key else None
+    _transport = CassetteTransport.from_env(inner) or inner
+    _cache = ExtractionCache.from_env()
+
+
+def _process_document(pdf_path: str, options: Dict[str, Any],
+                      fields: Optional[Dict[str, Dict[str, Any]]] = None,
+                      identity: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Extract one document and build its output record, reusing ``fields`` from an earlier run.
+
+    The record carries the document's ``institution`` and ``fiscal_year``
+    (manifest first, then the cover page) so FinancialStore can key it.
+    """
+    started = time.time()
+    response = _run_worker_job({'id': pdf_path, 'type': 'extract', 'pdf_path': pdf_path,
+                                'previous_fields': fields, **options},
+                               _transport, _cache)
+    record = {
+        'pdf_path': pdf_path,
+        **document_identity(pdf_path, identity),
+        'status': response['status'],
+        'elapsed_seconds': round(time.time() - started, 3)
+    }
+    if response['status'] == 'ok':
+        record['result'] = response['result']
+    else:
+        record['error'] = response['error']
+    return record
+
+
+def run_batch(source: str, output_path: Optional[str] = None, processes: int = 4,
+              resume: bool = False, formats: Optional[List[str]] = None, batched: bool = False,
+              max_workers: int = 1, use_text_layer: bool = True,
+              requests_per_minute: Optional[float] = None, incremental: bool = False) -> Dict[str, int]:
+    """
+    Extract every PDF under ``source`` on a pool of ``processes`` worker processes.
+
+    One JSON line per document is written to ``output_path`` (stdout when
+    None) as soon as that document finishes, so results stream out in
+    completion order. With ``resume`` documents that already have a
+    successful record in the output file are skipped and new records are
+    appended. ``requests_per_minute`` is the total quota for the API key;
+    it is split evenly across the processes.
+    
+    With ``incremental`` every document is processed again, but fields
+    whose fingerprint (prompt, model, document) matches the record already
+    in the output file are reused, so a prompt edit only costs calls for
+    the edited fields. The output file is replaced once the run finishes;
+    a document that fails this time keeps its earlier successful record
+    (the failure is still counted).
+    """
+    documents = find_documents(source)
+    identities = manifest_identities(source)
+    skipped = 0
+    if resume and incremental:
+        raise ValueError('--resume and --incremental cannot be combined')
+    stored: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    kept: Dict[str, Dict[str, Any]] = {}
+    if incremental:
+        if output_path is None:
+            raise ValueError('--incremental needs an output file')
+        kept = _successful_records(output_path)
+        stored = previous_fields(output_path)
+    if resume:
+        if output_path is None:
+            raise ValueError('--resume needs an output file')
+        done = completed_documents(output_path)
+        skipped = sum(1 for path in documents if path in done)
+        documents = [path for path in documents if path not in done]
+
+    if requests_per_minute is None:
+        requests_per_minute = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', DEFAULT_REQUESTS_PER_MINUTE))
+    processes = max(1, min(processes, len(documents) or 1))
+    options = {
+        'formats': formats or ['financial_data'],
+        'batched': batched,
+        'max_workers': max_workers,
+        'use_text_layer': use_text_layer
+    }
+
+    print(f"📚 {len(documents)} document(s) to process, {skipped} already done "
+          f"({processes} processes, {requests_per_minute:g} requests/minute)", file=sys.stderr)
+
+    counts = {'ok': 0, 'error': 0, 'skipped': skipped}
+    target = f'{output_path}.tmp' if incremental else output_path
+    output = open(target, 'a' if resume else 'w', encoding='utf-8') if output_path else sys.stdout
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_process,
+                                 initargs=(requests_per_minute / processes,)) as executor:
+            futures = {executor.submit(_process_document, path, options, stored.get(path),
+                                       identities.get(path)): path
+                       for path in documents}
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as error:
+                    record = {'pdf_path': futures[future], 'status': 'error', 'error': str(error)}
+                counts[record['status']] += 1
+                print(f"{'✅' if record['status'] == 'ok' else '❌'} [{counts['ok'] + counts['error']}/{len(documents)}] "
+                      f"{record['pdf_path']}", file=sys.stderr)
+                if record['status'] != 'ok' and record['pdf_path'] in kept:
+                    print(f"   ♻️  Keeping the previous result: {record['error']}", file=sys.stderr)
+                    record = kept[record['pdf_path']]
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if incremental:
+        os.replace(target, output_path)
+
+    print(f"🏁 {counts['ok']} succeeded, {counts['error']} failed, {counts['skipped']} skipped", file=sys.stderr)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract financial data from many PDFs into a JSONL file')
+    parser.add_argument('source', help='directory of PDFs, or a manifest listing one PDF per line')
+    parser.add_argument('-o', '--output', help='JSONL output file (default: stdout)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='documents processed in parallel')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip documents that already have a successful record in the output file')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reprocess every document but reuse fields whose prompt, model and document are unchanged')
+    parser.add_argument('--format', dest='formats', action='append',
+                        choices=['financial_data', 'tables', 'complete'],
+                        help='output shape(s) to include per document (repeatable, default: financial_data)')
+    parser.add_argument('--batched', action='store_true',
+                        help='request every field in a single structured call')
+    parser.add_argument('--max-workers', type=int, default=1,
+                        help='concurrent field extractions per document')
+    parser.add_argument('--no-text-layer', action='store_true',
+                        help='send every field to the model instead of reading the PDF text first')
+    parser.add_argument('--requests-per-minute', type=float,
+                        help='total request quota shared by all processes (default: GEMINI_REQUESTS_PER_MINUTE)')
+    args = parser.parse_args()
+
+    try:
+        counts = run_batch(args.source, args.output, args.processes, args.resume, args.formats,
+                           args.batched, args.max_workers, not args.no_text_layer, args.requests_per_minute,
+                           args.incremental)
+    except Exception as error:
+        print(f"Error: {error}", file=sys.stderr)
+        sys.exit(1)
+
+    if counts['error']:
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+
+DURATION_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+
+@dataclass
+class CallRecord:
+    """One model call as seen by DocumentSession.generate"""
+    field: str
+    document_sha256: str
+    model_name: str
+    duration: float
+    request_bytes: int
+    document_bytes: int
+    response_chars: int
+    prompt_tokens: Optional[int]
+    output_tokens: Optional[int]
+    total_tokens: Optional[int]
+    retries: int
+    outcome: str
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: str) -> str:
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + '}'
+
+
+class CallMetrics:
+    """Process-wide aggregation of CallRecords, exported in the Prometheus text format.
+
+    Series are labelled by field, model and outcome. Document hashes stay
+    out of the labels to keep cardinality bounded; they are kept in the
+    per-document summaries instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[Tuple[str, str, str], int] = {}
+        self.duration_sum: Dict[Tuple[str, str], float] = {}
+        self.duration_buckets: Dict[Tuple[str, str], List[int]] = {}
+        self.request_bytes: Dict[Tuple[str, str], int] = {}
+        self.response_chars: Dict[Tuple[str, str], int] = {}
+        self.tokens: Dict[Tuple[str, str, str], int] = {}
+        self.retries: Dict[Tuple[str, str], int] = {}
+
+    def record(self, call: CallRecord) -> None:
+        key = (call.field, call.model_name)
+        with self._lock:
+            outcome_key = (call.field, call.model_name, call.outcome)
+            self.calls[outcome_key] = self.calls.get(outcome_key, 0) + 1
+            self.duration_sum[key] = self.duration_sum.get(key, 0.0) + call.duration
+            buckets = self.duration_buckets.setdefault(key, [0] * (len(DURATION_BUCKETS) + 1))
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if call.duration <= bound:
+                    buckets[index] += 1
+            buckets[-1] += 1
+            self.request_bytes[key] = self.request_bytes.get(key, 0) + call.request_bytes
+            self.response_chars[key] = self.response_chars.get(key, 0) + call.response_chars
+            self.retries[key] = self.retries.get(key, 0) + call.retries
+            for kind in ('prompt', 'output'):
+                count = getattr(call, f'{kind}_tokens')
+                if count:
+                    token_key = (call.field, call.model_name, kind)
+                    self.tokens[token_key] = self.tokens.get(token_key, 0) + count
+
+    def prometheus_text(self) -> str:
+        """Current totals in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += ['# HELP extraction_model_calls_total Model calls made by the extractors.',
+                      '# TYPE extraction_model_calls_total counter']
+            lines += [f'extraction_model_calls_total{_labels(field=field, model=model, outcome=outcome)} {count}'
+                      for (field, model, outcome), count in sorted(self.calls.items())]
+
+            lines += ['# HELP extraction_model_call_duration_seconds Wall time of a model call, retries included.',
+                      '# TYPE extraction_model_call_duration_seconds histogram']
+            for (field, model), buckets in sorted(self.duration_buckets.items()):
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'extraction_model_call_duration_seconds_bucket'
+                                 f'{_labels(field=field, model=model, le=f"{bound:g}")} {count}')
+                lines.append(f'extraction_model_call_duration_seconds_bucket'
+                             f'{_labels(field=field, model=model, le="+Inf")} {buckets[-1]}')
+                lines.append(f'extraction_model_call_duration_seconds_sum{_labels(field=field, model=model)} '
+                             f'{self.duration_sum[(field, model)]:.6f}')
+                lines.append(f'extraction_model_call_duration_seconds_count{_labels(field=field, model=model)} '
+                             f'{buckets[-1]}')
+
+            for name, help_text, values in (
+                ('extraction_request_bytes_total', 'Prompt bytes sent to the model.', self.request_bytes),
+                ('extraction_response_chars_total', 'Characters returned by the model.', self.response_chars),
+                ('extraction_retries_total', 'Quota and transient-error retries.', self.retries)
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                lines += [f'{name}{_labels(field=field, model=model)} {value}'
+                          for (field, model), value in sorted(values.items())]
+
+            lines += ['# HELP extraction_tokens_total Tokens reported by the model.',
+                      '# TYPE extraction_tokens_total counter']
+            lines += [f'extraction_tokens_total{_labels(field=field, model=model, kind=kind)} {count}'
+                      for (field, model, kind), count in sorted(self.tokens.items())]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the metrics for a node_exporter textfile collector, replacing the file atomically"""
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(temporary, path)
+
+    def serve(self, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+        """Serve /metrics on a daemon thread and return the server"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+metrics = CallMetrics()
+
+
+def timing_summary(calls: Sequence[CallRecord]) -> Dict[str, Any]:
+    """Per-document timing summary for the output JSON"""
+    durations = [call.duration for call in calls]
+    slowest = max(calls, key=lambda call: call.duration) if calls else None
+    return {
+        'model_calls': len(calls),
+        'total_call_seconds': round(sum(durations), 3),
+        'slowest_call': {'field': slowest.field, 'seconds': round(slowest.duration, 3)} if slowest else None,
+        'failed_calls': sum(1 for call in calls if call.outcome != 'ok'),
+        'retries': sum(call.retries for call in calls),
+        'request_bytes': sum(call.request_bytes for call in calls),
+        'response_chars': sum(call.response_chars for call in calls),
+        'total_tokens': sum(call.total_tokens or 0 for call in calls),
+        'calls': [
+            {
+                **{name: value for name, value in asdict(call).items()
+                   if name not in ('document_sha256', 'model_name', 'duration')},
+                'duration_ms': round(call.duration * 1000, 1)
+            }
+            for call in calls
+        ]
+    }
+
+
+def export_from_env() -> None:
+    """Write EXTRACTION_METRICS_FILE, if set, with the current totals"""
+    path = os.getenv('EXTRACTION_METRICS_FILE')
+    if path:
+        metrics.write_prometheus(path)
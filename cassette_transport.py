@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Any, Awaitable, Optional, Tuple
+from gemini_client import ModelTransport, ModelResponse, UploadedDocument, GeminiTransport, DEFAULT_MODEL_NAME, document_key
+
+
+CASSETTE_MODES = ('record', 'replay', 'auto')
+
+# One append lock per cassette file, shared by every transport writing to it (e.g. the tiers of a cascade)
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_lock = threading.Lock()
+
+
+class CassetteMiss(LookupError):
+    """A strict replay was asked for a response the cassette does not hold"""
+
+
+class _DeferredUpload:
+    """Document bytes held back until a cassette miss actually needs them on the backend"""
+
+    def __init__(self, data: bytes, mime_type: str, display_name: str):
+        self.data = data
+        self.mime_type = mime_type
+        self.display_name = display_name
+
+
+def _variant(generation_config: Optional[Dict[str, Any]], sample: Optional[int]) -> str:
+    """Key part for the generation config and sample number; empty for a plain call, as in older cassettes"""
+    if not generation_config and sample is None:
+        return ''
+    return json.dumps({'generation_config': generation_config or None, 'sample': sample}, sort_keys=True)
+
+
+class CassetteTransport(ModelTransport):
+    """Records model responses to a cassette file and replays them offline.
+
+    Responses are keyed by (model name, SHA-256 of the prompt, document,
+    variant). The document part is the SHA-256 of the PDF, plus the page
+    numbers for a page slice, so replay does not depend on a slice being
+    written out byte for byte the same. The variant records the generation
+    config and sample number, so each draw of a sampled prompt keeps its own
+    answer. Several models can share one cassette. The cassette is a
+    JSON-lines file, appended to as responses are recorded. Outside 'record'
+    mode documents are only uploaded once a miss needs them, outside the
+    lookup lock.
+
+    ``mode`` picks the behaviour:
+    - 'record' always calls ``inner`` and stores the answer
+    - 'replay' answers from the cassette with no latency and no quota use
+    - 'auto' replays what it has and records the rest
+
+    In 'replay' mode a miss raises CassetteMiss when ``strict`` is set (or
+    when there is no ``inner`` transport to fall back to). Otherwise the
+    miss is answered by ``inner`` and recorded.
+    """
+
+    rate_limiter = None
+
+    def __init__(self, path: str, inner: Optional[ModelTransport] = None,
+                 mode: str = 'auto', strict: bool = False, model_name: Optional[str] = None):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f'Unknown cassette mode: {mode}')
+        if mode != 'replay' and inner is None:
+            raise ValueError(f"Cassette mode '{mode}' needs a transport to record from")
+        self.path = path
+        self.inner = inner
+        self.mode = mode
+        self.strict = strict
+        self.model_name = inner.model_name if inner is not None else model_name or DEFAULT_MODEL_NAME
+        self.hits = 0
+        self.recorded = 0
+        self._entries: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._deferred_uploads: Dict[_DeferredUpload, Future] = {}
+        with _file_locks_lock:
+            self._file_lock = _file_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        variant = _variant(entry.get('generation_config'), entry.get('sample'))
+                        document = document_key(entry['document_sha256'], entry.get('pages') or ())
+                        self._entries[(entry.get('model_name', DEFAULT_MODEL_NAME), entry['prompt_sha256'],
+                                       document, variant)] = entry
+
+    @classmethod
+    def from_env(cls, inner: Optional[ModelTransport],
+                 model_name: Optional[str] = None) -> Optional['CassetteTransport']:
+        """Wrap ``inner`` with the cassette named by EXTRACTION_CASSETTE, or return None when it is not set.
+
+        EXTRACTION_CASSETTE_MODE picks the mode (default: replay when there is
+        no API key, auto otherwise) and EXTRACTION_CASSETTE_STRICT=1 fails on misses.
+        ``model_name`` names the model replayed when there is no ``inner``.
+        """
+        path = os.getenv('EXTRACTION_CASSETTE')
+        if not path:
+            return None
+        mode = os.getenv('EXTRACTION_CASSETTE_MODE') or ('auto' if inner is not None else 'replay')
+        strict = os.getenv('EXTRACTION_CASSETTE_STRICT', '').lower() in ('1', 'true', 'yes')
+        return cls(path, inner, mode, strict, model_name)
+
+    def make_key(self, prompt: str, document: UploadedDocument, generation_config: Optional[Dict[str, Any]] = None,
+                 sample: Optional[int] = None) -> Tuple[str, str, str, str]:
+        return (self.model_name, hashlib.sha256(prompt.encode('utf-8')).hexdigest(), document.key(),
+                _variant(generation_config, sample))
+
+    def upload(self, data: bytes, mime_type: str, display_name: str) -> Any:
+        if self.mode == 'record':
+            return self.inner.upload(data, mime_type, display_name)
+        return _DeferredUpload(data, mime_type, display_name)
+
+    def generate(self, prompt: str, document: UploadedDocument,
+                 generation_config: Optional[Dict[str, Any]] = None, sample: Optional[int] = None) -> ModelResponse:
+        key = self.make_key(prompt, document, generation_config, sample)
+        if self.mode != 'record':
+            entry = self._entries.get(key)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                return ModelResponse(text=entry['text'], usage=entry.get('usage', {}))
+            if self.mode == 'replay' and (self.strict or self.inner is None):
+                raise CassetteMiss(f'No recorded {key[0]} response for prompt {key[1][:12]} on document '
+                                   f'{key[2][:12]}{key[2][64:]} in {self.path}')
+
+        self._upload_deferred(document)
+
+        def call() -> ModelResponse:
+            return self.inner.generate(prompt, document, generation_config, sample)
+
+        limiter = self.inner.rate_limiter
+        response = limiter.call(call) if limiter is not None else call()
+        self._record(key, document, response, generation_config, sample)
+        return response
+
+    async def generate_async(self, prompt: str, document: UploadedDocument,
+                             generation_config: Optional[Dict[str, Any]] = None,
+                             sample: Optional[int] = None) -> ModelResponse:
+        """As generate; replayed answers return at once and misses await the inner transport"""
+        key = self.make_key(prompt, document, generation_config, sample)
+        if self.mode != 'record':
+            entry = self._entries.get(key)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                return ModelResponse(text=entry['text'], usage=entry.get('usage', {}))
+            if self.mode == 'replay' and (self.strict or self.inner is None):
+                raise CassetteMiss(f'No recorded {key[0]} response for prompt {key[1][:12]} on document '
+                                   f'{key[2][:12]}{key[2][64:]} in {self.path}')
+
+        if isinstance(document.handle, _DeferredUpload):
+            await asyncio.to_thread(self._upload_deferred, document)
+
+        def call() -> Awaitable[ModelResponse]:
+            return self.inner.generate_async(prompt, document, generation_config, sample)
+
+        limiter = self.inner.rate_limiter
+        response = await (limiter.call_async(call) if limiter is not None else call())
+        self._record(key, document, response, generation_config, sample)
+        return response
+
+    def _upload_deferred(self, document: UploadedDocument) -> None:
+        """Upload a held-back document to the inner transport, once however many misses need it.
+
+        The upload runs outside the lock, so replayed lookups carry on meanwhile.
+        """
+        with self._lock:
+            pending = document.handle
+            if not isinstance(pending, _DeferredUpload):
+                return
+            upload = self._deferred_uploads.get(pending)
+            owner = upload is None
+            if owner:
+                upload = self._deferred_uploads[pending] = Future()
+        if not owner:
+            upload.result()
+            return
+        try:
+            handle = self.inner.upload(pending.data, pending.mime_type, pending.display_name)
+        except BaseException as error:
+            with self._lock:
+                del self._deferred_uploads[pending]
+            upload.set_exception(error)
+            raise
+        with self._lock:
+            document.handle = handle
+            del self._deferred_uploads[pending]
+        upload.set_result(handle)
+
+    def _record(self, key: Tuple[str, str, str, str], document: UploadedDocument, response: ModelResponse,
+                generation_config: Optional[Dict[str, Any]], sample: Optional[int]) -> None:
+        entry = {
+            'prompt_sha256': key[1],
+            'document_sha256': document.source_sha256 or document.sha256,
+            'pages': list(document.pages) or None,
+            'generation_config': generation_config,
+            'sample': sample,
+            'model_name': key[0],
+            'text': response.text,
+            'usage': response.usage,
+            'recorded_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self.recorded += 1
+        with self._file_lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def release(self, document: UploadedDocument) -> None:
+        if self.inner is not None and not isinstance(document.handle, _DeferredUpload):
+            self.inner.release(document)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'cassette': self.path,
+            'mode': self.mode,
+            'entries': len(self._entries),
+            'replayed': self.hits,
+            'recorded': self.recorded
+        }
+
+
+def transport_from_env(api_key: Optional[str], model_name: str = DEFAULT_MODEL_NAME) -> Optional[ModelTransport]:
+    """The Gemini transport for ``api_key``, wrapped in the EXTRACTION_CASSETTE cassette when one is configured.
+
+    Returns None when there is neither a key nor a cassette to replay.
+    """
+    inner = GeminiTransport(api_key, model_name) if api_key else None
+    cassette = CassetteTransport.from_env(inner, model_name)
+    return cassette or inner
@@ -4,40 +4,289 @@ import os
 import sys
 import time
 import json
+import argparse
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+from gemini_client import ModelTransport, GeminiTransport, DocumentSession
+from extraction_cache import ExtractionCache
+from field_registry import (
+    FIELD_REGISTRY, VOTING_FIELDS, VotePolicy, apply_sign_rule, plan_calls, build_group_prompt, format_plan,
+    field_fingerprint
+)
+from self_consistency import vote
+from japanese_numbers import parse_number
+from cassette_transport import transport_from_env
+from call_metrics import metrics, export_from_env as export_metrics_from_env
+from accounting_identities import FIELD_IDENTITIES, check_identities, failing_fields, identity_confidence, reconcile
+
+
+# Fields gathered by extract_financial_data: result key -> (extractor method, target as described to the model)
+FINANCIAL_DATA_FIELDS = {
+    spec.key: (spec.method, spec.target()) for spec in FIELD_REGISTRY.values() if spec.kind == 'amount'
+}
+
+# Fields the local text layer may resolve without a model call: result key -> (statement title, row labels)
+TEXT_LAYER_LABELS = {
+    spec.key: (spec.text_layer[0], list(spec.text_layer[1])) for spec in FIELD_REGISTRY.values() if spec.text_layer
+}
+
+# Supplementary schedules gathered only by extract_structured_financial_tables: result key -> extractor method
+DETAIL_TABLE_FIELDS = {
+    spec.key: spec.method for spec in FIELD_REGISTRY.values() if spec.kind == 'table'
+}
 
 
 class FinancialDataExtractor:
     """Base financial data extractor class using Gemini API"""
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    def __init__(self, api_key: str, transport: Optional[ModelTransport] = None,
+                 cache: Optional[ExtractionCache] = None, use_text_layer: bool = False, voting: bool = False):
+        self.transport = transport or transport_from_env(api_key) or GeminiTransport(api_key)
+        self.cache = cache
+        self.use_text_layer = use_text_layer
+        self.voting = voting
+        self._sessions: Dict[str, DocumentSession] = {}
+        self._sessions_lock = threading.Lock()
+        self._refresh = threading.local()
+        self.on_field: Optional[Callable[[str, Dict[str, Any], str, float], None]] = None
     
-    def _extract_value(self, pdf_path: str, prompt: str) -> Dict[str, Any]:
-        """Extract a single value from PDF using Gemini API"""
+    def open_document(self, pdf_path: Union[str, DocumentSession],
+                      uploads_from: Optional[DocumentSession] = None) -> DocumentSession:
+        """Return the upload session for a PDF, creating it on first use (borrowing ``uploads_from``'s uploads)"""
+        if isinstance(pdf_path, DocumentSession):
+            return pdf_path
+        with self._sessions_lock:
+            session = self._sessions.get(pdf_path)
+            if session is None:
+                session = DocumentSession(pdf_path, self.transport, uploads_from)
+                self._sessions[pdf_path] = session
+            return session
+    
+    def close_document(self, pdf_path: Union[str, DocumentSession]) -> None:
+        """Release the uploaded copy of a PDF and forget its session"""
+        session = self.open_document(pdf_path)
+        with self._sessions_lock:
+            self._sessions.pop(session.pdf_path, None)
+        session.close()
+    
+    def report_field(self, session: DocumentSession, name: str, result: Dict[str, Any],
+                     source: str, latency: float) -> None:
+        """Count a resolved field and pass it to the ``on_field(name, result, source, latency)`` listener"""
+        session.record_resolution(source)
+        if self.on_field is not None:
+            self.on_field(name, result, source, latency)
+    
+    def resolve_from_text_layer(self, pdf_path: str, names: List[str],
+                                report: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Resolve whichever of ``names`` the PDF's own text layer answers unambiguously.
+        
+        Only fields listed in TEXT_LAYER_LABELS are attempted; the rest, and any
+        field whose row is missing or ambiguous, are left for the model.
+        With ``report`` off the fields are looked up without being counted.
+        """
+        if not self.use_text_layer or not names:
+            return {}
+        session = self.open_document(pdf_path)
         try:
-            with open(pdf_path, 'rb') as f:
-                pdf_content = f.read()
-            
-            response = self.model.generate_content([
-                prompt,
-                {
-                    "mime_type": "application/pdf",
-                    "data": pdf_content
+            text_layer = session.text_layer()
+        except Exception as error:
+            print(f"⚠️  Text layer unavailable, using the model for every field: {error}")
+            return {}
+        
+        results = {}
+        for name in names:
+            if name not in TEXT_LAYER_LABELS:
+                continue
+            statement, labels = TEXT_LAYER_LABELS[name]
+            started = time.time()
+            raw_string = text_layer.find_amount(labels, statement=statement)
+            numeric_value = apply_sign_rule(name, self._parse_japanese_number(raw_string) if raw_string else None)
+            if numeric_value is not None:
+                results[name] = {
+                    'raw_string': raw_string,
+                    'numeric_value': numeric_value,
+                    'success': True
                 }
-            ])
+                if report:
+                    self.report_field(session, name, results[name], 'text_layer', time.time() - started)
+        return results
+    
+    def reuse_fields(self, pdf_path: str, names: List[str],
+                     previous_fields: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """Results from an earlier run, as stored by store_fields, for fields whose fingerprint is unchanged.
+        
+        A field's fingerprint covers its FIELD_REGISTRY spec (prompt included),
+        the model and the document, so editing one prompt only invalidates
+        that field.
+        """
+        if not previous_fields:
+            return {}
+        session = self.open_document(pdf_path)
+        results = {}
+        for name in names:
+            stored = previous_fields.get(name)
+            if not stored or not stored.get('success') or name not in FIELD_REGISTRY:
+                continue
+            if stored.get('fingerprint') != field_fingerprint(name, self.transport.model_name, session.sha256):
+                continue
+            results[name] = {
+                'raw_string': stored.get('raw_string'),
+                'numeric_value': stored.get('numeric_value'),
+                'success': True
+            }
+            self.report_field(session, name, results[name], 'previous', 0.0)
+        return results
+    
+    def store_fields(self, pdf_path: str, results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Field results with their fingerprints, kept in extraction_metadata['fields'] for reuse_fields"""
+        session = self.open_document(pdf_path)
+        return {
+            name: {
+                'fingerprint': field_fingerprint(name, self.transport.model_name, session.sha256),
+                'raw_string': result.get('raw_string'),
+                'numeric_value': result.get('numeric_value'),
+                'success': bool(result.get('success'))
+            }
+            for name, result in results.items() if name in FIELD_REGISTRY
+        }
+    
+    def extract_many(self, pdf_path: str, methods: Dict[str, str], max_workers: int = 1) -> Dict[str, Dict[str, Any]]:
+        """Run several independent extract_* methods and return their results in request order.
+        
+        ``methods`` maps result keys to extractor method names. Fields the text
+        layer resolves skip the model entirely. With ``max_workers`` above 1 the
+        remaining calls run on a thread pool bounded to that many in-flight
+        requests. An exception in one call only fails that field.
+        """
+        session = self.open_document(pdf_path)
+        resolved = self.resolve_from_text_layer(session, list(methods))
+        
+        def run(name: str, method_name: str) -> Dict[str, Any]:
+            started = time.time()
+            try:
+                result = getattr(self, method_name)(session)
+            except Exception as error:
+                result = {
+                    'raw_string': None,
+                    'numeric_value': None,
+                    'success': False,
+                    'error': str(error)
+                }
+            self.report_field(session, name, result, 'model', time.time() - started)
+            return result
+        
+        pending = {name: method_name for name, method_name in methods.items() if name not in resolved}
+        if max_workers <= 1 or len(pending) <= 1:
+            resolved.update({name: run(name, method_name) for name, method_name in pending.items()})
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+                futures = {name: executor.submit(run, name, method_name) for name, method_name in pending.items()}
+                resolved.update({name: future.result() for name, future in futures.items()})
+        
+        return {name: resolved[name] for name in methods}
+    
+    def extract_field(self, pdf_path: str, key: str) -> Dict[str, Any]:
+        """Extract one FIELD_REGISTRY field with its own prompt, applying the field's sign rule.
+        
+        With ``voting`` on, VOTING_FIELDS are decided by self-consistency voting.
+        """
+        if self.voting and key in VOTING_FIELDS:
+            result = self._extract_voted(pdf_path, FIELD_REGISTRY[key].prompt, VOTING_FIELDS[key], field=key)
+        else:
+            result = self._extract_value(pdf_path, FIELD_REGISTRY[key].prompt, field=key)
+        if result['success']:
+            result = dict(result, numeric_value=apply_sign_rule(key, result['numeric_value']))
+        return result
+    
+    @contextmanager
+    def refreshing(self) -> Iterator[None]:
+        """Ask the model again for calls made in this block on this thread, instead of reading the cache"""
+        self._refresh.active = True
+        try:
+            yield
+        finally:
+            self._refresh.active = False
+    
+    def _cached(self, session: DocumentSession, prompt: str, compute: Callable[[], Any],
+                cacheable: Callable[[Any], bool]) -> Any:
+        """Return the cached result for this document and prompt, computing and storing it on a miss"""
+        if self.cache is None:
+            return compute()
+        if not getattr(self._refresh, 'active', False):
+            cached = self.cache.get(session.sha256, prompt, self.transport.model_name)
+            if cached is not None:
+                return cached
+        value = compute()
+        if cacheable(value):
+            self.cache.put(session.sha256, prompt, self.transport.model_name, value)
+        return value
+    
+    def check_identities(self, pdf_path: str, results: Dict[str, Dict[str, Any]],
+                         max_workers: int = 1) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+        """Check FIELD_IDENTITIES over ``results`` and re-extract only the fields of failing identities.
+        
+        Each suspect field is asked again with its own dedicated prompt,
+        bypassing the cache. Per field the original or the new value is kept,
+        whichever combination satisfies the most identities. Returns the
+        updated results and the final identity checks.
+        """
+        session = self.open_document(pdf_path)
+        values = {name: result.get('numeric_value') for name, result in results.items()}
+        checks = check_identities(FIELD_IDENTITIES, values)
+        suspects = [name for name in failing_fields(checks) if name in results]
+        if not suspects:
+            return results, checks
+        
+        print(f"🧮 {sum(1 for check in checks if check['status'] == 'fail')} accounting identity check(s) failed, "
+              f"re-extracting {suspects}")
+        started = time.time()
+        
+        def run(name: str) -> Dict[str, Any]:
+            with self.refreshing():
+                return self.extract_field(session, name)
+        
+        if max_workers <= 1 or len(suspects) <= 1:
+            retried = {name: run(name) for name in suspects}
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(suspects))) as executor:
+                retried = dict(zip(suspects, executor.map(run, suspects)))
+        latency = time.time() - started
+        
+        candidates = {
+            name: [values[name]] + ([retried[name]['numeric_value']]
+                                    if retried[name]['success'] and retried[name]['numeric_value'] != values[name] else [])
+            for name in suspects
+        }
+        chosen = reconcile(values, candidates, FIELD_IDENTITIES)
+        results = dict(results)
+        for name in suspects:
+            if chosen[name] != values[name]:
+                results[name] = retried[name]
+                self.report_field(session, name, retried[name], 'identity_check', latency)
+        checks = check_identities(FIELD_IDENTITIES, chosen)
+        failed = [check['identity'] for check in checks if check['status'] == 'fail']
+        print(f"🧮 After re-extraction: {'all identities hold' if not failed else f'still failing {failed}'}")
+        return results, checks
+    
+    def _extract_value(self, pdf_path: str, prompt: str, field: str = 'value') -> Dict[str, Any]:
+        """Extract a single value from PDF using Gemini API; ``field`` tags the call in the metrics"""
+        try:
+            session = self.open_document(pdf_path)
             
-            extracted_value = response.text.strip()
-            numeric_value = self._parse_japanese_number(extracted_value)
+            def compute() -> Dict[str, Any]:
+                response = session.generate(prompt, field=field)
+                extracted_value = response.text.strip()
+                numeric_value = self._parse_japanese_number(extracted_value)
+                return {
+                    'raw_string': extracted_value,
+                    'numeric_value': numeric_value,
+                    'success': numeric_value is not None
+                }
             
-            return {
-                'raw_string': extracted_value,
-                'numeric_value': numeric_value,
-                'success': numeric_value is not None
-            }
+            return self._cached(session, prompt, compute, lambda result: result['success'])
         except Exception as error:
             return {
                 'raw_string': None,
@@ -46,555 +295,281 @@ class FinancialDataExtractor:
                 'error': str(error)
             }
     
-    def _parse_japanese_number(self, value: str) -> Optional[int]:
-        """Parse Japanese financial numbers including △ symbol for negative values"""
-        if not value or not isinstance(value, str):
-            return None
-        
-        clean_value = value.strip()
+    def _extract_voted(self, pdf_path: str, prompt: str, policy: VotePolicy, field: str = 'value') -> Dict[str, Any]:
+        """Extract a single value by self-consistency voting; the result carries its vote record under 'votes'"""
+        session = self.open_document(pdf_path)
         
-        is_negative = False
-        if clean_value.startswith('△'):
-            is_negative = True
-            clean_value = clean_value[1:]
-        elif clean_value.startswith('-'):
-            is_negative = True
-            clean_value = clean_value[1:]
+        def draw(index: int) -> Dict[str, Any]:
+            try:
+                response = session.generate(prompt, generation_config={'temperature': policy.temperature},
+                                            field=field, sample=index)
+            except Exception as error:
+                return {'raw_string': None, 'numeric_value': None, 'success': False, 'error': str(error)}
+            extracted_value = response.text.strip()
+            numeric_value = self._parse_japanese_number(extracted_value)
+            return {
+                'raw_string': extracted_value,
+                'numeric_value': numeric_value,
+                'success': numeric_value is not None
+            }
         
-        clean_value = clean_value.replace(',', '')
-        clean_value = ''.join(c for c in clean_value if c.isdigit())
+        def compute() -> Dict[str, Any]:
+            answer, votes = vote(draw, lambda result: result['numeric_value'], policy)
+            return dict(answer, votes=votes)
         
-        try:
-            numeric_value = int(clean_value)
-            return -numeric_value if is_negative else numeric_value
-        except ValueError:
-            return None
+        return self._cached(session, f'{prompt}\n[vote {policy.agree}/{policy.samples}]', compute,
+                            lambda result: result['success'] and result['votes']['agreed'])
+    
+    def _parse_japanese_number(self, value: str) -> Optional[int]:
+        """Parse Japanese financial numbers (△/▲/parentheses negatives, full-width digits, 千円/百万円/億円) in 千円"""
+        return parse_number(value)
+    
+    def _parse_json_text(self, text: str) -> Any:
+        """Parse a JSON answer, tolerating a surrounding ```json fence"""
+        text = text.strip()
+        if text.startswith('```json'):
+            text = text[7:]
+        elif text.startswith('```'):
+            text = text[3:]
+        if text.endswith('```'):
+            text = text[:-3]
+        return json.loads(text.strip())
 
     def extract_segment_profit_loss(self, pdf_path: str) -> Dict[str, Any]:
         """Extract segment profit/loss from financial statements"""
-        prompt = """このPDFファイルの24ページにある「(19) 開示すべきセグメント情報」という表から、「附属病院」行の「業務損益」の値を正確に抽出してください。
-
-重要な指示：
-1. 24ページの「(19) 開示すべきセグメント情報」表を探してください
-2. その表の中で「附属病院」という行を見つけてください
-3. 「附属病院」行の「業務損益」列の値を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください（例：△410,984）
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'segment_profit_loss')
     
     def extract_total_liabilities(self, pdf_path: str) -> Dict[str, Any]:
         """Extract total liabilities from balance sheet"""
-        prompt = """このPDFファイルの貸借対照表から「負債合計」の値を正確に抽出してください。
-
-重要な指示：
-1. 貸借対照表の「負債の部」セクションを探してください
-2. 「負債の部」の最後にある「負債合計」という項目を特定してください
-3. 「純資産合計」ではなく、必ず「負債合計」の値を抽出してください
-4. 「負債合計」に対応する金額（千円単位）を抽出してください
-5. 値が△記号で始まっている場合は、それは負の値を意味します
-6. 抽出した値をそのまま返してください（例：27,947,258）
-
-注意：「純資産合計」や「資産合計」ではなく、必ず「負債の部」の「負債合計」を抽出してください。
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'total_liabilities')
     
     def extract_current_liabilities(self, pdf_path: str) -> Dict[str, Any]:
         """Extract current liabilities from balance sheet"""
-        prompt = """このPDFファイルの貸借対照表から「流動負債合計」の値を正確に抽出してください。
-
-重要な指示：
-1. 貸借対照表の「負債の部」セクションを探してください
-2. 「負債の部」の中の「流動負債」サブセクションを特定してください
-3. 「流動負債」サブセクションの最後にある「流動負債合計」という項目を見つけてください
-4. 「固定負債合計」「負債合計」「純資産合計」ではなく、必ず「流動負債合計」の値を抽出してください
-5. 「流動負債合計」に対応する金額（千円単位）を抽出してください
-6. 値が△記号で始まっている場合は、それは負の値を意味します
-7. 抽出した値をそのまま返してください
-
-注意：「固定負債合計」「負債合計」「純資産合計」ではなく、必ず「流動負債」セクションの「流動負債合計」を抽出してください。
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'current_liabilities')
     
     def extract_ordinary_expenses(self, pdf_path: str) -> Dict[str, Any]:
         """Extract ordinary expenses from income statement"""
-        prompt = """このPDFファイルの損益計算書から「経常費用合計」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書（収支計算書）を探してください
-2. 損益計算書の「経常費用」セクションを特定してください
-3. 「経常費用」セクションの最後にある「経常費用合計」という項目を見つけてください
-4. 「経常収益合計」「当期純利益」「負債合計」ではなく、必ず「経常費用合計」の値を抽出してください
-5. 「経常費用合計」に対応する金額（千円単位）を抽出してください
-6. 値が△記号で始まっている場合は、それは負の値を意味します
-7. 抽出した値をそのまま返してください
-
-注意：「経常収益合計」「当期純利益」「負債合計」ではなく、必ず損益計算書の「経常費用合計」を抽出してください。
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'ordinary_expenses')
 
 
 class ComprehensiveFinancialExtractor(FinancialDataExtractor):
     """Extended financial data extractor for comprehensive HTML infographic generation"""
     
-    def __init__(self, api_key: str):
-        super().__init__(api_key)
+    def __init__(self, api_key: str, transport: Optional[ModelTransport] = None,
+                 cache: Optional[ExtractionCache] = None, use_text_layer: bool = False, voting: bool = False):
+        super().__init__(api_key, transport, cache, use_text_layer, voting)
+    
+    def extract_fields_batch(self, pdf_path: str, field_names: Optional[List[str]] = None,
+                             max_workers: int = 1) -> Dict[str, Dict[str, Any]]:
+        """Extract several FINANCIAL_DATA_FIELDS in a single structured-JSON call.
+        
+        A single-group extract_planned run against the whole document: fields
+        missing from the answer, or whose value cannot be parsed, are retried
+        one by one with their dedicated extract_* method.
+        """
+        return self.extract_planned(pdf_path, list(field_names or FINANCIAL_DATA_FIELDS), 'single',
+                                    max_workers=max_workers, slice_pages=False)
+    
+    def plan_fields(self, pdf_path: str, field_names: List[str], group_by: str = 'statement') -> list:
+        """Call plan for the fields the text layer does not answer, as extract_planned would run it"""
+        resolved = self.resolve_from_text_layer(pdf_path, field_names, report=False)
+        return plan_calls([name for name in field_names if name not in resolved], group_by)
+    
+    def extract_planned(self, pdf_path: str, field_names: Optional[List[str]] = None,
+                        group_by: str = 'statement', max_workers: int = 1,
+                        slice_pages: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Extract FIELD_REGISTRY fields with the fewest calls the planner can find.
+        
+        Fields the text layer resolves are taken from there. The rest are
+        grouped by statement, page or all together (``group_by`` 'single') and
+        each group is requested in one structured-JSON call, sent against a
+        slice of the group's expected pages when ``slice_pages`` is set.
+        Anything a group call leaves out is retried on its own with its
+        dedicated prompt.
+        """
+        field_names = list(field_names or FIELD_REGISTRY)
+        session = self.open_document(pdf_path)
+        results = self.resolve_from_text_layer(session, field_names)
+        plan = plan_calls([name for name in field_names if name not in results], group_by)
+        page_count = session.page_count() if slice_pages else 0
+        
+        def run(call) -> Dict[str, Dict[str, Any]]:
+            if len(call.fields) == 1:
+                return {}
+            pages = list(call.pages) if slice_pages and call.pages and max(call.pages) <= page_count else None
+            prompt = build_group_prompt(call.fields, pages)
+            started = time.time()
+            try:
+                def compute() -> Any:
+                    response = session.generate(prompt, generation_config={'response_mime_type': 'application/json'},
+                                                pages=pages, field=f'group:{call.group}')
+                    return self._parse_json_text(response.text)
+                
+                answer = self._cached(session, prompt, compute, lambda value: isinstance(value, dict))
+                if not isinstance(answer, dict):
+                    answer = {}
+            except Exception as error:
+                print(f"⚠️  Call for {call.group} failed, retrying its fields individually: {error}")
+                answer = {}
+            latency = time.time() - started
+            
+            resolved = {}
+            for name in call.fields:
+                value = answer.get(name)
+                if value is None:
+                    continue
+                raw_string = str(value).strip()
+                numeric_value = apply_sign_rule(name, self._parse_japanese_number(raw_string))
+                if numeric_value is not None:
+                    resolved[name] = {
+                        'raw_string': raw_string,
+                        'numeric_value': numeric_value,
+                        'success': True
+                    }
+                    self.report_field(session, name, resolved[name], 'model', latency)
+            return resolved
+        
+        if max_workers <= 1 or len(plan) <= 1:
+            for call in plan:
+                results.update(run(call))
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(plan))) as executor:
+                for resolved in executor.map(run, plan):
+                    results.update(resolved)
+        
+        missing = [name for name in field_names if name not in results]
+        if missing:
+            print(f"🔄 Extracting {len(missing)} field(s) individually: {missing}")
+        results.update(self.extract_many(session, {
+            name: FIELD_REGISTRY[name].method for name in missing
+        }, max_workers=max_workers))
+        
+        return {name: results[name] for name in field_names}
     
     def extract_total_assets(self, pdf_path: str) -> Dict[str, Any]:
         """Extract total assets from balance sheet"""
-        prompt = """このPDFファイルの貸借対照表から「資産合計」の値を正確に抽出してください。
-
-重要な指示：
-1. 貸借対照表の「資産の部」セクションを探してください
-2. 「資産の部」の最後にある「資産合計」という項目を特定してください
-3. 「負債合計」「純資産合計」ではなく、必ず「資産合計」の値を抽出してください
-4. 「資産合計」に対応する金額（千円単位）を抽出してください
-5. 値が△記号で始まっている場合は、それは負の値を意味します
-6. 抽出した値をそのまま返してください
-
-注意：「負債合計」「純資産合計」ではなく、必ず「資産の部」の「資産合計」を抽出してください。
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'total_assets')
     
     def extract_current_assets(self, pdf_path: str) -> Dict[str, Any]:
         """Extract current assets from balance sheet"""
-        prompt = """このPDFファイルの貸借対照表から「流動資産合計」の値を正確に抽出してください。
-
-重要な指示：
-1. 貸借対照表の「資産の部」セクションを探してください
-2. 「資産の部」の中の「流動資産」サブセクションを特定してください
-3. 「流動資産」サブセクションの最後にある「流動資産合計」という項目を見つけてください
-4. 「固定資産合計」「資産合計」ではなく、必ず「流動資産合計」の値を抽出してください
-5. 「流動資産合計」に対応する金額（千円単位）を抽出してください
-6. 値が△記号で始まっている場合は、それは負の値を意味します
-7. 抽出した値をそのまま返してください
-
-注意：「固定資産合計」「資産合計」ではなく、必ず「流動資産」セクションの「流動資産合計」を抽出してください。
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'current_assets')
     
     def extract_fixed_assets(self, pdf_path: str) -> Dict[str, Any]:
         """Extract fixed assets from balance sheet"""
-        prompt = """このPDFファイルの貸借対照表から「固定資産合計」の値を正確に抽出してください。
-
-重要な指示：
-1. 貸借対照表の「資産の部」セクションを探してください
-2. 「資産の部」の中の「固定資産」サブセクションを特定してください
-3. 「固定資産」サブセクションの最後にある「固定資産合計」という項目を見つけてください
-4. 「流動資産合計」「資産合計」ではなく、必ず「固定資産合計」の値を抽出してください
-5. 「固定資産合計」に対応する金額（千円単位）を抽出してください
-6. 値が△記号で始まっている場合は、それは負の値を意味します
-7. 抽出した値をそのまま返してください
-
-注意：「流動資産合計」「資産合計」ではなく、必ず「固定資産」セクションの「固定資産合計」を抽出してください。
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'fixed_assets')
     
     def extract_total_revenue(self, pdf_path: str) -> Dict[str, Any]:
         """Extract total revenue from income statement"""
-        prompt = """このPDFファイルの損益計算書から「経常収益合計」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書（収支計算書）を探してください
-2. 損益計算書の「経常収益」セクションを特定してください
-3. 「経常収益」セクションの最後にある「経常収益合計」という項目を見つけてください
-4. 「経常費用合計」「当期純利益」ではなく、必ず「経常収益合計」の値を抽出してください
-5. 「経常収益合計」に対応する金額（千円単位）を抽出してください
-6. 値が△記号で始まっている場合は、それは負の値を意味します
-7. 抽出した値をそのまま返してください
-
-注意：「経常費用合計」「当期純利益」ではなく、必ず損益計算書の「経常収益合計」を抽出してください。
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'total_revenue')
     
     def extract_total_equity(self, pdf_path: str) -> Dict[str, Any]:
         """Extract total equity from balance sheet"""
-        prompt = """このPDFファイルの貸借対照表から「純資産合計」の値を正確に抽出してください。
-
-重要な指示：
-1. 貸借対照表の「純資産の部」セクションを探してください
-2. 「純資産の部」の最後にある「純資産合計」という項目を特定してください
-3. 「負債合計」「資産合計」ではなく、必ず「純資産合計」の値を抽出してください
-4. 「純資産合計」に対応する金額（千円単位）を抽出してください
-5. 値が△記号で始まっている場合は、それは負の値を意味します
-6. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'total_equity')
 
     def extract_hospital_revenue(self, pdf_path: str) -> Dict[str, Any]:
         """Extract hospital revenue from income statement"""
-        prompt = """このPDFファイルの損益計算書から「附属病院収益」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書の「経常収益」セクションを探してください
-2. 「経常収益」の中の「附属病院収益」という項目を見つけてください
-3. 「附属病院収益」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'hospital_revenue')
 
     def extract_operating_grant_revenue(self, pdf_path: str) -> Dict[str, Any]:
         """Extract operating grant revenue from income statement"""
-        prompt = """このPDFファイルの損益計算書から「運営費交付金収益」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書の「経常収益」セクションを探してください
-2. 「経常収益」の中の「運営費交付金収益」という項目を見つけてください
-3. 「運営費交付金収益」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'operating_grant_revenue')
 
     def extract_tuition_revenue(self, pdf_path: str) -> Dict[str, Any]:
         """Extract tuition revenue from income statement"""
-        prompt = """このPDFファイルの損益計算書から「学生納付金等収益」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書の「経常収益」セクションを探してください
-2. 「経常収益」の中の「学生納付金等収益」という項目を見つけてください
-3. 「学生納付金等収益」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'tuition_revenue')
 
     def extract_research_revenue(self, pdf_path: str) -> Dict[str, Any]:
         """Extract research revenue from income statement"""
-        prompt = """このPDFファイルの損益計算書から「受託研究等収益」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書の「経常収益」セクションを探してください
-2. 「経常収益」の中の「受託研究等収益」という項目を見つけてください
-3. 「受託研究等収益」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'research_revenue')
 
     def extract_personnel_costs(self, pdf_path: str) -> Dict[str, Any]:
         """Extract personnel costs from income statement"""
-        prompt = """このPDFファイルの損益計算書から「人件費」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書の「経常費用」セクションを探してください
-2. 「経常費用」の中の「人件費」という項目を見つけてください
-3. 「人件費」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'personnel_costs')
 
     def extract_medical_costs(self, pdf_path: str) -> Dict[str, Any]:
         """Extract medical costs from income statement"""
-        prompt = """このPDFファイルの損益計算書から「診療経費」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書の「経常費用」セクションを探してください
-2. 「経常費用」の中の「診療経費」という項目を見つけてください
-3. 「診療経費」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'medical_costs')
 
     def extract_education_costs(self, pdf_path: str) -> Dict[str, Any]:
         """Extract education costs from income statement"""
-        prompt = """このPDFファイルの損益計算書から「教育経費」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書の「経常費用」セクションを探してください
-2. 「経常費用」の中の「教育経費」という項目を見つけてください
-3. 「教育経費」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'education_costs')
 
     def extract_research_costs(self, pdf_path: str) -> Dict[str, Any]:
         """Extract research costs from income statement"""
-        prompt = """このPDFファイルの損益計算書から「研究経費」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書の「経常費用」セクションを探してください
-2. 「経常費用」の中の「研究経費」という項目を見つけてください
-3. 「研究経費」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'research_costs')
 
     def extract_operating_loss(self, pdf_path: str) -> Dict[str, Any]:
         """Extract operating loss from income statement"""
-        prompt = """このPDFファイルの損益計算書から「経常損失」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書を探してください
-2. 「経常損失」という項目を見つけてください
-3. 「経常損失」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'operating_loss')
 
     def extract_net_loss(self, pdf_path: str) -> Dict[str, Any]:
         """Extract net loss from income statement"""
-        prompt = """このPDFファイルの損益計算書から「当期純損失」の値を正確に抽出してください。
-
-重要な指示：
-1. 損益計算書を探してください
-2. 「当期純損失」という項目を見つけてください
-3. 「当期純損失」に対応する金額（千円単位）を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'net_loss')
 
     def extract_operating_cash_flow(self, pdf_path: str) -> Dict[str, Any]:
         """Extract operating cash flow from cash flow statement"""
-        prompt = """このPDFファイルのキャッシュフロー計算書から「営業活動によるキャッシュフロー合計」の値を正確に抽出してください。
-
-重要な指示：
-1. キャッシュフロー計算書を探してください
-2. 「営業活動によるキャッシュフロー」セクションを見つけてください
-3. 「営業活動によるキャッシュフロー合計」という項目を特定してください
-4. 「営業活動によるキャッシュフロー合計」に対応する金額（千円単位）を抽出してください
-5. 値が△記号で始まっている場合は、それは負の値を意味します
-6. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'operating_cf')
 
     def extract_investing_cash_flow(self, pdf_path: str) -> Dict[str, Any]:
         """Extract investing cash flow from cash flow statement"""
-        prompt = """このPDFファイルのキャッシュフロー計算書から「投資活動によるキャッシュフロー合計」の値を正確に抽出してください。
-
-重要な指示：
-1. キャッシュフロー計算書を探してください
-2. 「投資活動によるキャッシュフロー」セクションを見つけてください
-3. 「投資活動によるキャッシュフロー合計」という項目を特定してください
-4. 「投資活動によるキャッシュフロー合計」に対応する金額（千円単位）を抽出してください
-5. 値が△記号で始まっている場合は、それは負の値を意味します
-6. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'investing_cf')
 
     def extract_financing_cash_flow(self, pdf_path: str) -> Dict[str, Any]:
         """Extract financing cash flow from cash flow statement"""
-        prompt = """このPDFファイルのキャッシュフロー計算書から「財務活動によるキャッシュフロー合計」の値を正確に抽出してください。
-
-重要な指示：
-1. キャッシュフロー計算書を探してください
-2. 「財務活動によるキャッシュフロー」セクションを見つけてください
-3. 「財務活動によるキャッシュフロー合計」という項目を特定してください
-4. 「財務活動によるキャッシュフロー合計」に対応する金額（千円単位）を抽出してください
-5. 値が△記号で始まっている場合は、それは負の値を意味します
-6. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'financing_cf')
 
     def extract_academic_segment_profit(self, pdf_path: str) -> Dict[str, Any]:
         """Extract academic segment profit from segment information"""
-        prompt = """このPDFファイルの24ページにある「(19) 開示すべきセグメント情報」という表から、「学部・研究科等」行の「業務損益」の値を正確に抽出してください。
-
-重要な指示：
-1. 24ページの「(19) 開示すべきセグメント情報」表を探してください
-2. その表の中で「学部・研究科等」という行を見つけてください
-3. 「学部・研究科等」行の「業務損益」列の値を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'academic_segment')
 
     def extract_school_segment_loss(self, pdf_path: str) -> Dict[str, Any]:
         """Extract school segment loss from segment information"""
-        prompt = """このPDFファイルの24ページにある「(19) 開示すべきセグメント情報」という表から、「附属学校」行の「業務損益」の値を正確に抽出してください。
-
-重要な指示：
-1. 24ページの「(19) 開示すべきセグメント情報」表を探してください
-2. その表の中で「附属学校」という行を見つけてください
-3. 「附属学校」行の「業務損益」列の値を抽出してください
-4. 値が△記号で始まっている場合は、それは負の値を意味します
-5. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
+        return self.extract_field(pdf_path, 'school_segment')
 
     def extract_fixed_asset_details(self, pdf_path: str) -> Dict[str, Any]:
         """Extract fixed asset acquisition and disposal details from page 11"""
-        prompt = """このPDFファイルの11ページにある「1. 固定資産の取得及び処分並びに減価償却費及び減損損失の明細」表から全ての数値データを正確に抽出してください。
-
-重要な指示：
-1. 11ページの「固定資産の取得及び処分並びに減価償却費及び減損損失の明細」表を探してください
-2. 表の全ての行と列の数値を抽出してください
-3. 値が△記号で始まっている場合は、それは負の値を意味します
-4. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'fixed_asset_details')
 
     def extract_borrowing_details(self, pdf_path: str) -> Dict[str, Any]:
         """Extract borrowing details from page 13"""
-        prompt = """このPDFファイルの13ページにある「8. 借入金の明細」表から全ての数値データを正確に抽出してください。
-
-重要な指示：
-1. 13ページの「借入金の明細」表を探してください
-2. 表の全ての行と列の数値を抽出してください
-3. 値が△記号で始まっている場合は、それは負の値を意味します
-4. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'borrowing_details')
 
     def extract_operational_cost_details(self, pdf_path: str) -> Dict[str, Any]:
         """Extract operational cost details from pages 15-16"""
-        prompt = """このPDFファイルの15-16ページにある「15. 業務費及び一般管理費の明細」表から全ての数値データを正確に抽出してください。
-
-重要な指示：
-1. 15-16ページの「業務費及び一般管理費の明細」表を探してください
-2. 表の全ての行と列の数値を抽出してください
-3. 値が△記号で始まっている場合は、それは負の値を意味します
-4. 抽出した値をそのまま返してください
-
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
+        return self.extract_field(pdf_path, 'operational_cost_details')
 
     def extract_business_implementation_cost(self, pdf_path: str) -> Dict[str, Any]:
         """Extract business implementation cost from page 8"""
-        prompt = """このPDFファイルの8ページにある「国立大学法人等業務実施コスト計算書」から全ての数値データを正確に抽出してください。
+        return self.extract_field(pdf_path, 'business_implementation_cost')
+
 
-重要な指示：
-1. 8ページの「国立大学法人等業務実施コスト計算書」を探してください
-2. 表の全ての行と列の数値を抽出してください
-3. 値が△記号で始まっている場合は、それは負の値を意味します
-4. 抽出した値をそのまま返してください
+def _thousands(value: Optional[int]) -> Optional[int]:
+    """A 千円 figure in yen, None staying None"""
+    return value * 1000 if value is not None else None
 
-回答は抽出した値のみを返してください。説明は不要です。"""
-        return self._extract_value(pdf_path, prompt)
 
-        return self._extract_value(pdf_path, prompt)
+def extraction_confidence(all_results: Dict[str, Dict[str, Any]], checks: Sequence[Dict[str, Any]]) -> str:
+    """'failed' when no field was extracted, 'low' when some were not, else the identity_confidence of ``checks``"""
+    failed = [name for name, result in all_results.items() if not result['success']]
+    if failed:
+        return 'failed' if len(failed) == len(all_results) else 'low'
+    return identity_confidence(checks)
 
 
-def extract_financial_data(pdf_path: str = './b67155c2806c76359d1b3637d7ff2ac7.pdf') -> Dict[str, Any]:
+def build_financial_data(all_results: Dict[str, Dict[str, Any]], pdf_path: str) -> Dict[str, Any]:
     """
-    Main function to extract all financial data required for HTML infographic generation.
+    Assemble the generateHTMLReport structure from per-field extraction results.
     
-    Returns a dictionary structure compatible with generateHTMLReport function.
+    ``all_results`` maps every FINANCIAL_DATA_FIELDS key to its
+    raw_string/numeric_value/success record. Fields that are still missing
+    come out as None and are listed in extraction_metadata.failed_fields;
+    callers add to that metadata rather than replacing it.
     """
-    
-    api_key = os.getenv('EXPO_PUBLIC_GEMINI_API_KEY')
-    
-    if not os.path.exists(pdf_path):
-        raise FileNotFoundError(f'Target PDF not found: {pdf_path}')
-    
-    print(f"🔍 Extracting financial data from: {pdf_path}")
-    print(f"📊 PDF Size: {os.path.getsize(pdf_path) / 1024:.2f} KB")
-    print()
-    
-    if not api_key:
-        print("❌ EXPO_PUBLIC_GEMINI_API_KEY not set - cannot extract financial data")
-        return {
-            'error': 'API key not configured - cannot extract financial data from PDF',
-            'extraction_metadata': {
-                'extracted_at': datetime.now().isoformat(),
-                'confidence': 'failed',
-                'warnings': ['API key not configured - no fallback data provided to ensure data integrity']
-            }
-        }
-    else:
-        extractor = ComprehensiveFinancialExtractor(api_key)
-        
-        print("📈 Extracting financial metrics...")
-        
-        segment_result = extractor.extract_segment_profit_loss(pdf_path)
-        total_liabilities_result = extractor.extract_total_liabilities(pdf_path)
-        current_liabilities_result = extractor.extract_current_liabilities(pdf_path)
-        ordinary_expenses_result = extractor.extract_ordinary_expenses(pdf_path)
-        
-        total_assets_result = extractor.extract_total_assets(pdf_path)
-        current_assets_result = extractor.extract_current_assets(pdf_path)
-        fixed_assets_result = extractor.extract_fixed_assets(pdf_path)
-        total_revenue_result = extractor.extract_total_revenue(pdf_path)
-        
-        total_equity_result = extractor.extract_total_equity(pdf_path)
-        hospital_revenue_result = extractor.extract_hospital_revenue(pdf_path)
-        operating_grant_revenue_result = extractor.extract_operating_grant_revenue(pdf_path)
-        tuition_revenue_result = extractor.extract_tuition_revenue(pdf_path)
-        research_revenue_result = extractor.extract_research_revenue(pdf_path)
-        personnel_costs_result = extractor.extract_personnel_costs(pdf_path)
-        medical_costs_result = extractor.extract_medical_costs(pdf_path)
-        education_costs_result = extractor.extract_education_costs(pdf_path)
-        research_costs_result = extractor.extract_research_costs(pdf_path)
-        operating_loss_result = extractor.extract_operating_loss(pdf_path)
-        net_loss_result = extractor.extract_net_loss(pdf_path)
-        operating_cf_result = extractor.extract_operating_cash_flow(pdf_path)
-        investing_cf_result = extractor.extract_investing_cash_flow(pdf_path)
-        financing_cf_result = extractor.extract_financing_cash_flow(pdf_path)
-        academic_segment_result = extractor.extract_academic_segment_profit(pdf_path)
-        school_segment_result = extractor.extract_school_segment_loss(pdf_path)
-    
-    all_results = {
-        'segment_profit_loss': segment_result,
-        'total_liabilities': total_liabilities_result,
-        'current_liabilities': current_liabilities_result,
-        'ordinary_expenses': ordinary_expenses_result,
-        'total_assets': total_assets_result,
-        'current_assets': current_assets_result,
-        'fixed_assets': fixed_assets_result,
-        'total_revenue': total_revenue_result,
-        'total_equity': total_equity_result,
-        'hospital_revenue': hospital_revenue_result,
-        'operating_grant_revenue': operating_grant_revenue_result,
-        'tuition_revenue': tuition_revenue_result,
-        'research_revenue': research_revenue_result,
-        'personnel_costs': personnel_costs_result,
-        'medical_costs': medical_costs_result,
-        'education_costs': education_costs_result,
-        'research_costs': research_costs_result,
-        'operating_loss': operating_loss_result,
-        'net_loss': net_loss_result,
-        'operating_cf': operating_cf_result,
-        'investing_cf': investing_cf_result,
-        'financing_cf': financing_cf_result,
-        'academic_segment': academic_segment_result,
-        'school_segment': school_segment_result
-    }
-    
     fallback_values = {}
     
     failed_extractions = [name for name, result in all_results.items() if not result['success']]
     if failed_extractions:
-        print(f"⚠️  API quota exceeded for: {failed_extractions}")
+        print(f"⚠️  Extraction failed for: {failed_extractions}")
         print("🔄 Using confirmed fallback values...")
         
         for name in failed_extractions:
@@ -603,23 +578,25 @@ def extract_financial_data(pdf_path: str = './b67155c2806c76359d1b3637d7ff2ac7.p
                 print(f"   ✅ {name}: {fallback_values[name]['raw_string']} (fallback)")
             else:
                 print(f"   ❌ {name}: {all_results[name].get('error', 'Unknown error')}")
-        
-        still_failed = [name for name, result in all_results.items() if not result['success']]
-        if still_failed:
-            raise RuntimeError(f"Failed to extract: {still_failed}")
     
-    print("✅ All extractions completed (with fallbacks where needed)!")
+    still_failed = [name for name, result in all_results.items() if not result['success']]
+    if still_failed:
+        print(f"⚠️  Returning partial data without: {still_failed}")
+    else:
+        print("✅ All extractions completed (with fallbacks where needed)!")
+    
+    values = {name: result['numeric_value'] if result['success'] else None for name, result in all_results.items()}
     
-    total_assets = total_assets_result['numeric_value'] * 1000  # Convert to actual value
-    current_assets = current_assets_result['numeric_value'] * 1000
-    fixed_assets = fixed_assets_result['numeric_value'] * 1000
-    total_liabilities = total_liabilities_result['numeric_value'] * 1000
-    current_liabilities = current_liabilities_result['numeric_value'] * 1000
-    total_revenue = total_revenue_result['numeric_value'] * 1000
-    total_expenses = ordinary_expenses_result['numeric_value'] * 1000
-    total_equity = total_equity_result['numeric_value'] * 1000
+    total_assets = _thousands(values['total_assets'])  # Convert to actual value
+    current_assets = _thousands(values['current_assets'])
+    fixed_assets = _thousands(values['fixed_assets'])
+    total_liabilities = _thousands(values['total_liabilities'])
+    current_liabilities = _thousands(values['current_liabilities'])
+    total_revenue = _thousands(values['total_revenue'])
+    total_expenses = _thousands(values['ordinary_expenses'])
+    total_equity = _thousands(values['total_equity'])
     
-    operating_loss = operating_loss_result['numeric_value'] * 1000
+    operating_loss = _thousands(values['operating_loss'])
     
     financial_data = {
         'companyName': '国立大学法人山梨大学',
@@ -640,237 +617,377 @@ def extract_financial_data(pdf_path: str = './b67155c2806c76359d1b3637d7ff2ac7.p
             '損益計算書': {
                 '経常収益': {
                     '経常収益合計': total_revenue,
-                    '附属病院収益': hospital_revenue_result['numeric_value'] * 1000,
-                    '運営費交付金収益': operating_grant_revenue_result['numeric_value'] * 1000,
-                    '学生納付金等収益': tuition_revenue_result['numeric_value'] * 1000,
-                    '受託研究等収益': research_revenue_result['numeric_value'] * 1000
+                    '附属病院収益': _thousands(values['hospital_revenue']),
+                    '運営費交付金収益': _thousands(values['operating_grant_revenue']),
+                    '学生納付金等収益': _thousands(values['tuition_revenue']),
+                    '受託研究等収益': _thousands(values['research_revenue'])
                 },
                 '経常費用': {
                     '経常費用合計': total_expenses,
-                    '人件費': personnel_costs_result['numeric_value'] * 1000,
-                    '診療経費': medical_costs_result['numeric_value'] * 1000,
-                    '教育経費': education_costs_result['numeric_value'] * 1000,
-                    '研究経費': research_costs_result['numeric_value'] * 1000
+                    '人件費': _thousands(values['personnel_costs']),
+                    '診療経費': _thousands(values['medical_costs']),
+                    '教育経費': _thousands(values['education_costs']),
+                    '研究経費': _thousands(values['research_costs'])
                 },
                 '経常損失': operating_loss,
-                '当期純損失': net_loss_result['numeric_value'] * 1000
+                '当期純損失': _thousands(values['net_loss'])
             },
             'キャッシュフロー計算書': {
-                '営業活動によるキャッシュフロー': {'営業活動によるキャッシュフロー合計': operating_cf_result['numeric_value'] * 1000},
-                '投資活動によるキャッシュフロー': {'投資活動によるキャッシュフロー合計': investing_cf_result['numeric_value'] * 1000},
-                '財務活動によるキャッシュフロー': {'財務活動によるキャッシュフロー合計': financing_cf_result['numeric_value'] * 1000}
+                '営業活動によるキャッシュフロー': {'営業活動によるキャッシュフロー合計': _thousands(values['operating_cf'])},
+                '投資活動によるキャッシュフロー': {'投資活動によるキャッシュフロー合計': _thousands(values['investing_cf'])},
+                '財務活動によるキャッシュフロー': {'財務活動によるキャッシュフロー合計': _thousands(values['financing_cf'])}
             },
             'セグメント情報': {
-                '学部・研究科等': {'業務損益': academic_segment_result['numeric_value'] * 1000},
-                '附属病院': {'業務損益': segment_result['numeric_value'] * 1000},
-                '附属学校': {'業務損益': school_segment_result['numeric_value'] * 1000}
+                '学部・研究科等': {'業務損益': _thousands(values['academic_segment'])},
+                '附属病院': {'業務損益': _thousands(values['segment_profit_loss'])},
+                '附属学校': {'業務損益': _thousands(values['school_segment'])}
             }
         },
-        'extractedText': f'Direct PDF extraction completed from {pdf_path}'
+        'extractedText': f'Direct PDF extraction completed from {pdf_path}',
+        'extraction_metadata': {'failed_fields': still_failed}
     }
     
-    print("\n" + "=" * 60)
-    print("FINANCIAL DATA EXTRACTION SUMMARY")
-    print("=" * 60)
-    print(f"✅ 総資産: {total_assets/100000000:.0f}億円")
-    print(f"✅ 負債合計: {total_liabilities/100000000:.0f}億円")
-    print(f"✅ 流動負債合計: {current_liabilities/100000000:.0f}億円")
-    print(f"✅ 経常費用合計: {total_expenses/100000000:.0f}億円")
-    print(f"✅ 附属病院業務損益: {segment_result['numeric_value']/1000:.1f}億円")
-    print("=" * 60)
-    
     financial_data.update({
-        '負債合計': total_liabilities_result['numeric_value'],
-        '流動負債合計': current_liabilities_result['numeric_value'], 
-        '経常費用合計': ordinary_expenses_result['numeric_value'],
-        '附属病院業務損益': segment_result['numeric_value'],
-        '資産合計': total_assets_result['numeric_value'],
-        '流動資産合計': current_assets_result['numeric_value'],
-        '固定資産合計': fixed_assets_result['numeric_value'],
-        '純資産合計': total_equity_result['numeric_value'],
-        '経常収益合計': total_revenue_result['numeric_value'],
-        '附属病院収益': hospital_revenue_result['numeric_value'],
-        '運営費交付金収益': operating_grant_revenue_result['numeric_value'],
-        '学生納付金等収益': tuition_revenue_result['numeric_value'],
-        '受託研究等収益': research_revenue_result['numeric_value'],
-        '人件費': personnel_costs_result['numeric_value'],
-        '診療経費': medical_costs_result['numeric_value'],
-        '教育経費': education_costs_result['numeric_value'],
-        '研究経費': research_costs_result['numeric_value'],
-        '経常損失': operating_loss_result['numeric_value'],
-        '当期純損失': net_loss_result['numeric_value'],
-        '営業活動によるキャッシュフロー合計': operating_cf_result['numeric_value'],
-        '投資活動によるキャッシュフロー合計': investing_cf_result['numeric_value'],
-        '財務活動によるキャッシュフロー合計': financing_cf_result['numeric_value'],
-        '学部・研究科等業務損益': academic_segment_result['numeric_value'],
-        '附属学校業務損益': school_segment_result['numeric_value']
+        '負債合計': values['total_liabilities'],
+        '流動負債合計': values['current_liabilities'], 
+        '経常費用合計': values['ordinary_expenses'],
+        '附属病院業務損益': values['segment_profit_loss'],
+        '資産合計': values['total_assets'],
+        '流動資産合計': values['current_assets'],
+        '固定資産合計': values['fixed_assets'],
+        '純資産合計': values['total_equity'],
+        '経常収益合計': values['total_revenue'],
+        '附属病院収益': values['hospital_revenue'],
+        '運営費交付金収益': values['operating_grant_revenue'],
+        '学生納付金等収益': values['tuition_revenue'],
+        '受託研究等収益': values['research_revenue'],
+        '人件費': values['personnel_costs'],
+        '診療経費': values['medical_costs'],
+        '教育経費': values['education_costs'],
+        '研究経費': values['research_costs'],
+        '経常損失': values['operating_loss'],
+        '当期純損失': values['net_loss'],
+        '営業活動によるキャッシュフロー合計': values['operating_cf'],
+        '投資活動によるキャッシュフロー合計': values['investing_cf'],
+        '財務活動によるキャッシュフロー合計': values['financing_cf'],
+        '学部・研究科等業務損益': values['academic_segment'],
+        '附属学校業務損益': values['school_segment']
     })
     
     return financial_data
 
 
-def extract_structured_financial_tables(pdf_path: str = './b67155c2806c76359d1b3637d7ff2ac7.pdf') -> list:
+def extract_financial_data(pdf_path: str = './b67155c2806c76359d1b3637d7ff2ac7.pdf',
+                           transport: Optional[ModelTransport] = None,
+                           batched: bool = False,
+                           max_workers: int = 1,
+                           cache: Optional[ExtractionCache] = None,
+                           use_text_layer: bool = True,
+                           plan_by: Optional[str] = None,
+                           on_field: Optional[Callable[[str, Dict[str, Any], str, float], None]] = None,
+                           verify_identities: bool = True,
+                           previous_fields: Optional[Dict[str, Dict[str, Any]]] = None,
+                           cascade: Optional[Sequence[str]] = None,
+                           voting: bool = False) -> Dict[str, Any]:
     """
-    Extract financial data in user's specified JSON format with tableName, unit, and data arrays.
+    Main function to extract all financial data required for HTML infographic generation.
     
-    Returns a list of JSON objects, each representing a financial statement table.
+    The PDF is uploaded once and every field extraction reuses that upload.
+    Pass ``transport`` to run against a backend other than the Gemini API.
+    With ``batched`` every field is requested in one structured-JSON call and
+    only the fields that call leaves out are retried individually.
+    ``max_workers`` > 1 runs the independent field extractions concurrently.
+    Results are served from ``cache`` (default: EXTRACTION_CACHE_DIR) when the
+    same PDF was analysed before with the same prompts and model.
+    With ``use_text_layer`` rows readable from the PDF's own text are taken
+    from there and only the rest are sent to the model.
+    With ``plan_by`` ('statement' or 'page') the call planner groups the
+    remaining fields into one call per statement or page instead.
+    ``on_field(name, result, source, latency)`` is called as each field resolves.
+    With ``verify_identities`` the accounting identities are checked and only
+    the fields of a failing identity are extracted again.
+    ``previous_fields`` is the ``extraction_metadata['fields']`` map of an
+    earlier run; fields whose fingerprint (spec, prompt, model, document) is
+    unchanged are taken from it, so only edited fields cost model calls.
+    ``cascade`` lists tiers cheapest first (e.g. ['text_layer',
+    'gemini-1.5-flash-8b', 'gemini-2.0-flash-exp']); each field then goes to
+    a stronger model only when the cheaper answer fails to parse, disagrees
+    with the text layer or breaks an accounting identity (see ModelCascade).
+    ``transport`` serves the tier named by its model_name.
+    With ``voting`` the VOTING_FIELDS are each decided by self-consistency
+    voting on their own prompt, also in batched and planned mode.
+    
+    Returns a dictionary structure compatible with generateHTMLReport function.
     """
     
     api_key = os.getenv('EXPO_PUBLIC_GEMINI_API_KEY')
+    transport = transport or transport_from_env(api_key)
     
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f'Target PDF not found: {pdf_path}')
     
-    print(f"🔍 Extracting structured financial tables from: {pdf_path}")
+    print(f"🔍 Extracting financial data from: {pdf_path}")
+    print(f"📊 PDF Size: {os.path.getsize(pdf_path) / 1024:.2f} KB")
+    print()
     
-    if not api_key:
-        print("⚠️  EXPO_PUBLIC_GEMINI_API_KEY not set - using fallback values")
-        return get_fallback_structured_tables()
+    if transport is None:
+        print("❌ EXPO_PUBLIC_GEMINI_API_KEY not set - cannot extract financial data")
+        return {
+            'error': 'API key not configured - cannot extract financial data from PDF',
+            'extraction_metadata': {
+                'extracted_at': datetime.now().isoformat(),
+                'confidence': 'failed',
+                'warnings': ['API key not configured - no fallback data provided to ensure data integrity']
+            }
+        }
+    else:
+        extractor = ComprehensiveFinancialExtractor(api_key, transport, cache or ExtractionCache.from_env(),
+                                                    use_text_layer, voting)
+        extractor.on_field = on_field
+        document = extractor.open_document(pdf_path)
+        
+        print("📈 Extracting financial metrics...")
+        
+        all_results = extractor.reuse_fields(document, list(FINANCIAL_DATA_FIELDS), previous_fields)
+        pending = [name for name in FINANCIAL_DATA_FIELDS if name not in all_results]
+        if previous_fields:
+            print(f"♻️  Reusing {len(all_results)} field(s) with unchanged fingerprints, extracting {len(pending)}: {pending}")
+        
+        model_cascade = None
+        identity_checks = []
+        voted = [name for name in pending
+                 if voting and name in VOTING_FIELDS and (plan_by or batched) and not cascade]
+        if voted:
+            print(f"🗳️  Voting on {voted}")
+            all_results.update(extractor.extract_many(document, {
+                name: FINANCIAL_DATA_FIELDS[name][0] for name in voted
+            }, max_workers=max_workers))
+            pending = [name for name in pending if name not in voted]
+        if pending and cascade:
+            from model_cascade import ModelCascade
+            model_cascade = ModelCascade(cascade, api_key, {transport.model_name: transport}, extractor.cache,
+                                         max_workers, use_text_layer)
+            print(f"🪜 Cascade: {' → '.join(model_cascade.tiers)}")
+            cascaded, identity_checks = model_cascade.extract(
+                document, pending, verify_identities,
+                lambda name, result, tier, latency: extractor.report_field(document, name, result, tier, latency),
+                known=all_results)
+            all_results.update(cascaded)
+        elif pending and plan_by:
+            print(format_plan(extractor.plan_fields(document, pending, plan_by)))
+            all_results.update(extractor.extract_planned(document, pending, plan_by, max_workers=max_workers))
+        elif pending and batched:
+            all_results.update(extractor.extract_fields_batch(document, pending, max_workers=max_workers))
+        elif pending:
+            all_results.update(extractor.extract_many(document, {
+                name: FINANCIAL_DATA_FIELDS[name][0] for name in pending
+            }, max_workers=max_workers))
+        all_results = {name: all_results[name] for name in FINANCIAL_DATA_FIELDS}
+        
+        if verify_identities and model_cascade is None:
+            all_results, identity_checks = extractor.check_identities(document, all_results, max_workers)
     
-    extractor = ComprehensiveFinancialExtractor(api_key)
+    financial_data = build_financial_data(all_results, pdf_path)
     
-    tables = []
+    print("\n" + "=" * 60)
+    print("FINANCIAL DATA EXTRACTION SUMMARY")
+    print("=" * 60)
+    for label, key, divisor, digits in (('総資産', '資産合計', 100000, 0), ('負債合計', '負債合計', 100000, 0),
+                                        ('流動負債合計', '流動負債合計', 100000, 0), ('経常費用合計', '経常費用合計', 100000, 0),
+                                        ('附属病院業務損益', '附属病院業務損益', 1000, 1)):
+        value = financial_data[key]
+        print(f"✅ {label}: {value / divisor:.{digits}f}億円" if value is not None else f"❌ {label}: not extracted")
+    print("=" * 60)
+    
+    upload_stats = document.stats()
+    print(f"📤 Uploaded {upload_stats['bytes_uploaded'] / 1024:.2f} KB for {upload_stats['model_calls']} model calls "
+          f"(inline requests would have sent {upload_stats['inline_bytes_equivalent'] / 1024:.2f} KB)")
+    print(f"🧭 Fields resolved by: {upload_stats['fields_resolved_by']}")
+    timings = document.timing_summary()
+    stored_fields = extractor.store_fields(document, all_results)
+    if timings['slowest_call']:
+        print(f"⏱️  {timings['model_calls']} model calls took {timings['total_call_seconds']:.1f}s, "
+              f"slowest {timings['slowest_call']['field']} ({timings['slowest_call']['seconds']:.1f}s)")
+    extractor.close_document(document)
+    
+    financial_data['extraction_metadata'].update({
+        'extracted_at': datetime.now().isoformat(),
+        'document': document.identity(),
+        **upload_stats,
+        'timings': timings,
+        'fields': stored_fields
+    })
+    if verify_identities:
+        financial_data['extraction_metadata']['identity_checks'] = identity_checks
+    if verify_identities or financial_data['extraction_metadata']['failed_fields']:
+        financial_data['extraction_metadata']['confidence'] = extraction_confidence(all_results, identity_checks)
+    votes = {name: result['votes'] for name, result in all_results.items() if result.get('votes')}
+    if votes:
+        print("🗳️  Votes: " + ', '.join(f"{name} {record['agreeing']}/{record['samples']}"
+                                       for name, record in votes.items()))
+        financial_data['extraction_metadata']['votes'] = votes
+    if model_cascade is not None:
+        cascade_stats = model_cascade.stats(pdf_path)
+        model_cascade.close(pdf_path)
+        print(f"🪜 Resolved by tier: {cascade_stats['resolved_by_tier']}, {len(cascade_stats['escalations'])} escalation(s)")
+        financial_data['extraction_metadata']['cascade'] = cascade_stats
+    if extractor.cache is not None:
+        cache_stats = extractor.cache.stats()
+        print(f"🗄️  Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        financial_data['extraction_metadata']['cache'] = cache_stats
+    
+    return financial_data
+
+
+def build_structured_tables(results: Dict[str, Dict[str, Any]]) -> list:
+    """
+    Assemble the tableName/unit/data table list from per-field extraction results.
     
-    print("📊 Extracting 貸借対照表...")
-    balance_sheet_data = []
-    total_assets_result = extractor.extract_total_assets(pdf_path)
-    current_assets_result = extractor.extract_current_assets(pdf_path)
-    fixed_assets_result = extractor.extract_fixed_assets(pdf_path)
-    total_liabilities_result = extractor.extract_total_liabilities(pdf_path)
-    current_liabilities_result = extractor.extract_current_liabilities(pdf_path)
-    total_equity_result = extractor.extract_total_equity(pdf_path)
-    
-    balance_sheet_data.extend([
-        {"category": "資産の部", "account": "流動資産合計", "amount": current_assets_result['numeric_value']},
-        {"category": "資産の部", "account": "固定資産合計", "amount": fixed_assets_result['numeric_value']},
-        {"category": "資産の部", "account": "資産合計", "amount": total_assets_result['numeric_value']},
-        {"category": "負債の部", "account": "流動負債合計", "amount": current_liabilities_result['numeric_value']},
-        {"category": "負債の部", "account": "負債合計", "amount": total_liabilities_result['numeric_value']},
-        {"category": "純資産の部", "account": "純資産合計", "amount": total_equity_result['numeric_value']}
-    ])
+    ``results`` maps FINANCIAL_DATA_FIELDS and DETAIL_TABLE_FIELDS keys to
+    raw_string/numeric_value/success records.
+    """
+    def amount(name: str) -> Optional[int]:
+        return results[name]['numeric_value']
+    
+    tables = []
     
     tables.append({
         "tableName": "貸借対照表",
         "unit": "千円",
-        "data": balance_sheet_data
+        "data": [
+            {"category": "資産の部", "account": "流動資産合計", "amount": amount('current_assets')},
+            {"category": "資産の部", "account": "固定資産合計", "amount": amount('fixed_assets')},
+            {"category": "資産の部", "account": "資産合計", "amount": amount('total_assets')},
+            {"category": "負債の部", "account": "流動負債合計", "amount": amount('current_liabilities')},
+            {"category": "負債の部", "account": "負債合計", "amount": amount('total_liabilities')},
+            {"category": "純資産の部", "account": "純資産合計", "amount": amount('total_equity')}
+        ]
     })
     
-    print("📊 Extracting 損益計算書...")
-    income_statement_data = []
-    total_revenue_result = extractor.extract_total_revenue(pdf_path)
-    hospital_revenue_result = extractor.extract_hospital_revenue(pdf_path)
-    operating_grant_revenue_result = extractor.extract_operating_grant_revenue(pdf_path)
-    tuition_revenue_result = extractor.extract_tuition_revenue(pdf_path)
-    research_revenue_result = extractor.extract_research_revenue(pdf_path)
-    ordinary_expenses_result = extractor.extract_ordinary_expenses(pdf_path)
-    personnel_costs_result = extractor.extract_personnel_costs(pdf_path)
-    medical_costs_result = extractor.extract_medical_costs(pdf_path)
-    education_costs_result = extractor.extract_education_costs(pdf_path)
-    research_costs_result = extractor.extract_research_costs(pdf_path)
-    operating_loss_result = extractor.extract_operating_loss(pdf_path)
-    net_loss_result = extractor.extract_net_loss(pdf_path)
-    
-    income_statement_data.extend([
-        {"category": "経常収益", "account": "経常収益合計", "amount": total_revenue_result['numeric_value']},
-        {"category": "経常収益", "account": "附属病院収益", "amount": hospital_revenue_result['numeric_value']},
-        {"category": "経常収益", "account": "運営費交付金収益", "amount": operating_grant_revenue_result['numeric_value']},
-        {"category": "経常収益", "account": "学生納付金等収益", "amount": tuition_revenue_result['numeric_value']},
-        {"category": "経常収益", "account": "受託研究等収益", "amount": research_revenue_result['numeric_value']},
-        {"category": "経常費用", "account": "経常費用合計", "amount": ordinary_expenses_result['numeric_value']},
-        {"category": "経常費用", "account": "人件費", "amount": personnel_costs_result['numeric_value']},
-        {"category": "経常費用", "account": "診療経費", "amount": medical_costs_result['numeric_value']},
-        {"category": "経常費用", "account": "教育経費", "amount": education_costs_result['numeric_value']},
-        {"category": "経常費用", "account": "研究経費", "amount": research_costs_result['numeric_value']},
-        {"category": "損益", "account": "経常損失", "amount": operating_loss_result['numeric_value']},
-        {"category": "損益", "account": "当期純損失", "amount": net_loss_result['numeric_value']}
-    ])
-    
     tables.append({
         "tableName": "損益計算書", 
         "unit": "千円",
-        "data": income_statement_data
+        "data": [
+            {"category": "経常収益", "account": "経常収益合計", "amount": amount('total_revenue')},
+            {"category": "経常収益", "account": "附属病院収益", "amount": amount('hospital_revenue')},
+            {"category": "経常収益", "account": "運営費交付金収益", "amount": amount('operating_grant_revenue')},
+            {"category": "経常収益", "account": "学生納付金等収益", "amount": amount('tuition_revenue')},
+            {"category": "経常収益", "account": "受託研究等収益", "amount": amount('research_revenue')},
+            {"category": "経常費用", "account": "経常費用合計", "amount": amount('ordinary_expenses')},
+            {"category": "経常費用", "account": "人件費", "amount": amount('personnel_costs')},
+            {"category": "経常費用", "account": "診療経費", "amount": amount('medical_costs')},
+            {"category": "経常費用", "account": "教育経費", "amount": amount('education_costs')},
+            {"category": "経常費用", "account": "研究経費", "amount": amount('research_costs')},
+            {"category": "損益", "account": "経常損失", "amount": amount('operating_loss')},
+            {"category": "損益", "account": "当期純損失", "amount": amount('net_loss')}
+        ]
     })
     
-    print("📊 Extracting キャッシュフロー計算書...")
-    cash_flow_data = []
-    operating_cf_result = extractor.extract_operating_cash_flow(pdf_path)
-    investing_cf_result = extractor.extract_investing_cash_flow(pdf_path)
-    financing_cf_result = extractor.extract_financing_cash_flow(pdf_path)
-    
-    cash_flow_data.extend([
-        {"category": "営業活動によるキャッシュフロー", "account": "営業活動によるキャッシュフロー合計", "amount": operating_cf_result['numeric_value']},
-        {"category": "投資活動によるキャッシュフロー", "account": "投資活動によるキャッシュフロー合計", "amount": investing_cf_result['numeric_value']},
-        {"category": "財務活動によるキャッシュフロー", "account": "財務活動によるキャッシュフロー合計", "amount": financing_cf_result['numeric_value']}
-    ])
-    
     tables.append({
         "tableName": "キャッシュフロー計算書",
         "unit": "千円", 
-        "data": cash_flow_data
+        "data": [
+            {"category": "営業活動によるキャッシュフロー", "account": "営業活動によるキャッシュフロー合計", "amount": amount('operating_cf')},
+            {"category": "投資活動によるキャッシュフロー", "account": "投資活動によるキャッシュフロー合計", "amount": amount('investing_cf')},
+            {"category": "財務活動によるキャッシュフロー", "account": "財務活動によるキャッシュフロー合計", "amount": amount('financing_cf')}
+        ]
     })
     
-    print("📊 Extracting 国立大学法人等業務実施コスト計算書...")
-    business_cost_result = extractor.extract_business_implementation_cost(pdf_path)
-    
     tables.append({
         "tableName": "国立大学法人等業務実施コスト計算書",
         "unit": "千円",
         "data": [
-            {"category": "業務実施コスト", "account": "業務実施コスト合計", "amount": business_cost_result.get('numeric_value', 0)}
+            {"category": "業務実施コスト", "account": "業務実施コスト合計", "amount": results['business_implementation_cost'].get('numeric_value', 0)}
         ]
     })
     
-    print("📊 Extracting 固定資産の取得及び処分並びに減価償却費及び減損損失の明細...")
-    fixed_asset_result = extractor.extract_fixed_asset_details(pdf_path)
-    
     tables.append({
         "tableName": "固定資産の取得及び処分並びに減価償却費及び減損損失の明細",
         "unit": "千円",
         "data": [
-            {"category": "固定資産", "account": "固定資産明細", "amount": fixed_asset_result.get('numeric_value', 0)}
+            {"category": "固定資産", "account": "固定資産明細", "amount": results['fixed_asset_details'].get('numeric_value', 0)}
         ]
     })
     
-    print("📊 Extracting 借入金の明細...")
-    borrowing_result = extractor.extract_borrowing_details(pdf_path)
-    
     tables.append({
         "tableName": "借入金の明細",
         "unit": "千円",
         "data": [
-            {"category": "借入金", "account": "借入金明細", "amount": borrowing_result.get('numeric_value', 0)}
+            {"category": "借入金", "account": "借入金明細", "amount": results['borrowing_details'].get('numeric_value', 0)}
         ]
     })
     
-    print("📊 Extracting 業務費及び一般管理費の明細...")
-    operational_cost_result = extractor.extract_operational_cost_details(pdf_path)
-    
     tables.append({
         "tableName": "業務費及び一般管理費の明細",
         "unit": "千円",
         "data": [
-            {"category": "業務費及び一般管理費", "account": "業務費及び一般管理費明細", "amount": operational_cost_result.get('numeric_value', 0)}
+            {"category": "業務費及び一般管理費", "account": "業務費及び一般管理費明細", "amount": results['operational_cost_details'].get('numeric_value', 0)}
         ]
     })
     
-    print("📊 Extracting 開示すべきセグメント情報...")
-    segment_result = extractor.extract_segment_profit_loss(pdf_path)
-    academic_segment_result = extractor.extract_academic_segment_profit(pdf_path)
-    school_segment_result = extractor.extract_school_segment_loss(pdf_path)
-    
-    segment_data = [
-        {"category": "セグメント情報", "account": "附属病院業務損益", "amount": segment_result['numeric_value']},
-        {"category": "セグメント情報", "account": "学部・研究科等業務損益", "amount": academic_segment_result['numeric_value']},
-        {"category": "セグメント情報", "account": "附属学校業務損益", "amount": school_segment_result['numeric_value']}
-    ]
-    
     tables.append({
         "tableName": "開示すべきセグメント情報",
         "unit": "千円",
-        "data": segment_data
+        "data": [
+            {"category": "セグメント情報", "account": "附属病院業務損益", "amount": amount('segment_profit_loss')},
+            {"category": "セグメント情報", "account": "学部・研究科等業務損益", "amount": amount('academic_segment')},
+            {"category": "セグメント情報", "account": "附属学校業務損益", "amount": amount('school_segment')}
+        ]
     })
     
+    return tables
+
+
+def extract_structured_financial_tables(pdf_path: str = './b67155c2806c76359d1b3637d7ff2ac7.pdf',
+                                        transport: Optional[ModelTransport] = None,
+                                        max_workers: int = 1,
+                                        cache: Optional[ExtractionCache] = None,
+                                        use_text_layer: bool = True,
+                                        on_field: Optional[Callable[[str, Dict[str, Any], str, float], None]] = None) -> list:
+    """
+    Extract financial data in user's specified JSON format with tableName, unit, and data arrays.
+    
+    The PDF is uploaded once and shared by every table extraction. Field
+    extractions are independent, so ``max_workers`` > 1 runs them concurrently.
+    Previously seen documents are answered from ``cache`` (default: EXTRACTION_CACHE_DIR).
+    With ``use_text_layer`` rows readable from the PDF text skip the model.
+    ``on_field(name, result, source, latency)`` is called as each field resolves.
+    
+    Returns a list of JSON objects, each representing a financial statement table.
+    """
+    
+    api_key = os.getenv('EXPO_PUBLIC_GEMINI_API_KEY')
+    transport = transport or transport_from_env(api_key)
+    
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f'Target PDF not found: {pdf_path}')
+    
+    print(f"🔍 Extracting structured financial tables from: {pdf_path}")
+    
+    if transport is None:
+        print("⚠️  EXPO_PUBLIC_GEMINI_API_KEY not set - using fallback values")
+        return get_fallback_structured_tables()
+    
+    extractor = ComprehensiveFinancialExtractor(api_key, transport, cache or ExtractionCache.from_env(),
+                                                use_text_layer)
+    extractor.on_field = on_field
+    document = extractor.open_document(pdf_path)
+    
+    methods = {name: method_name for name, (method_name, _) in FINANCIAL_DATA_FIELDS.items()}
+    methods.update(DETAIL_TABLE_FIELDS)
+    print(f"📊 Extracting {len(methods)} fields for 8 tables (max_workers={max_workers})...")
+    results = extractor.extract_many(document, methods, max_workers=max_workers)
+    
+    tables = build_structured_tables(results)
+    
     print(f"✅ Successfully extracted {len(tables)} financial statement tables")
+    upload_stats = document.stats()
+    print(f"📤 Uploaded {upload_stats['bytes_uploaded'] / 1024:.2f} KB for {upload_stats['model_calls']} model calls")
+    print(f"🧭 Fields resolved by: {upload_stats['fields_resolved_by']}")
+    if extractor.cache is not None:
+        cache_stats = extractor.cache.stats()
+        print(f"🗄️  Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    extractor.close_document(document)
     return tables
 
 
@@ -956,17 +1073,250 @@ def get_fallback_structured_tables() -> list:
     ]
 
 
+def field_event(name: str, result: Dict[str, Any], source: str, latency: float) -> Dict[str, Any]:
+    """NDJSON progress event for one resolved field"""
+    event = {
+        'event': 'field',
+        'field': name,
+        'value': result.get('numeric_value'),
+        'raw': result.get('raw_string'),
+        'success': bool(result.get('success')),
+        'source': source,
+        'latency_ms': round(latency * 1000, 1)
+    }
+    if result.get('error'):
+        event['error'] = result['error']
+    return event
+
+
+def _failed_extraction(result: Any) -> Optional[str]:
+    """Why a worker result holds no usable figures (extraction_metadata.confidence 'failed'), or None"""
+    financial_data = result.get('financial_data', result) if isinstance(result, dict) else None
+    if not isinstance(financial_data, dict):
+        return None
+    metadata = financial_data.get('extraction_metadata') or {}
+    if metadata.get('confidence') != 'failed':
+        return None
+    failed = metadata.get('failed_fields') or []
+    return financial_data.get('error') or f'No field could be extracted ({len(failed)} failed: {failed})'
+
+
+def _run_worker_job(job: Dict[str, Any], transport: Optional[ModelTransport],
+                    cache: Optional[ExtractionCache],
+                    emit: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Execute one worker job and build its response line.
+    
+    With ``emit`` and a job carrying ``"stream": true`` every resolved field
+    is also emitted as a field event tagged with the job id.
+    """
+    job_id = job.get('id')
+    job_type = job.get('type', 'extract')
+    
+    if job_type == 'health':
+        return {
+            'id': job_id,
+            'type': 'health',
+            'status': 'ok',
+            'pid': os.getpid(),
+            'api_key_configured': transport is not None
+        }
+    
+    if job_type != 'extract':
+        return {'id': job_id, 'status': 'error', 'error': f'Unknown job type: {job_type}'}
+    
+    on_field = None
+    if emit is not None and job.get('stream'):
+        def on_field(name: str, result: Dict[str, Any], source: str, latency: float) -> None:
+            emit({'id': job_id, **field_event(name, result, source, latency)})
+    
+    try:
+        options = {
+            'transport': transport,
+            'max_workers': int(job.get('max_workers', 1)),
+            'cache': cache,
+            'use_text_layer': bool(job.get('use_text_layer', True)),
+            'on_field': on_field
+        }
+        previous_fields = job.get('previous_fields')
+        if job.get('formats'):
+            from extraction_session import FinancialExtractionSession
+            with FinancialExtractionSession(job['pdf_path'], transport=transport, cache=cache,
+                                            use_text_layer=options['use_text_layer'],
+                                            max_workers=options['max_workers'],
+                                            batched=bool(job.get('batched', False)),
+                                            plan_by=job.get('plan_by'),
+                                            on_field=on_field,
+                                            previous_fields=previous_fields,
+                                            voting=bool(job.get('vote', False))) as session:
+                result = session.render(job['formats'])
+        elif job.get('format', 'financial_data') == 'tables':
+            result = extract_structured_financial_tables(job['pdf_path'], **options)
+        else:
+            cascade = job.get('cascade')
+            result = extract_financial_data(job['pdf_path'], batched=bool(job.get('batched', False)),
+                                            plan_by=job.get('plan_by'), previous_fields=previous_fields,
+                                            cascade=cascade.split(',') if isinstance(cascade, str) else cascade,
+                                            voting=bool(job.get('vote', False)), **options)
+        failure = _failed_extraction(result)
+        if failure:
+            return {'id': job_id, 'status': 'error', 'error': failure, 'result': result}
+        return {'id': job_id, 'status': 'ok', 'result': result}
+    except Exception as error:
+        return {'id': job_id, 'status': 'error', 'error': str(error)}
+
+
+def run_worker(max_jobs: int = 4) -> None:
+    """
+    Serve extraction jobs as JSON lines on stdin until EOF.
+    
+    The Gemini client, SDK imports and cache are set up once and shared by
+    every job, and up to ``max_jobs`` documents are processed at once.
+    Each job is answered with one JSON line on stdout carrying the same
+    ``id``; progress logging goes to stderr so stdout stays parseable.
+    
+    Jobs look like {"id": "1", "type": "extract", "pdf_path": "...",
+    "format": "financial_data" | "tables", "batched": false, "max_workers": 1}
+    or {"id": "2", "type": "health"}. A document where no field could be
+    extracted is answered with "status": "error", its result attached. A job
+    with "stream": true also gets one {"id": ..., "event": "field", ...} line
+    per field before its response.
+    "previous_fields" carries the extraction_metadata.fields of an earlier
+    result, so only fields whose fingerprint changed are extracted again.
+    "cascade" lists model tiers, as a list or comma-separated string, and
+    "vote": true turns on self-consistency voting for VOTING_FIELDS.
+    Per-call metrics are rewritten to EXTRACTION_METRICS_FILE after each job.
+    """
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    output_lock = threading.Lock()
+    
+    transport = transport_from_env(os.getenv('EXPO_PUBLIC_GEMINI_API_KEY'))
+    cache = ExtractionCache.from_env()
+    
+    def respond(response: Dict[str, Any]) -> None:
+        with output_lock:
+            output.write(json.dumps(response, ensure_ascii=False) + '\n')
+            output.flush()
+    
+    def handle(job: Dict[str, Any]) -> None:
+        respond(_run_worker_job(job, transport, cache, emit=respond))
+        export_metrics_from_env()
+    
+    with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as error:
+                respond({'id': None, 'status': 'error', 'error': f'Invalid job: {error}'})
+                continue
+            if job.get('type') == 'health':
+                handle(job)
+            else:
+                executor.submit(handle, job)
+
+
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description='Extract financial data from a university financial statement PDF')
+    parser.add_argument('pdf_path', nargs='?', default='./b67155c2806c76359d1b3637d7ff2ac7.pdf')
+    parser.add_argument('--worker', action='store_true',
+                        help='serve JSON-lines jobs on stdin instead of processing one PDF')
+    parser.add_argument('--max-jobs', type=int, default=4,
+                        help='documents processed concurrently in worker mode')
+    parser.add_argument('--batched', action='store_true',
+                        help='request every field in a single structured call')
+    parser.add_argument('--max-workers', type=int, default=1,
+                        help='concurrent field extractions per document')
+    parser.add_argument('--stream', action='store_true',
+                        help='emit one NDJSON event per resolved field, then a final document event')
+    parser.add_argument('--plan-by', choices=['statement', 'page'],
+                        help='group fields into one model call per statement or page')
+    parser.add_argument('--show-plan', action='store_true',
+                        help='print the model call plan for --plan-by (default: statement) and exit')
+    parser.add_argument('--cassette', help='record model responses to / replay them from this file')
+    parser.add_argument('--cassette-mode', choices=['record', 'replay', 'auto'],
+                        help='cassette mode (default: auto with an API key, replay without)')
+    parser.add_argument('--strict-replay', action='store_true',
+                        help='fail when a response is missing from the cassette instead of calling the model')
+    parser.add_argument('--previous',
+                        help='earlier JSON output for this PDF; only fields whose prompt or model changed are extracted')
+    parser.add_argument('--metrics-file',
+                        help='write per-call metrics in the Prometheus text format to this file when done')
+    parser.add_argument('--metrics-port', type=int,
+                        help='serve per-call metrics on http://0.0.0.0:PORT/metrics (worker mode)')
+    parser.add_argument('--cascade', default=os.getenv('GEMINI_MODEL_CASCADE'),
+                        help='comma-separated tiers tried cheapest first, e.g. '
+                             'text_layer,gemini-1.5-flash-8b,gemini-2.0-flash-exp (default: GEMINI_MODEL_CASCADE)')
+    parser.add_argument('--vote', action='store_true',
+                        help='decide sign-prone segment fields by self-consistency voting (extra calls for those only)')
+    args = parser.parse_args()
+    
+    if args.cassette:
+        os.environ['EXTRACTION_CASSETTE'] = args.cassette
+    if args.cassette_mode:
+        os.environ['EXTRACTION_CASSETTE_MODE'] = args.cassette_mode
+    if args.strict_replay:
+        os.environ['EXTRACTION_CASSETTE_STRICT'] = '1'
+    if args.metrics_file:
+        os.environ['EXTRACTION_METRICS_FILE'] = args.metrics_file
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    
+    if args.worker:
+        run_worker(args.max_jobs)
+        return
+    
+    if args.show_plan:
+        print(format_plan(plan_calls(list(FINANCIAL_DATA_FIELDS), args.plan_by or 'statement')))
+        return
+    
+    # Progress logging goes to stderr so stdout carries only the JSON output
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    output_lock = threading.Lock()
+    
+    def emit(event: Dict[str, Any]) -> None:
+        with output_lock:
+            output.write(json.dumps(event, ensure_ascii=False) + '\n')
+            output.flush()
+    
+    def on_field(name: str, result: Dict[str, Any], source: str, latency: float) -> None:
+        emit(field_event(name, result, source, latency))
+    
+    previous_fields = None
+    if args.previous:
+        with open(args.previous, 'r', encoding='utf-8') as f:
+            previous_fields = json.load(f).get('extraction_metadata', {}).get('fields')
+    
+    started = time.time()
     try:
-        pdf_path = sys.argv[1] if len(sys.argv) > 1 else './b67155c2806c76359d1b3637d7ff2ac7.pdf'
-        financial_data = extract_financial_data(pdf_path)
-        
-        print(json.dumps(financial_data, ensure_ascii=False, indent=2))
-        
+        financial_data = extract_financial_data(args.pdf_path, batched=args.batched,
+                                                max_workers=args.max_workers,
+                                                plan_by=args.plan_by,
+                                                on_field=on_field if args.stream else None,
+                                                previous_fields=previous_fields,
+                                                cascade=args.cascade.split(',') if args.cascade else None,
+                                                voting=args.vote)
     except Exception as error:
         print(f"Error: {error}", file=sys.stderr)
+        if args.stream:
+            emit({'event': 'document', 'status': 'error', 'error': str(error)})
         sys.exit(1)
+    finally:
+        export_metrics_from_env()
+    
+    if args.stream:
+        emit({
+            'event': 'document',
+            'status': 'error' if 'error' in financial_data else 'ok',
+            'latency_ms': round((time.time() - started) * 1000, 1),
+            'result': financial_data
+        })
+    else:
+        output.write(json.dumps(financial_data, ensure_ascii=False, indent=2) + '\n')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import threading
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+from google.api_core import exceptions as google_exceptions
+from gemini_client import ModelTransport, ModelResponse, UploadedDocument
+from rate_limiter import RateLimiter
+from field_registry import FIELD_REGISTRY
+from data_extractor import extract_financial_data, extract_structured_financial_tables
+from high_precision_extractor import HighPrecisionFinancialExtractor
+
+
+DEFAULT_PDF_PATH = './b67155c2806c76359d1b3637d7ff2ac7.pdf'
+DEFAULT_RESULTS_DIR = 'benchmark_results'
+
+# Canned answers for the sample report, as the model would print them
+CANNED_ANSWERS = {
+    'segment_profit_loss': '△410,984',
+    'total_liabilities': '27,947,258',
+    'current_liabilities': '7,020,870',
+    'ordinary_expenses': '34,723,539',
+    'total_assets': '71,892,603',
+    'current_assets': '8,838,001',
+    'fixed_assets': '63,054,601',
+    'total_revenue': '34,069,533',
+    'total_equity': '43,945,344',
+    'hospital_revenue': '17,100,614',
+    'operating_grant_revenue': '9,665,735',
+    'tuition_revenue': '2,870,000',
+    'research_revenue': '1,540,000',
+    'personnel_costs': '16,248,283',
+    'medical_costs': '12,508,491',
+    'education_costs': '1,557,327',
+    'research_costs': '1,569,518',
+    'operating_loss': '△654,006',
+    'net_loss': '△598,995',
+    'operating_cf': '1,469,768',
+    'investing_cf': '△10,489,748',
+    'financing_cf': '4,340,879',
+    'academic_segment': '354,270',
+    'school_segment': '93,455',
+    'business_implementation_cost': '20,538,219',
+    'fixed_asset_details': '63,054,601',
+    'borrowing_details': '10,366,372',
+    'operational_cost_details': '34,603,239'
+}
+
+GROUP_KEY_PATTERN = re.compile(r'^- (\w+): ', re.M)
+JSON_TEMPLATE_PATTERN = re.compile(r'JSONフォーマットで正確に返してください：\s*(\{.*\})\s*\n\n', re.S)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Build a latency sampler in seconds from 'fixed:0.5', 'uniform:0.2:1.5' or 'lognormal:0.8:0.4'.
+
+    For lognormal the first number is the median and the second the sigma.
+    """
+    kind, *values = spec.split(':')
+    numbers = [float(value) for value in values]
+    if kind == 'fixed':
+        return lambda rng: numbers[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(numbers[0], numbers[1])
+    if kind == 'lognormal':
+        median, sigma = numbers
+        return lambda rng: median * rng.lognormvariate(0.0, sigma)
+    raise ValueError(f'Unknown latency distribution: {spec}')
+
+
+class SimulatedGeminiTransport(ModelTransport):
+    """Offline stand-in for the Gemini backend with canned answers.
+
+    Each call sleeps for a sampled latency, then fails with a 429 quota
+    error at ``rate_limit_rate``, fails with a 500 at ``failure_rate``, or
+    answers. Single-field prompts get the field's canned value. Planned and
+    batched JSON prompts get every requested key. High-precision statement
+    prompts get the JSON example they carry. Calls go through a fast rate
+    limiter so the retry path is exercised without real backoff waits.
+    """
+
+    model_name = 'simulated-gemini'
+
+    def __init__(self, latency: str = 'lognormal:0.8:0.4', failure_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, answers: Optional[Dict[str, str]] = None,
+                 time_scale: float = 1.0, seed: int = 0):
+        self.sample_latency = parse_latency(latency)
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.answers = dict(CANNED_ANSWERS, **(answers or {}))
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.rate_limiter = RateLimiter(requests_per_minute=60_000, base_delay=0.001 * time_scale,
+                                        max_delay=0.01 * time_scale)
+        self.prompt_fields = {spec.prompt: spec.key for spec in FIELD_REGISTRY.values()}
+        self.calls = 0
+        self.failures = 0
+        self.bytes_uploaded = 0
+        self.latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def upload(self, data: bytes, mime_type: str, display_name: str) -> Any:
+        with self._lock:
+            self.bytes_uploaded += len(data)
+        return display_name
+
+    def _answer(self, prompt: str) -> str:
+        for field_prompt, key in self.prompt_fields.items():
+            if prompt.endswith(field_prompt):
+                return self.answers[key]
+        template = JSON_TEMPLATE_PATTERN.search(prompt)
+        if template:
+            return template.group(1)
+        keys = GROUP_KEY_PATTERN.findall(prompt)
+        return json.dumps({key: self.answers.get(key) for key in keys}, ensure_ascii=False)
+
+    def generate(self, prompt: str, document: UploadedDocument,
+                 generation_config: Optional[Dict[str, Any]] = None, sample: Optional[int] = None) -> ModelResponse:
+        with self._lock:
+            latency = self.sample_latency(self.rng) * self.time_scale
+            roll = self.rng.random()
+            self.calls += 1
+        started = time.perf_counter()
+        time.sleep(latency)
+        try:
+            if roll < self.rate_limit_rate:
+                error = google_exceptions.ResourceExhausted('429 Resource has been exhausted (e.g. check quota).')
+                error.retry_after = 0.001 * self.time_scale
+                raise error
+            if roll < self.rate_limit_rate + self.failure_rate:
+                raise google_exceptions.InternalServerError('500 An internal error has occurred.')
+            text = self._answer(prompt)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - started)
+        return ModelResponse(text=text, usage={'prompt_tokens': len(prompt), 'output_tokens': len(text)})
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for an empty list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _scenarios() -> Dict[str, Callable[[str, ModelTransport], Any]]:
+    def complete(pdf_path: str, transport: ModelTransport) -> Any:
+        return HighPrecisionFinancialExtractor(None, transport=transport).extract_complete_financial_data(pdf_path)
+
+    return {
+        'financial_data': lambda pdf_path, transport: extract_financial_data(pdf_path, transport),
+        'financial_data_parallel': lambda pdf_path, transport: extract_financial_data(
+            pdf_path, transport, max_workers=8),
+        'financial_data_batched': lambda pdf_path, transport: extract_financial_data(
+            pdf_path, transport, batched=True),
+        'financial_data_planned': lambda pdf_path, transport: extract_financial_data(
+            pdf_path, transport, plan_by='statement'),
+        'structured_tables': lambda pdf_path, transport: extract_structured_financial_tables(
+            pdf_path, transport, max_workers=8),
+        'complete_financial_data': complete
+    }
+
+
+SCENARIOS = ('financial_data', 'financial_data_parallel', 'financial_data_batched',
+             'financial_data_planned', 'structured_tables', 'complete_financial_data')
+
+
+def run_scenario(name: str, pdf_path: str, repeats: int, transport_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one scenario ``repeats`` times against fresh simulated backends and summarise it"""
+    scenario = _scenarios()[name]
+    wall_times, calls, bytes_uploaded, failures, errors = [], [], [], [], []
+    latencies: List[float] = []
+    for repeat in range(repeats):
+        transport = SimulatedGeminiTransport(seed=repeat, **transport_options)
+        started = time.perf_counter()
+        try:
+            with redirect_stdout(io.StringIO()):
+                scenario(pdf_path, transport)
+        except Exception as error:
+            errors.append(str(error))
+        wall_times.append(time.perf_counter() - started)
+        calls.append(transport.calls)
+        bytes_uploaded.append(transport.bytes_uploaded)
+        failures.append(transport.failures)
+        latencies.extend(transport.latencies)
+    return {
+        'repeats': repeats,
+        'wall_seconds_mean': sum(wall_times) / repeats,
+        'wall_seconds_p50': percentile(wall_times, 0.5),
+        'wall_seconds_max': max(wall_times),
+        'calls_mean': sum(calls) / repeats,
+        'failed_calls_mean': sum(failures) / repeats,
+        'bytes_uploaded_mean': sum(bytes_uploaded) / repeats,
+        'call_latency_p50': percentile(latencies, 0.5),
+        'call_latency_p95': percentile(latencies, 0.95),
+        'errors': errors
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(pdf_path: str = DEFAULT_PDF_PATH, scenarios: Optional[List[str]] = None,
+                  repeats: int = 3, **transport_options) -> Dict[str, Any]:
+    """Run the selected scenarios and return the JSON-serialisable report.
+
+    EXTRACTION_CACHE_DIR is unset while the scenarios run, so every repeat
+    pays for its calls, and restored afterwards.
+    """
+    cache_dir = os.environ.pop('EXTRACTION_CACHE_DIR', None)
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'pdf_path': pdf_path,
+        'backend': dict(transport_options),
+        'scenarios': {}
+    }
+    try:
+        for name in scenarios or SCENARIOS:
+            print(f"⏱️  {name}...", file=sys.stderr)
+            report['scenarios'][name] = run_scenario(name, pdf_path, repeats, transport_options)
+    finally:
+        if cache_dir is not None:
+            os.environ['EXTRACTION_CACHE_DIR'] = cache_dir
+    return report
+
+
+def format_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """Table of the report, with the change against ``baseline`` where both have the scenario"""
+    lines = [f"{'scenario':<26}{'wall s':>9}{'calls':>8}{'KB up':>10}{'p50 s':>8}{'p95 s':>8}{'errors':>8}"]
+    for name, result in report['scenarios'].items():
+        p50 = result['call_latency_p50'] or 0.0
+        p95 = result['call_latency_p95'] or 0.0
+        line = (f"{name:<26}{result['wall_seconds_mean']:>9.3f}{result['calls_mean']:>8.1f}"
+                f"{result['bytes_uploaded_mean'] / 1024:>10.1f}{p50:>8.3f}{p95:>8.3f}{len(result['errors']):>8}")
+        previous = (baseline or {}).get('scenarios', {}).get(name)
+        if previous:
+            wall_change = (result['wall_seconds_mean'] / previous['wall_seconds_mean'] - 1) * 100
+            line += f"   wall {wall_change:+.1f}%, calls {result['calls_mean'] - previous['calls_mean']:+.1f}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extractors offline against a simulated Gemini backend')
+    parser.add_argument('pdf_path', nargs='?', default=DEFAULT_PDF_PATH)
+    parser.add_argument('--scenario', dest='scenarios', action='append', choices=SCENARIOS,
+                        help='scenario to run (repeatable, default: all)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--latency', default='lognormal:0.8:0.4',
+                        help="per-call latency: fixed:S, uniform:LO:HI or lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument('--time-scale', type=float, default=0.05,
+                        help='multiply every simulated delay, so runs stay short (1.0 = real time)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of calls failing with a 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='share of calls failing with a 429')
+    parser.add_argument('--output', help=f'result JSON path (default: {DEFAULT_RESULTS_DIR}/<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier result JSON to compare against')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.pdf_path, args.scenarios, args.repeats, latency=args.latency,
+                           failure_rate=args.failure_rate, rate_limit_rate=args.rate_limit_rate,
+                           time_scale=args.time_scale)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print(format_report(report, baseline))
+
+    output = args.output
+    if not output:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        output = os.path.join(DEFAULT_RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import closing
+from typing import Dict, Any, Optional
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+
+class ExtractionCache:
+    """Content-addressed on-disk cache of extraction results.
+
+    Entries are keyed by (SHA-256 of the PDF bytes, SHA-256 of the prompt,
+    model name) and stored in a SQLite database in WAL mode, so several
+    worker processes can share one cache directory. Entries older than
+    ``max_age_seconds`` expire, and once the cache grows past ``max_bytes``
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, 'extraction_cache.sqlite3')
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS entries (
+                        key TEXT PRIMARY KEY,
+                        document_sha256 TEXT NOT NULL,
+                        prompt_sha256 TEXT NOT NULL,
+                        model_name TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries(accessed_at)')
+
+    @classmethod
+    def from_env(cls) -> Optional['ExtractionCache']:
+        """Build a cache from EXTRACTION_CACHE_DIR, or return None when it is not set"""
+        directory = os.getenv('EXTRACTION_CACHE_DIR')
+        if not directory:
+            return None
+        max_mb = os.getenv('EXTRACTION_CACHE_MAX_MB')
+        max_age_days = os.getenv('EXTRACTION_CACHE_MAX_AGE_DAYS')
+        return cls(
+            directory,
+            max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES,
+            max_age_seconds=float(max_age_days) * 24 * 60 * 60 if max_age_days else DEFAULT_MAX_AGE_SECONDS
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    @staticmethod
+    def make_key(document_sha256: str, prompt: str, model_name: str) -> str:
+        prompt_sha256 = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f'{document_sha256}:{prompt_sha256}:{model_name}'.encode('utf-8')).hexdigest()
+
+    def _count(self, hit: bool) -> None:
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, document_sha256: str, prompt: str, model_name: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry"""
+        key = self.make_key(document_sha256, prompt, model_name)
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT value, created_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._count(hit=False)
+                return None
+            value, created_at = row
+            if now - created_at > self.max_age_seconds:
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._count(hit=False)
+                return None
+            conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        self._count(hit=True)
+        return json.loads(value)
+
+    def put(self, document_sha256: str, prompt: str, model_name: str, value: Any) -> None:
+        """Store a JSON-serialisable value and evict entries beyond the size and age limits"""
+        key = self.make_key(document_sha256, prompt, model_name)
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, document_sha256, hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+                 model_name, encoded, len(encoded.encode('utf-8')), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM entries WHERE created_at < ?', (now - self.max_age_seconds,))
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed_at ASC').fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    total -= size
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def evict(self) -> None:
+        """Apply the age and size limits now"""
+        with closing(self._connect()) as conn:
+            self._evict(conn, time.time())
+
+    def clear(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM entries')
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the current size of the shared cache"""
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': size
+        }
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from gemini_client import ModelTransport, GeminiTransport
+from cassette_transport import CassetteTransport
+from rate_limiter import DEFAULT_REQUESTS_PER_MINUTE
+from extraction_session import FinancialExtractionSession
+from structural_diff import FlatTree, diff
+
+
+# Strategy name -> (output format it produces, FinancialExtractionSession options)
+STRATEGIES: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    'per_field': ('financial_data', {}),
+    'single_call': ('financial_data', {'batched': True}),
+    'planned_page_slice': ('financial_data', {'plan_by': 'statement', 'slice_pages': True}),
+    'planned_full_document': ('financial_data', {'plan_by': 'statement', 'slice_pages': False}),
+    'statements_page_slice': ('complete', {'slice_pages': True}),
+    'statements_full_document': ('complete', {'slice_pages': False})
+}
+
+# Per-process transport, set up by _init_process
+_transport: Optional[ModelTransport] = None
+
+
+def read_manifest(manifest_path: str) -> List[Dict[str, str]]:
+    """(PDF, ground truth) pairs from a JSONL manifest of ``{"pdf_path": ..., "ground_truth": ...}`` records.
+
+    Blank lines and ``#`` comments are ignored; relative paths are resolved
+    against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    pairs = []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            record = json.loads(line)
+            pairs.append({
+                'pdf_path': os.path.abspath(os.path.join(base, record['pdf_path'])),
+                'ground_truth': os.path.abspath(os.path.join(base, record['ground_truth']))
+            })
+    return pairs
+
+
+def split_ground_truth(truth: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Field values and statements (by tableName) from a ground-truth JSON.
+
+    The file may hold ``financial_statements`` in the complete format,
+    extract_financial_data fields either under ``financial_data`` or at the
+    top level, or both.
+    """
+    fields = truth.get('financial_data')
+    if fields is None:
+        fields = {name: value for name, value in truth.items()
+                  if isinstance(value, (int, float)) and not isinstance(value, bool)}
+    statements = {statement['tableName']: statement for statement in truth.get('financial_statements') or []
+                  if isinstance(statement, dict) and statement.get('tableName')}
+    return fields, statements
+
+
+def score_fields(output: Dict[str, Any], truth: Dict[str, Any], tolerance: float = 0) -> Dict[str, bool]:
+    """Whether each ground-truth field was extracted within ``tolerance``"""
+    wrong = {difference.path for difference in diff({name: output.get(name) for name in truth}, truth, tolerance)}
+    return {name: name not in wrong for name in truth}
+
+
+def score_statements(output: Dict[str, Any], truth: Dict[str, Any], tolerance: float = 0) -> Dict[str, Dict[str, Any]]:
+    """Per statement: how many ground-truth leaves match, and whether the whole statement does"""
+    extracted = {statement.get('tableName'): statement for statement in output.get('financial_statements') or []
+                 if isinstance(statement, dict)}
+    scores = {}
+    for name, statement in truth.items():
+        flat = FlatTree(statement)
+        leaves = list(flat.leaves)
+        wrong = set()
+        for difference in diff(extracted.get(name, {}), flat, tolerance):
+            if difference.kind == 'extra':
+                continue
+            wrong.update(path for path in leaves if path == difference.path
+                         or path.startswith(difference.path + '.') or path.startswith(difference.path + '['))
+        scores[name] = {
+            'leaves': len(leaves),
+            'correct': len(leaves) - len(wrong),
+            'exact': not wrong and name in extracted
+        }
+    return scores
+
+
+def evaluate_document(pdf_path: str, ground_truth: str, strategy: str, tolerance: float = 0,
+                      use_text_layer: bool = True, max_workers: int = 1,
+                      transport: Optional[ModelTransport] = None) -> Dict[str, Any]:
+    """Extract one document with one strategy and score it against its ground truth.
+
+    ``transport`` defaults to the one FinancialExtractionSession builds from the environment.
+    """
+    output_format, options = STRATEGIES[strategy]
+    with open(ground_truth, 'r', encoding='utf-8') as f:
+        truth_fields, truth_statements = split_ground_truth(json.load(f))
+    record = {'pdf_path': pdf_path, 'strategy': strategy}
+    started = time.perf_counter()
+    try:
+        with FinancialExtractionSession(pdf_path, transport=transport, use_text_layer=use_text_layer,
+                                        max_workers=max_workers, **options) as session:
+            output = session.render([output_format])[output_format]
+            stats = session.stats()
+    except Exception as error:
+        return {**record, 'status': 'error', 'error': str(error),
+                'elapsed_seconds': round(time.perf_counter() - started, 3)}
+    record.update({
+        'status': 'ok',
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'model_calls': stats['model_calls'],
+        'bytes_uploaded': stats['bytes_uploaded'],
+        'request_bytes': stats['timings']['request_bytes'],
+        'call_seconds': stats['timings']['total_call_seconds'],
+        'total_tokens': stats['timings']['total_tokens']
+    })
+    if output_format == 'financial_data':
+        record['fields'] = score_fields(output, truth_fields, tolerance)
+    else:
+        record['statements'] = score_statements(output, truth_statements, tolerance)
+    return record
+
+
+def _init_process(requests_per_minute: float) -> None:
+    """Create this process's transport with its share of the quota.
+
+    Progress logging goes to stderr; the cache is off so every strategy pays
+    for its own calls.
+    """
+    global _transport
+    sys.stdout = sys.stderr
+    os.environ.pop('EXTRACTION_CACHE_DIR', None)
+    api_key = os.getenv('EXPO_PUBLIC_GEMINI_API_KEY')
+    inner = GeminiTransport(api_key, requests_per_minute=requests_per_minute) if api_key else None
+    _transport = CassetteTransport.from_env(inner) or inner
+
+
+def _evaluate_in_process(*args) -> Dict[str, Any]:
+    """evaluate_document with the transport _init_process created"""
+    return evaluate_document(*args, transport=_transport)
+
+
+def summarise(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Accuracy and cost per strategy, with per-field and per-statement accuracy"""
+    summary = {}
+    for strategy in STRATEGIES:
+        runs = [record for record in records if record['strategy'] == strategy]
+        if not runs:
+            continue
+        ok = [record for record in runs if record['status'] == 'ok']
+        fields: Dict[str, List[bool]] = {}
+        statements: Dict[str, List[Dict[str, Any]]] = {}
+        for record in ok:
+            for name, correct in record.get('fields', {}).items():
+                fields.setdefault(name, []).append(correct)
+            for name, score in record.get('statements', {}).items():
+                statements.setdefault(name, []).append(score)
+        field_scores = [correct for values in fields.values() for correct in values]
+        leaves = sum(score['leaves'] for scores in statements.values() for score in scores)
+        correct_leaves = sum(score['correct'] for scores in statements.values() for score in scores)
+        count = len(ok) or 1
+        summary[strategy] = {
+            'documents': len(runs),
+            'errors': len(runs) - len(ok),
+            'accuracy': (sum(field_scores) / len(field_scores) if field_scores
+                         else correct_leaves / leaves if leaves else None),
+            'field_accuracy': {name: sum(values) / len(values) for name, values in fields.items()},
+            'statement_accuracy': {
+                name: {
+                    'leaf_accuracy': (sum(score['correct'] for score in scores)
+                                      / (sum(score['leaves'] for score in scores) or 1)),
+                    'exact_share': sum(score['exact'] for score in scores) / len(scores)
+                }
+                for name, scores in statements.items()
+            },
+            'calls_per_document': sum(record['model_calls'] for record in ok) / count,
+            'bytes_uploaded_per_document': sum(record['bytes_uploaded'] for record in ok) / count,
+            'request_bytes_per_document': sum(record['request_bytes'] for record in ok) / count,
+            'seconds_per_document': sum(record['elapsed_seconds'] for record in ok) / count
+        }
+    return summary
+
+
+def run_evaluation(manifest_path: str, strategies: Optional[List[str]] = None, processes: int = 4,
+                   tolerance: float = 0, use_text_layer: bool = True, max_workers: int = 1,
+                   requests_per_minute: Optional[float] = None) -> Dict[str, Any]:
+    """Evaluate every (document, strategy) pair on a pool of ``processes`` worker processes.
+
+    ``requests_per_minute`` is the total quota for the API key (default:
+    GEMINI_REQUESTS_PER_MINUTE); it is split evenly across the processes so
+    rate-limit backoff does not skew the latency and cost figures.
+    """
+    pairs = read_manifest(manifest_path)
+    strategies = strategies or list(STRATEGIES)
+    jobs = [(pair, strategy) for pair in pairs for strategy in strategies]
+    if requests_per_minute is None:
+        requests_per_minute = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', DEFAULT_REQUESTS_PER_MINUTE))
+    processes = max(1, min(processes, len(jobs) or 1))
+    print(f"📚 {len(pairs)} document(s) × {len(strategies)} strateg{'y' if len(strategies) == 1 else 'ies'} "
+          f"on {processes} processes ({requests_per_minute:g} requests/minute)", file=sys.stderr)
+
+    records = []
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_process,
+                             initargs=(requests_per_minute / processes,)) as executor:
+        futures = {
+            executor.submit(_evaluate_in_process, pair['pdf_path'], pair['ground_truth'], strategy, tolerance,
+                            use_text_layer, max_workers): (pair, strategy)
+            for pair, strategy in jobs
+        }
+        for future in as_completed(futures):
+            pair, strategy = futures[future]
+            try:
+                record = future.result()
+            except Exception as error:
+                record = {'pdf_path': pair['pdf_path'], 'strategy': strategy, 'status': 'error', 'error': str(error)}
+            records.append(record)
+            print(f"{'✅' if record['status'] == 'ok' else '❌'} [{len(records)}/{len(jobs)}] {strategy} "
+                  f"{record['pdf_path']}", file=sys.stderr)
+
+    records.sort(key=lambda record: (record['pdf_path'], strategies.index(record['strategy'])))
+    return {
+        'created_at': datetime.now().isoformat(),
+        'manifest': os.path.abspath(manifest_path),
+        'tolerance': tolerance,
+        'strategies': summarise(records),
+        'documents': records
+    }
+
+
+def format_report(report: Dict[str, Any], min_accuracy: Optional[float] = None) -> str:
+    """Side-by-side strategy table; with ``min_accuracy`` the cheapest strategy meeting it is named"""
+    lines = [f"{'strategy':<26}{'accuracy':>10}{'calls/doc':>11}{'KB up/doc':>11}{'s/doc':>8}{'errors':>8}"]
+    for name, result in report['strategies'].items():
+        accuracy = f"{result['accuracy'] * 100:.1f}%" if result['accuracy'] is not None else '-'
+        lines.append(f"{name:<26}{accuracy:>10}{result['calls_per_document']:>11.1f}"
+                     f"{result['bytes_uploaded_per_document'] / 1024:>11.1f}{result['seconds_per_document']:>8.2f}"
+                     f"{result['errors']:>8}")
+    if min_accuracy is not None:
+        passing = [(result['seconds_per_document'], name) for name, result in report['strategies'].items()
+                   if result['accuracy'] is not None and result['accuracy'] >= min_accuracy and not result['errors']]
+        lines.append(f"🏆 Fastest strategy at ≥{min_accuracy * 100:.1f}% accuracy: {min(passing)[1]}" if passing
+                     else f"⚠️  No strategy reaches {min_accuracy * 100:.1f}% accuracy")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score extraction strategies for accuracy and cost over a labeled corpus')
+    parser.add_argument('manifest', help='JSONL manifest of {"pdf_path": ..., "ground_truth": ...} records')
+    parser.add_argument('--strategy', dest='strategies', action='append', choices=list(STRATEGIES),
+                        help='strategy to evaluate (repeatable, default: all)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='(document, strategy) pairs evaluated in parallel')
+    parser.add_argument('--tolerance', type=float, default=0, help='allowed absolute difference per amount')
+    parser.add_argument('--min-accuracy', type=float, help='accuracy bar (0-1) for picking the fastest strategy')
+    parser.add_argument('--max-workers', type=int, default=1, help='concurrent model calls per document')
+    parser.add_argument('--no-text-layer', action='store_true', help='send every field to the model')
+    parser.add_argument('--requests-per-minute', type=float,
+                        help='total request quota shared by all processes (default: GEMINI_REQUESTS_PER_MINUTE)')
+    parser.add_argument('-o', '--output', help='write the full report JSON here')
+    args = parser.parse_args()
+
+    report = run_evaluation(args.manifest, args.strategies, args.processes, args.tolerance,
+                            not args.no_text_layer, args.max_workers, args.requests_per_minute)
+    print(format_report(report, args.min_accuracy))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Sequence
+from gemini_client import ModelTransport
+from cassette_transport import transport_from_env
+from extraction_cache import ExtractionCache
+from data_extractor import (
+    ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS, DETAIL_TABLE_FIELDS,
+    build_financial_data, build_structured_tables, extraction_confidence
+)
+from high_precision_extractor import HighPrecisionFinancialExtractor, STATEMENT_METHODS
+from field_registry import VOTING_FIELDS, apply_sign_rule
+from accounting_identities import verified_statements
+
+
+OUTPUT_FORMATS = ('financial_data', 'tables', 'complete')
+
+# Fields that can be read from an already extracted statement: key -> (statement method, path into its data).
+# A path step that meets a list picks the item whose account or segment matches it.
+STATEMENT_FIELD_PATHS = {
+    'total_assets': ('extract_balance_sheet_assets', ('totalAssets',)),
+    'current_assets': ('extract_balance_sheet_assets', ('currentAssets', 'total')),
+    'fixed_assets': ('extract_balance_sheet_assets', ('fixedAssets', 'total')),
+    'total_liabilities': ('extract_balance_sheet_liabilities', ('liabilities', 'total')),
+    'current_liabilities': ('extract_balance_sheet_liabilities', ('liabilities', 'currentLiabilities', 'total')),
+    'total_equity': ('extract_balance_sheet_liabilities', ('netAssets', 'total')),
+    'ordinary_expenses': ('extract_income_statement', ('ordinaryExpenses', 'total')),
+    'total_revenue': ('extract_income_statement', ('ordinaryRevenues', 'total')),
+    'hospital_revenue': ('extract_income_statement', ('ordinaryRevenues', 'items', '附属病院収益')),
+    'operating_grant_revenue': ('extract_income_statement', ('ordinaryRevenues', 'items', '運営費交付金収益')),
+    'medical_costs': ('extract_income_statement', ('ordinaryExpenses', 'operatingExpenses', 'items', '診療経費')),
+    'education_costs': ('extract_income_statement', ('ordinaryExpenses', 'operatingExpenses', 'items', '教育経費')),
+    'research_costs': ('extract_income_statement', ('ordinaryExpenses', 'operatingExpenses', 'items', '研究経費')),
+    'operating_loss': ('extract_income_statement', ('ordinaryLoss',)),
+    'operating_cf': ('extract_cash_flow_statement', ('operatingActivities',)),
+    'investing_cf': ('extract_cash_flow_statement', ('investingActivities',)),
+    'financing_cf': ('extract_cash_flow_statement', ('financingActivities',)),
+    'segment_profit_loss': ('extract_segment_information', ('operatingProfitLoss', '附属病院')),
+    'academic_segment': ('extract_segment_information', ('operatingProfitLoss', '学部研究科等')),
+    'school_segment': ('extract_segment_information', ('operatingProfitLoss', '附属学校'))
+}
+
+
+def _statement_value(statement: Dict[str, Any], path: Sequence[str]) -> Optional[int]:
+    """Follow ``path`` through a statement's data, or return None when any step is missing"""
+    node: Any = statement.get('data')
+    for step in path:
+        if isinstance(node, dict):
+            node = node.get(step)
+        elif isinstance(node, list):
+            node = next((item.get('amount') for item in node if isinstance(item, dict)
+                         and step in (item.get('account'), item.get('segment'))), None)
+        else:
+            return None
+    # The statement prompts use 0 as the placeholder the model fills in, so a 0 is not trusted
+    if isinstance(node, bool) or not isinstance(node, int) or node == 0:
+        return None
+    return node
+
+
+class FinancialExtractionSession:
+    """One PDF, one upload, every output format.
+
+    Field and statement results are memoised, so rendering financial_data,
+    the table list and the complete statement list from the same session
+    costs each distinct extraction once. Statements already extracted also
+    answer the matching fields without another call, but only statements
+    that took part in a passing statement identity (see
+    accounting_identities.verified_statements): the statement prompts carry
+    the sample report's figures, so an unchecked statement may just echo
+    them. Render with ``render(['complete', ...])`` to get that reuse.
+    ``on_field`` and ``previous_fields`` work as in extract_financial_data,
+    and ``voting`` also votes on the statements in
+    high_precision_extractor.VOTING_STATEMENTS.
+    """
+
+    def __init__(self, pdf_path: str, api_key: Optional[str] = None,
+                 transport: Optional[ModelTransport] = None,
+                 cache: Optional[ExtractionCache] = None,
+                 use_text_layer: bool = True, max_workers: int = 1,
+                 batched: bool = False, slice_pages: bool = True, plan_by: Optional[str] = None,
+                 on_field: Optional[Callable[[str, Dict[str, Any], str, float], None]] = None,
+                 previous_fields: Optional[Dict[str, Dict[str, Any]]] = None, voting: bool = False):
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f'Target PDF not found: {pdf_path}')
+        api_key = api_key or os.getenv('EXPO_PUBLIC_GEMINI_API_KEY')
+        transport = transport or transport_from_env(api_key)
+        if transport is None:
+            raise RuntimeError('EXPO_PUBLIC_GEMINI_API_KEY not set - cannot extract financial data')
+
+        cache = cache or ExtractionCache.from_env()
+        self.pdf_path = pdf_path
+        self.max_workers = max_workers
+        self.batched = batched
+        self.slice_pages = slice_pages
+        self.plan_by = plan_by
+        self.previous_fields = previous_fields
+        self.fields_extractor = ComprehensiveFinancialExtractor(api_key, transport, cache, use_text_layer, voting)
+        self.fields_extractor.on_field = on_field
+        self.statements_extractor = HighPrecisionFinancialExtractor(api_key, transport=transport, cache=cache,
+                                                                    slice_pages=slice_pages, voting=voting)
+        self.document = self.fields_extractor.open_document(pdf_path)
+        self.fields: Dict[str, Dict[str, Any]] = {}
+        self.statements: Dict[str, Dict[str, Any]] = {}
+        self.identity_checks: List[Dict[str, Any]] = []
+        self.statement_checks: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'FinancialExtractionSession':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _from_statements(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Answer whichever of ``names`` a verified statement carries, under the field's sign rule"""
+        results = {}
+        verified = verified_statements(self.statement_checks)
+        for name in names:
+            if name not in STATEMENT_FIELD_PATHS:
+                continue
+            method_name, path = STATEMENT_FIELD_PATHS[name]
+            statement = self.statements.get(method_name) if method_name in verified else None
+            value = _statement_value(statement, path) if statement else None
+            if value is not None:
+                results[name] = {
+                    'raw_string': f'{value:,}',
+                    'numeric_value': apply_sign_rule(name, value),
+                    'success': True
+                }
+                self.fields_extractor.report_field(self.document, name, results[name], 'statement', 0.0)
+        return results
+
+    def get_fields(self, names: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Return results for ``names``, extracting only the ones this session has not seen"""
+        with self._lock:
+            missing = [name for name in names if name not in self.fields]
+            self.fields.update(self.fields_extractor.reuse_fields(self.document, missing, self.previous_fields))
+            missing = [name for name in missing if name not in self.fields]
+            self.fields.update(self._from_statements(missing))
+            missing = [name for name in missing if name not in self.fields]
+            voted = [name for name in missing if self.fields_extractor.voting and name in VOTING_FIELDS]
+            if self.plan_by and missing:
+                planned = [name for name in missing if name not in voted]
+                if planned:
+                    self.fields.update(self.fields_extractor.extract_planned(
+                        self.document, planned, self.plan_by, max_workers=self.max_workers,
+                        slice_pages=self.slice_pages))
+                missing = voted
+            batchable = [name for name in missing if name in FINANCIAL_DATA_FIELDS and name not in voted]
+            if self.batched and batchable:
+                self.fields.update(self.fields_extractor.extract_fields_batch(
+                    self.document, batchable, max_workers=self.max_workers))
+            else:
+                batchable = []
+            methods = {name: FINANCIAL_DATA_FIELDS[name][0] if name in FINANCIAL_DATA_FIELDS
+                       else DETAIL_TABLE_FIELDS[name] for name in missing if name not in batchable}
+            if methods:
+                self.fields.update(self.fields_extractor.extract_many(
+                    self.document, methods, max_workers=self.max_workers))
+            return {name: self.fields[name] for name in names}
+
+    def get_statements(self) -> List[Dict[str, Any]]:
+        """Return every high-precision statement, extracting only the ones not seen yet"""
+        with self._lock:
+            missing = [method_name for method_name in STATEMENT_METHODS if method_name not in self.statements]
+            for method_name in missing:
+                print(f"📊 Extracting {STATEMENT_METHODS[method_name]}...")
+                self.statements[method_name] = getattr(self.statements_extractor, method_name)(self.document)
+            if missing:
+                self.statements, self.statement_checks = self.statements_extractor.check_statement_identities(
+                    self.document, self.statements)
+            return [self.statements[method_name] for method_name in STATEMENT_METHODS]
+
+    def financial_data(self) -> Dict[str, Any]:
+        """extract_financial_data output shape"""
+        results = self.get_fields(list(FINANCIAL_DATA_FIELDS))
+        with self._lock:
+            results, self.identity_checks = self.fields_extractor.check_identities(self.document, results,
+                                                                                  self.max_workers)
+            self.fields.update(results)
+        financial_data = build_financial_data(results, self.pdf_path)
+        financial_data['extraction_metadata'].update({
+            'extracted_at': datetime.now().isoformat(),
+            'document': self.document.identity(),
+            **self.stats(),
+            'identity_checks': self.identity_checks + self.statement_checks,
+            'confidence': extraction_confidence(results, self.identity_checks + self.statement_checks),
+            'fields': self.fields_extractor.store_fields(self.document, self.fields)
+        })
+        return financial_data
+
+    def structured_tables(self) -> list:
+        """extract_structured_financial_tables output shape"""
+        return build_structured_tables(self.get_fields(list(FINANCIAL_DATA_FIELDS) + list(DETAIL_TABLE_FIELDS)))
+
+    def complete_financial_data(self) -> Dict[str, Any]:
+        """HighPrecisionFinancialExtractor.extract_complete_financial_data output shape"""
+        return {"financial_statements": [statement for statement in self.get_statements() if statement]}
+
+    def render(self, formats: Sequence[str]) -> Dict[str, Any]:
+        """Render several output formats; statements go first so the field formats can reuse them"""
+        unknown = [name for name in formats if name not in OUTPUT_FORMATS]
+        if unknown:
+            raise ValueError(f'Unknown output format(s): {unknown}')
+        renderers = {
+            'complete': self.complete_financial_data,
+            'financial_data': self.financial_data,
+            'tables': self.structured_tables
+        }
+        outputs = {}
+        for name in sorted(formats, key=OUTPUT_FORMATS[::-1].index):
+            outputs[name] = renderers[name]()
+        return {name: outputs[name] for name in formats}
+
+    def stats(self) -> Dict[str, Any]:
+        """Upload, call and cache accounting for the whole session"""
+        stats = self.document.stats()
+        stats['timings'] = self.document.timing_summary()
+        if self.fields_extractor.cache is not None:
+            stats['cache'] = self.fields_extractor.cache.stats()
+        return stats
+
+    def close(self) -> None:
+        """Release the uploaded document and its page slices"""
+        upload_stats = self.document.stats()
+        print(f"📤 Uploaded {upload_stats['bytes_uploaded'] / 1024:.2f} KB for {upload_stats['model_calls']} model calls")
+        print(f"🧭 Fields resolved by: {upload_stats['fields_resolved_by']}")
+        self.fields_extractor.close_document(self.document)
@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+
+import json
+import hashlib
+from dataclasses import dataclass, astuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_MAX_FIELDS_PER_CALL = 12
+GROUP_BY_OPTIONS = ('statement', 'page', 'single')
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """One extractable figure, declared as data.
+
+    ``sign`` is 'as_printed' (a leading △ marks a negative value) or 'loss'
+    (the row is a loss and is stored as a negative amount whichever way it is
+    printed). ``kind`` 'table' marks supplementary schedules that are always
+    requested on their own with ``prompt``; 'amount' fields can share a call.
+    """
+    key: str
+    label: str
+    statement: str
+    pages: Tuple[int, ...]
+    method: str
+    prompt: str
+    section: Optional[str] = None
+    sign: str = 'as_printed'
+    unit: str = '千円'
+    kind: str = 'amount'
+    description: Optional[str] = None
+    text_layer: Optional[Tuple[str, Tuple[str, ...]]] = None
+
+    def target(self) -> str:
+        """Where the figure sits, as described to the model"""
+        if self.description:
+            return self.description
+        if self.section:
+            return f'{self.statement}「{self.section}」の「{self.label}」'
+        return f'{self.statement}の「{self.label}」'
+
+
+@dataclass
+class PlannedCall:
+    """One model call covering ``fields``, sent against ``pages`` of the document"""
+    group: str
+    pages: Tuple[int, ...]
+    fields: List[str]
+
+    def describe(self) -> str:
+        page_list = ', '.join(str(page) for page in self.pages) or 'all'
+        return f"{self.group} (pages {page_list}): {', '.join(self.fields)}"
+
+
+FIELD_REGISTRY: Dict[str, FieldSpec] = {spec.key: spec for spec in [
+    FieldSpec(
+        key='segment_profit_loss',
+        label='業務損益',
+        statement='開示すべきセグメント情報',
+        section='附属病院',
+        pages=(24,),
+        method='extract_segment_profit_loss',
+        description='「開示すべきセグメント情報」表の「附属病院」行の「業務損益」',
+        prompt="""このPDFファイルの24ページにある「(19) 開示すべきセグメント情報」という表から、「附属病院」行の「業務損益」の値を正確に抽出してください。
+
+重要な指示：
+1. 24ページの「(19) 開示すべきセグメント情報」表を探してください
+2. その表の中で「附属病院」という行を見つけてください
+3. 「附属病院」行の「業務損益」列の値を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください（例：△410,984）
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='total_liabilities',
+        label='負債合計',
+        statement='貸借対照表',
+        section='負債の部',
+        pages=(4,),
+        method='extract_total_liabilities',
+        description='貸借対照表「負債の部」の「負債合計」',
+        text_layer=('貸借対照表', ('負債合計',)),
+        prompt="""このPDFファイルの貸借対照表から「負債合計」の値を正確に抽出してください。
+
+重要な指示：
+1. 貸借対照表の「負債の部」セクションを探してください
+2. 「負債の部」の最後にある「負債合計」という項目を特定してください
+3. 「純資産合計」ではなく、必ず「負債合計」の値を抽出してください
+4. 「負債合計」に対応する金額（千円単位）を抽出してください
+5. 値が△記号で始まっている場合は、それは負の値を意味します
+6. 抽出した値をそのまま返してください（例：27,947,258）
+
+注意：「純資産合計」や「資産合計」ではなく、必ず「負債の部」の「負債合計」を抽出してください。
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='current_liabilities',
+        label='流動負債合計',
+        statement='貸借対照表',
+        section='流動負債',
+        pages=(4,),
+        method='extract_current_liabilities',
+        description='貸借対照表「流動負債」の「流動負債合計」',
+        text_layer=('貸借対照表', ('流動負債合計',)),
+        prompt="""このPDFファイルの貸借対照表から「流動負債合計」の値を正確に抽出してください。
+
+重要な指示：
+1. 貸借対照表の「負債の部」セクションを探してください
+2. 「負債の部」の中の「流動負債」サブセクションを特定してください
+3. 「流動負債」サブセクションの最後にある「流動負債合計」という項目を見つけてください
+4. 「固定負債合計」「負債合計」「純資産合計」ではなく、必ず「流動負債合計」の値を抽出してください
+5. 「流動負債合計」に対応する金額（千円単位）を抽出してください
+6. 値が△記号で始まっている場合は、それは負の値を意味します
+7. 抽出した値をそのまま返してください
+
+注意：「固定負債合計」「負債合計」「純資産合計」ではなく、必ず「流動負債」セクションの「流動負債合計」を抽出してください。
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='ordinary_expenses',
+        label='経常費用合計',
+        statement='損益計算書',
+        section='経常費用',
+        pages=(5,),
+        method='extract_ordinary_expenses',
+        description='損益計算書「経常費用」の「経常費用合計」',
+        text_layer=('損益計算書', ('経常費用合計',)),
+        prompt="""このPDFファイルの損益計算書から「経常費用合計」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書（収支計算書）を探してください
+2. 損益計算書の「経常費用」セクションを特定してください
+3. 「経常費用」セクションの最後にある「経常費用合計」という項目を見つけてください
+4. 「経常収益合計」「当期純利益」「負債合計」ではなく、必ず「経常費用合計」の値を抽出してください
+5. 「経常費用合計」に対応する金額（千円単位）を抽出してください
+6. 値が△記号で始まっている場合は、それは負の値を意味します
+7. 抽出した値をそのまま返してください
+
+注意：「経常収益合計」「当期純利益」「負債合計」ではなく、必ず損益計算書の「経常費用合計」を抽出してください。
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='total_assets',
+        label='資産合計',
+        statement='貸借対照表',
+        section='資産の部',
+        pages=(3,),
+        method='extract_total_assets',
+        description='貸借対照表「資産の部」の「資産合計」',
+        text_layer=('貸借対照表', ('資産合計',)),
+        prompt="""このPDFファイルの貸借対照表から「資産合計」の値を正確に抽出してください。
+
+重要な指示：
+1. 貸借対照表の「資産の部」セクションを探してください
+2. 「資産の部」の最後にある「資産合計」という項目を特定してください
+3. 「負債合計」「純資産合計」ではなく、必ず「資産合計」の値を抽出してください
+4. 「資産合計」に対応する金額（千円単位）を抽出してください
+5. 値が△記号で始まっている場合は、それは負の値を意味します
+6. 抽出した値をそのまま返してください
+
+注意：「負債合計」「純資産合計」ではなく、必ず「資産の部」の「資産合計」を抽出してください。
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='current_assets',
+        label='流動資産合計',
+        statement='貸借対照表',
+        section='流動資産',
+        pages=(3,),
+        method='extract_current_assets',
+        description='貸借対照表「流動資産」の「流動資産合計」',
+        text_layer=('貸借対照表', ('流動資産合計',)),
+        prompt="""このPDFファイルの貸借対照表から「流動資産合計」の値を正確に抽出してください。
+
+重要な指示：
+1. 貸借対照表の「資産の部」セクションを探してください
+2. 「資産の部」の中の「流動資産」サブセクションを特定してください
+3. 「流動資産」サブセクションの最後にある「流動資産合計」という項目を見つけてください
+4. 「固定資産合計」「資産合計」ではなく、必ず「流動資産合計」の値を抽出してください
+5. 「流動資産合計」に対応する金額（千円単位）を抽出してください
+6. 値が△記号で始まっている場合は、それは負の値を意味します
+7. 抽出した値をそのまま返してください
+
+注意：「固定資産合計」「資産合計」ではなく、必ず「流動資産」セクションの「流動資産合計」を抽出してください。
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='fixed_assets',
+        label='固定資産合計',
+        statement='貸借対照表',
+        section='固定資産',
+        pages=(3,),
+        method='extract_fixed_assets',
+        description='貸借対照表「固定資産」の「固定資産合計」',
+        text_layer=('貸借対照表', ('固定資産合計',)),
+        prompt="""このPDFファイルの貸借対照表から「固定資産合計」の値を正確に抽出してください。
+
+重要な指示：
+1. 貸借対照表の「資産の部」セクションを探してください
+2. 「資産の部」の中の「固定資産」サブセクションを特定してください
+3. 「固定資産」サブセクションの最後にある「固定資産合計」という項目を見つけてください
+4. 「流動資産合計」「資産合計」ではなく、必ず「固定資産合計」の値を抽出してください
+5. 「固定資産合計」に対応する金額（千円単位）を抽出してください
+6. 値が△記号で始まっている場合は、それは負の値を意味します
+7. 抽出した値をそのまま返してください
+
+注意：「流動資産合計」「資産合計」ではなく、必ず「固定資産」セクションの「固定資産合計」を抽出してください。
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='total_revenue',
+        label='経常収益合計',
+        statement='損益計算書',
+        section='経常収益',
+        pages=(5,),
+        method='extract_total_revenue',
+        description='損益計算書「経常収益」の「経常収益合計」',
+        text_layer=('損益計算書', ('経常収益合計',)),
+        prompt="""このPDFファイルの損益計算書から「経常収益合計」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書（収支計算書）を探してください
+2. 損益計算書の「経常収益」セクションを特定してください
+3. 「経常収益」セクションの最後にある「経常収益合計」という項目を見つけてください
+4. 「経常費用合計」「当期純利益」ではなく、必ず「経常収益合計」の値を抽出してください
+5. 「経常収益合計」に対応する金額（千円単位）を抽出してください
+6. 値が△記号で始まっている場合は、それは負の値を意味します
+7. 抽出した値をそのまま返してください
+
+注意：「経常費用合計」「当期純利益」ではなく、必ず損益計算書の「経常収益合計」を抽出してください。
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='total_equity',
+        label='純資産合計',
+        statement='貸借対照表',
+        section='純資産の部',
+        pages=(4,),
+        method='extract_total_equity',
+        description='貸借対照表「純資産の部」の「純資産合計」',
+        text_layer=('貸借対照表', ('純資産合計',)),
+        prompt="""このPDFファイルの貸借対照表から「純資産合計」の値を正確に抽出してください。
+
+重要な指示：
+1. 貸借対照表の「純資産の部」セクションを探してください
+2. 「純資産の部」の最後にある「純資産合計」という項目を特定してください
+3. 「負債合計」「資産合計」ではなく、必ず「純資産合計」の値を抽出してください
+4. 「純資産合計」に対応する金額（千円単位）を抽出してください
+5. 値が△記号で始まっている場合は、それは負の値を意味します
+6. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='hospital_revenue',
+        label='附属病院収益',
+        statement='損益計算書',
+        section='経常収益',
+        pages=(5,),
+        method='extract_hospital_revenue',
+        description='損益計算書「経常収益」の「附属病院収益」',
+        text_layer=('損益計算書', ('附属病院収益',)),
+        prompt="""このPDFファイルの損益計算書から「附属病院収益」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書の「経常収益」セクションを探してください
+2. 「経常収益」の中の「附属病院収益」という項目を見つけてください
+3. 「附属病院収益」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='operating_grant_revenue',
+        label='運営費交付金収益',
+        statement='損益計算書',
+        section='経常収益',
+        pages=(5,),
+        method='extract_operating_grant_revenue',
+        description='損益計算書「経常収益」の「運営費交付金収益」',
+        text_layer=('損益計算書', ('運営費交付金収益',)),
+        prompt="""このPDFファイルの損益計算書から「運営費交付金収益」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書の「経常収益」セクションを探してください
+2. 「経常収益」の中の「運営費交付金収益」という項目を見つけてください
+3. 「運営費交付金収益」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='tuition_revenue',
+        label='学生納付金等収益',
+        statement='損益計算書',
+        section='経常収益',
+        pages=(5,),
+        method='extract_tuition_revenue',
+        description='損益計算書「経常収益」の「学生納付金等収益」',
+        text_layer=('損益計算書', ('学生納付金等収益',)),
+        prompt="""このPDFファイルの損益計算書から「学生納付金等収益」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書の「経常収益」セクションを探してください
+2. 「経常収益」の中の「学生納付金等収益」という項目を見つけてください
+3. 「学生納付金等収益」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='research_revenue',
+        label='受託研究等収益',
+        statement='損益計算書',
+        section='経常収益',
+        pages=(5,),
+        method='extract_research_revenue',
+        description='損益計算書「経常収益」の「受託研究等収益」',
+        text_layer=('損益計算書', ('受託研究等収益',)),
+        prompt="""このPDFファイルの損益計算書から「受託研究等収益」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書の「経常収益」セクションを探してください
+2. 「経常収益」の中の「受託研究等収益」という項目を見つけてください
+3. 「受託研究等収益」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='personnel_costs',
+        label='人件費',
+        statement='損益計算書',
+        section='経常費用',
+        pages=(5,),
+        method='extract_personnel_costs',
+        description='損益計算書「経常費用」の「人件費」',
+        text_layer=('損益計算書', ('人件費',)),
+        prompt="""このPDFファイルの損益計算書から「人件費」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書の「経常費用」セクションを探してください
+2. 「経常費用」の中の「人件費」という項目を見つけてください
+3. 「人件費」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='medical_costs',
+        label='診療経費',
+        statement='損益計算書',
+        section='経常費用',
+        pages=(5,),
+        method='extract_medical_costs',
+        description='損益計算書「経常費用」の「診療経費」',
+        text_layer=('損益計算書', ('診療経費',)),
+        prompt="""このPDFファイルの損益計算書から「診療経費」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書の「経常費用」セクションを探してください
+2. 「経常費用」の中の「診療経費」という項目を見つけてください
+3. 「診療経費」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='education_costs',
+        label='教育経費',
+        statement='損益計算書',
+        section='経常費用',
+        pages=(5,),
+        method='extract_education_costs',
+        description='損益計算書「経常費用」の「教育経費」',
+        text_layer=('損益計算書', ('教育経費',)),
+        prompt="""このPDFファイルの損益計算書から「教育経費」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書の「経常費用」セクションを探してください
+2. 「経常費用」の中の「教育経費」という項目を見つけてください
+3. 「教育経費」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='research_costs',
+        label='研究経費',
+        statement='損益計算書',
+        section='経常費用',
+        pages=(5,),
+        method='extract_research_costs',
+        description='損益計算書「経常費用」の「研究経費」',
+        text_layer=('損益計算書', ('研究経費',)),
+        prompt="""このPDFファイルの損益計算書から「研究経費」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書の「経常費用」セクションを探してください
+2. 「経常費用」の中の「研究経費」という項目を見つけてください
+3. 「研究経費」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='operating_loss',
+        label='経常損失',
+        statement='損益計算書',
+        pages=(5,),
+        sign='loss',
+        method='extract_operating_loss',
+        description='損益計算書の「経常損失」',
+        text_layer=('損益計算書', ('経常損失',)),
+        prompt="""このPDFファイルの損益計算書から「経常損失」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書を探してください
+2. 「経常損失」という項目を見つけてください
+3. 「経常損失」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='net_loss',
+        label='当期純損失',
+        statement='損益計算書',
+        pages=(5,),
+        sign='loss',
+        method='extract_net_loss',
+        description='損益計算書の「当期純損失」',
+        text_layer=('損益計算書', ('当期純損失',)),
+        prompt="""このPDFファイルの損益計算書から「当期純損失」の値を正確に抽出してください。
+
+重要な指示：
+1. 損益計算書を探してください
+2. 「当期純損失」という項目を見つけてください
+3. 「当期純損失」に対応する金額（千円単位）を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='operating_cf',
+        label='営業活動によるキャッシュフロー合計',
+        statement='キャッシュ・フロー計算書',
+        section='営業活動によるキャッシュフロー',
+        pages=(6,),
+        method='extract_operating_cash_flow',
+        description='キャッシュフロー計算書の「営業活動によるキャッシュフロー合計」',
+        text_layer=('キャッシュ・フロー計算書', ('営業活動によるキャッシュ・フロー', '業務活動によるキャッシュ・フロー')),
+        prompt="""このPDFファイルのキャッシュフロー計算書から「営業活動によるキャッシュフロー合計」の値を正確に抽出してください。
+
+重要な指示：
+1. キャッシュフロー計算書を探してください
+2. 「営業活動によるキャッシュフロー」セクションを見つけてください
+3. 「営業活動によるキャッシュフロー合計」という項目を特定してください
+4. 「営業活動によるキャッシュフロー合計」に対応する金額（千円単位）を抽出してください
+5. 値が△記号で始まっている場合は、それは負の値を意味します
+6. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='investing_cf',
+        label='投資活動によるキャッシュフロー合計',
+        statement='キャッシュ・フロー計算書',
+        section='投資活動によるキャッシュフロー',
+        pages=(6,),
+        method='extract_investing_cash_flow',
+        description='キャッシュフロー計算書の「投資活動によるキャッシュフロー合計」',
+        text_layer=('キャッシュ・フロー計算書', ('投資活動によるキャッシュ・フロー',)),
+        prompt="""このPDFファイルのキャッシュフロー計算書から「投資活動によるキャッシュフロー合計」の値を正確に抽出してください。
+
+重要な指示：
+1. キャッシュフロー計算書を探してください
+2. 「投資活動によるキャッシュフロー」セクションを見つけてください
+3. 「投資活動によるキャッシュフロー合計」という項目を特定してください
+4. 「投資活動によるキャッシュフロー合計」に対応する金額（千円単位）を抽出してください
+5. 値が△記号で始まっている場合は、それは負の値を意味します
+6. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='financing_cf',
+        label='財務活動によるキャッシュフロー合計',
+        statement='キャッシュ・フロー計算書',
+        section='財務活動によるキャッシュフロー',
+        pages=(6,),
+        method='extract_financing_cash_flow',
+        description='キャッシュフロー計算書の「財務活動によるキャッシュフロー合計」',
+        text_layer=('キャッシュ・フロー計算書', ('財務活動によるキャッシュ・フロー',)),
+        prompt="""このPDFファイルのキャッシュフロー計算書から「財務活動によるキャッシュフロー合計」の値を正確に抽出してください。
+
+重要な指示：
+1. キャッシュフロー計算書を探してください
+2. 「財務活動によるキャッシュフロー」セクションを見つけてください
+3. 「財務活動によるキャッシュフロー合計」という項目を特定してください
+4. 「財務活動によるキャッシュフロー合計」に対応する金額（千円単位）を抽出してください
+5. 値が△記号で始まっている場合は、それは負の値を意味します
+6. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='academic_segment',
+        label='業務損益',
+        statement='開示すべきセグメント情報',
+        section='学部・研究科等',
+        pages=(24,),
+        method='extract_academic_segment_profit',
+        description='「開示すべきセグメント情報」表の「学部・研究科等」行の「業務損益」',
+        prompt="""このPDFファイルの24ページにある「(19) 開示すべきセグメント情報」という表から、「学部・研究科等」行の「業務損益」の値を正確に抽出してください。
+
+重要な指示：
+1. 24ページの「(19) 開示すべきセグメント情報」表を探してください
+2. その表の中で「学部・研究科等」という行を見つけてください
+3. 「学部・研究科等」行の「業務損益」列の値を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='school_segment',
+        label='業務損益',
+        statement='開示すべきセグメント情報',
+        section='附属学校',
+        pages=(24,),
+        method='extract_school_segment_loss',
+        description='「開示すべきセグメント情報」表の「附属学校」行の「業務損益」',
+        prompt="""このPDFファイルの24ページにある「(19) 開示すべきセグメント情報」という表から、「附属学校」行の「業務損益」の値を正確に抽出してください。
+
+重要な指示：
+1. 24ページの「(19) 開示すべきセグメント情報」表を探してください
+2. その表の中で「附属学校」という行を見つけてください
+3. 「附属学校」行の「業務損益」列の値を抽出してください
+4. 値が△記号で始まっている場合は、それは負の値を意味します
+5. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='business_implementation_cost',
+        label='業務実施コスト',
+        statement='国立大学法人等業務実施コスト計算書',
+        pages=(8,),
+        kind='table',
+        method='extract_business_implementation_cost',
+        prompt="""このPDFファイルの8ページにある「国立大学法人等業務実施コスト計算書」から全ての数値データを正確に抽出してください。
+
+重要な指示：
+1. 8ページの「国立大学法人等業務実施コスト計算書」を探してください
+2. 表の全ての行と列の数値を抽出してください
+3. 値が△記号で始まっている場合は、それは負の値を意味します
+4. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='fixed_asset_details',
+        label='固定資産明細',
+        statement='固定資産の取得及び処分並びに減価償却費及び減損損失の明細',
+        pages=(11,),
+        kind='table',
+        method='extract_fixed_asset_details',
+        prompt="""このPDFファイルの11ページにある「1. 固定資産の取得及び処分並びに減価償却費及び減損損失の明細」表から全ての数値データを正確に抽出してください。
+
+重要な指示：
+1. 11ページの「固定資産の取得及び処分並びに減価償却費及び減損損失の明細」表を探してください
+2. 表の全ての行と列の数値を抽出してください
+3. 値が△記号で始まっている場合は、それは負の値を意味します
+4. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='borrowing_details',
+        label='借入金明細',
+        statement='借入金の明細',
+        pages=(13,),
+        kind='table',
+        method='extract_borrowing_details',
+        prompt="""このPDFファイルの13ページにある「8. 借入金の明細」表から全ての数値データを正確に抽出してください。
+
+重要な指示：
+1. 13ページの「借入金の明細」表を探してください
+2. 表の全ての行と列の数値を抽出してください
+3. 値が△記号で始まっている場合は、それは負の値を意味します
+4. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),
+    FieldSpec(
+        key='operational_cost_details',
+        label='業務費及び一般管理費明細',
+        statement='業務費及び一般管理費の明細',
+        pages=(15, 16),
+        kind='table',
+        method='extract_operational_cost_details',
+        prompt="""このPDFファイルの15-16ページにある「15. 業務費及び一般管理費の明細」表から全ての数値データを正確に抽出してください。
+
+重要な指示：
+1. 15-16ページの「業務費及び一般管理費の明細」表を探してください
+2. 表の全ての行と列の数値を抽出してください
+3. 値が△記号で始まっている場合は、それは負の値を意味します
+4. 抽出した値をそのまま返してください
+
+回答は抽出した値のみを返してください。説明は不要です。"""
+    ),]}
+
+
+@dataclass(frozen=True)
+class VotePolicy:
+    """Self-consistency voting: draw up to ``samples`` answers at ``temperature``, stop once ``agree`` match"""
+    samples: int = 5
+    agree: int = 3
+    temperature: float = 0.7
+
+
+# Fields whose sign is most often misread, voted on when an extractor has voting switched on
+VOTING_FIELDS: Dict[str, VotePolicy] = {
+    'segment_profit_loss': VotePolicy(),
+    'academic_segment': VotePolicy(),
+    'school_segment': VotePolicy()
+}
+
+
+def apply_sign_rule(key: str, value: Optional[int]) -> Optional[int]:
+    """Apply the field's sign rule to a parsed amount"""
+    if value is None:
+        return None
+    if FIELD_REGISTRY[key].sign == 'loss':
+        return -abs(value)
+    return value
+
+
+def field_fingerprint(key: str, model_name: str, document_sha256: str) -> str:
+    """Hash of everything that decides a field's value: its spec (prompt included), the model and the document"""
+    payload = json.dumps([astuple(FIELD_REGISTRY[key]), model_name, document_sha256], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def plan_calls(keys: Sequence[str], group_by: str = 'statement',
+               max_fields_per_call: int = DEFAULT_MAX_FIELDS_PER_CALL) -> List[PlannedCall]:
+    """Group the requested fields into as few model calls as possible.
+
+    Amount fields sharing a statement (or, with ``group_by='page'``, the same
+    expected pages) go into one call, split only when a group exceeds
+    ``max_fields_per_call``. With ``group_by='single'`` every amount field
+    goes into one call, unsplit. Table fields always get a call of their own.
+    Calls are returned in the order their first field was requested.
+    """
+    if group_by not in GROUP_BY_OPTIONS:
+        raise ValueError(f'Unknown grouping: {group_by}')
+
+    groups: Dict[Tuple, PlannedCall] = {}
+    plan: List[PlannedCall] = []
+    for key in keys:
+        spec = FIELD_REGISTRY[key]
+        if spec.kind != 'amount':
+            plan.append(PlannedCall(spec.statement, spec.pages, [key]))
+            continue
+        if group_by == 'single':
+            group_key, name, limit = (), 'batch', len(keys)
+        elif group_by == 'statement':
+            group_key, name, limit = (spec.statement,), spec.statement, max_fields_per_call
+        else:
+            group_key, name, limit = spec.pages, f"page {'-'.join(str(page) for page in spec.pages)}", max_fields_per_call
+        call = groups.get(group_key)
+        if call is None or len(call.fields) >= limit:
+            call = PlannedCall(name, (), [])
+            groups[group_key] = call
+            plan.append(call)
+        call.fields.append(key)
+        call.pages = tuple(sorted(set(call.pages) | set(spec.pages)))
+    return plan
+
+
+def format_plan(plan: Sequence[PlannedCall]) -> str:
+    """Human-readable call plan, one line per model call"""
+    lines = [f"{len(plan)} model call(s) for {sum(len(call.fields) for call in plan)} field(s):"]
+    lines.extend(f"  {number}. {call.describe()}" for number, call in enumerate(plan, start=1))
+    return '\n'.join(lines)
+
+
+def build_group_prompt(keys: Sequence[str], pages: Optional[Sequence[int]] = None) -> str:
+    """Prompt asking for several amount fields at once as a JSON object.
+
+    When ``pages`` is given the document sent is a slice holding only those
+    pages of the original, and the prompt says so.
+    """
+    specs = [FIELD_REGISTRY[key] for key in keys]
+    targets = '\n'.join(
+        f"- {spec.key}: {spec.target()}（{spec.unit}）" + ('　※損失の金額' if spec.sign == 'loss' else '')
+        for spec in specs
+    )
+    example = ', '.join(f'"{spec.key}": "1,234,567"' for spec in specs[:2])
+    slice_note = ''
+    if pages:
+        page_list = '、'.join(f'{page}ページ' for page in pages)
+        slice_note = (f"このPDFファイルは元の文書から{page_list}のみを抜き出したものです。"
+                      f"ページ番号は元の文書のページ番号です。\n\n")
+    return f"""{slice_note}このPDFファイルの財務諸表から、以下の各項目の値を正確に抽出してください。
+
+抽出する項目（キー: 抽出対象）:
+{targets}
+
+重要な指示：
+1. 各項目は指定された財務諸表・表・行から抽出してください
+2. 金額は表に記載されている単位の表記のまま抽出してください
+3. 値が△記号で始まっている場合は、それは負の値を意味します。△記号は残してください
+4. 値は表に記載されている文字列のまま返してください（例：27,947,258、△410,984）
+5. 見つからない項目は null としてください
+
+以下のJSONフォーマットで、全てのキーを含めて返してください：
+{{{example}, ...}}
+
+JSONのみを返してください。説明は不要です。"""
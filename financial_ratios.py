@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+# Ratio inputs, in 千円: name -> extract_financial_data key, then (statement, section or None for any, account)
+# alternatives as the figures are named in a FinancialStore
+INPUT_FIELDS: Dict[str, Tuple[str, Tuple[Tuple[str, Optional[str], str], ...]]] = {
+    'total_assets': ('資産合計', (('貸借対照表', None, '資産合計'), ('貸借対照表', '資産の部', 'totalAssets'))),
+    'current_assets': ('流動資産合計', (('貸借対照表', None, '流動資産合計'), ('貸借対照表', '資産の部', 'currentAssets'))),
+    'fixed_assets': ('固定資産合計', (('貸借対照表', None, '固定資産合計'), ('貸借対照表', '資産の部', 'fixedAssets'))),
+    'total_liabilities': ('負債合計', (('貸借対照表', None, '負債合計'),
+                                       ('貸借対照表', '負債・純資産の部', 'liabilities'))),
+    'current_liabilities': ('流動負債合計', (('貸借対照表', None, '流動負債合計'),
+                                             ('貸借対照表', '負債・純資産の部/liabilities', 'currentLiabilities'))),
+    'total_equity': ('純資産合計', (('貸借対照表', None, '純資産合計'), ('貸借対照表', '負債・純資産の部', 'netAssets'))),
+    'ordinary_revenue': ('経常収益合計', (('損益計算書', None, '経常収益合計'), ('損益計算書', '', 'ordinaryRevenues'))),
+    'ordinary_expenses': ('経常費用合計', (('損益計算書', None, '経常費用合計'), ('損益計算書', '', 'ordinaryExpenses'))),
+    'hospital_revenue': ('附属病院収益', (('損益計算書', None, '附属病院収益'),)),
+    'personnel_costs': ('人件費', (('損益計算書', None, '人件費'),)),
+    'hospital_segment': ('附属病院業務損益', (('セグメント情報', '附属病院', '業務損益'),
+                                              ('セグメント情報', 'operatingProfitLoss', '附属病院'))),
+    'academic_segment': ('学部・研究科等業務損益', (('セグメント情報', '学部・研究科等', '業務損益'),
+                                                    ('セグメント情報', 'operatingProfitLoss', '学部研究科等'))),
+    'school_segment': ('附属学校業務損益', (('セグメント情報', '附属学校', '業務損益'),
+                                            ('セグメント情報', 'operatingProfitLoss', '附属学校')))
+}
+INPUT_INDEX = {name: index for index, name in enumerate(INPUT_FIELDS)}
+
+# name -> (numerator, denominator, scale); definitions follow utils/financialDataConverter.ts.
+# Segment revenue is not extracted, so the hospital margin is taken over 附属病院収益 and the
+# other segment margins over 経常収益合計.
+RATIO_DEFINITIONS = {
+    'current_ratio': ('current_assets', 'current_liabilities', 1.0),
+    'fixed_ratio': ('fixed_assets', 'total_equity', 1.0),
+    'equity_ratio': ('total_equity', 'total_assets', 100.0),
+    'debt_ratio': ('total_liabilities', 'total_equity', 100.0),
+    'personnel_cost_ratio': ('personnel_costs', 'ordinary_expenses', 100.0),
+    'hospital_revenue_dependency': ('hospital_revenue', 'ordinary_revenue', 100.0),
+    'hospital_segment_margin': ('hospital_segment', 'hospital_revenue', 100.0),
+    'academic_segment_margin': ('academic_segment', 'ordinary_revenue', 100.0),
+    'school_segment_margin': ('school_segment', 'ordinary_revenue', 100.0)
+}
+
+
+@dataclass
+class RatioInputs:
+    """One row per institution-year; ``values`` holds INPUT_FIELDS columns with NaN for missing figures"""
+    institutions: np.ndarray
+    fiscal_years: np.ndarray
+    institution_types: np.ndarray
+    values: np.ndarray
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, INPUT_INDEX[name]]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def load_financial_data(results: Sequence[Dict[str, Any]], fiscal_years: Optional[Sequence[int]] = None,
+                        institution_type: str = 'national_university') -> RatioInputs:
+    """RatioInputs from extract_financial_data outputs, one row per output"""
+    from financial_store import parse_fiscal_year, institution_type as type_of
+    values = np.array([
+        [result.get(key) if result.get(key) is not None else np.nan for key, _ in INPUT_FIELDS.values()]
+        for result in results
+    ], dtype=np.float64).reshape(len(results), len(INPUT_FIELDS))
+    institutions = np.array([result.get('companyName', '') for result in results], dtype=str)
+    years = fiscal_years if fiscal_years is not None else [parse_fiscal_year(result.get('fiscalYear')) or 0
+                                                            for result in results]
+    types = [type_of(name) if name else institution_type for name in institutions]
+    return RatioInputs(institutions, np.asarray(years, dtype=np.int64), np.array(types, dtype=str), values)
+
+
+def load_store(store, **filters: Any) -> RatioInputs:
+    """RatioInputs pivoted from a FinancialStore, one row per institution-year matching ``filters``"""
+    columns = store.export_columns(**filters)
+    institutions = np.array(columns['institution'], dtype=str)
+    years = np.array(columns['fiscal_year'], dtype=np.int64)
+    statements = np.array(columns['statement'], dtype=str)
+    sections = np.array(columns['section'], dtype=str)
+    accounts = np.array(columns['account'], dtype=str)
+    amounts = np.array(columns['amount'], dtype=np.float64)
+    types = np.array(columns['institution_type'], dtype=str)
+
+    keys = np.char.add(np.char.add(institutions, '\x00'), years.astype(str))
+    unique_keys, first, row_of = np.unique(keys, return_index=True, return_inverse=True)
+    values = np.full((len(unique_keys), len(INPUT_FIELDS)), np.nan)
+    for column, (_, alternatives) in enumerate(INPUT_FIELDS.values()):
+        for statement, section, account in alternatives:
+            mask = (accounts == account) & (statements == statement)
+            if section is not None:
+                mask &= sections == section
+            rows = row_of[mask]
+            missing = np.isnan(values[rows, column])
+            values[rows[missing], column] = amounts[mask][missing]
+    return RatioInputs(institutions[first], years[first], types[first], values)
+
+
+def compute_ratios(inputs: RatioInputs) -> Dict[str, np.ndarray]:
+    """Every RATIO_DEFINITIONS ratio for every row; NaN where an input is missing or a denominator is 0"""
+    ratios = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, (numerator, denominator, scale) in RATIO_DEFINITIONS.items():
+            top, bottom = inputs.column(numerator), inputs.column(denominator)
+            ratios[name] = np.where(bottom != 0, top / bottom * scale, np.nan)
+    return ratios
+
+
+def percentile_ranks(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Percentile rank (0-100) of each value among the values sharing its group.
+
+    Ties share the mid rank: (peers below + half the equal values) / peers.
+    NaN values are left out of the ranking and get NaN.
+    """
+    ranks = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if not len(valid):
+        return ranks
+    group_codes = np.unique(groups[valid], return_inverse=True)[1]
+    order = np.lexsort((values[valid], group_codes))
+    sorted_groups, sorted_values = group_codes[order], values[valid][order]
+    count = len(order)
+
+    group_change = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+    group_starts = np.flatnonzero(group_change)
+    group_id = np.cumsum(group_change) - 1
+    group_sizes = np.diff(np.r_[group_starts, count])
+
+    run_change = group_change | np.r_[True, sorted_values[1:] != sorted_values[:-1]]
+    run_starts = np.flatnonzero(run_change)
+    run_id = np.cumsum(run_change) - 1
+    run_sizes = np.diff(np.r_[run_starts, count])
+
+    below = run_starts[run_id] - group_starts[group_id]
+    ranks[valid[order]] = (below + 0.5 * run_sizes[run_id]) / group_sizes[group_id] * 100.0
+    return ranks
+
+
+def peer_groups(inputs: RatioInputs, peer_by: Sequence[str] = ('institution_type', 'fiscal_year')) -> np.ndarray:
+    """Integer peer-group code per row, from ``peer_by`` ('institution_type', 'fiscal_year', 'institution')"""
+    parts = {
+        'institution_type': inputs.institution_types,
+        'fiscal_year': inputs.fiscal_years,
+        'institution': inputs.institutions
+    }
+    codes = np.zeros(len(inputs), dtype=np.int64)
+    for name in peer_by:
+        labels, part = np.unique(parts[name], return_inverse=True)
+        codes = codes * len(labels) + part
+    return codes
+
+
+def peer_comparison(inputs: RatioInputs,
+                    peer_by: Sequence[str] = ('institution_type', 'fiscal_year')) -> Dict[str, np.ndarray]:
+    """Ratios plus ``<ratio>_percentile`` ranks within each peer group, column-wise"""
+    ratios = compute_ratios(inputs)
+    groups = peer_groups(inputs, peer_by)
+    table = {
+        'institution': inputs.institutions,
+        'fiscal_year': inputs.fiscal_years,
+        'institution_type': inputs.institution_types
+    }
+    for name, values in ratios.items():
+        table[name] = values
+        table[f'{name}_percentile'] = percentile_ranks(values, groups)
+    return table
+
+
+def to_records(table: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Column-wise table as JSON-ready records, NaN as None"""
+    names = list(table)
+    records = []
+    for row in zip(*(table[name].tolist() for name in names)):
+        records.append({name: (None if isinstance(value, float) and value != value else value)
+                        for name, value in zip(names, row)})
+    return records
+
+
+def synthetic_inputs(count: int, institutions: int = 90, seed: int = 0) -> RatioInputs:
+    """Random but plausible institution-years for benchmarking, with about 2% of figures missing"""
+    rng = np.random.default_rng(seed)
+    total_assets = rng.lognormal(17.5, 0.8, count)
+    current_assets = total_assets * rng.uniform(0.05, 0.25, count)
+    total_liabilities = total_assets * rng.uniform(0.2, 0.6, count)
+    ordinary_revenue = total_assets * rng.uniform(0.2, 0.6, count)
+    hospital_revenue = ordinary_revenue * rng.uniform(0.0, 0.6, count)
+    values = np.column_stack([
+        total_assets,
+        current_assets,
+        total_assets - current_assets,
+        total_liabilities,
+        total_liabilities * rng.uniform(0.2, 0.5, count),
+        total_assets - total_liabilities,
+        ordinary_revenue,
+        ordinary_revenue * rng.uniform(0.97, 1.03, count),
+        hospital_revenue,
+        ordinary_revenue * rng.uniform(0.4, 0.6, count),
+        hospital_revenue * rng.normal(0.0, 0.03, count),
+        ordinary_revenue * rng.normal(0.01, 0.01, count),
+        ordinary_revenue * rng.normal(0.002, 0.002, count)
+    ]).round()
+    values[rng.random(values.shape) < 0.02] = np.nan
+    names = np.array([f'国立大学法人{index % institutions}大学' for index in range(count)], dtype=str)
+    years = 2004 + np.arange(count) // institutions
+    return RatioInputs(names, years.astype(np.int64), np.full(count, 'national_university', dtype='<U19'), values)
+
+
+def run_benchmark(count: int = 10_000) -> None:
+    inputs = synthetic_inputs(count)
+    started = time.perf_counter()
+    table = peer_comparison(inputs)
+    elapsed = time.perf_counter() - started
+    print(f"⏱️  {len(RATIO_DEFINITIONS)} ratios and peer percentiles for {count:,} institution-years "
+          f"in {elapsed * 1000:.1f} ms")
+    print(f"   median equity ratio {np.nanmedian(table['equity_ratio']):.1f}%, "
+          f"median hospital revenue dependency {np.nanmedian(table['hospital_revenue_dependency']):.1f}%")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from contextlib import closing
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+DEFAULT_STORE_PATH = 'financial_store.sqlite3'
+
+# Japanese era name -> Gregorian year of its first year
+ERA_START_YEARS = {'令和': 2019, '平成': 1989, '昭和': 1926}
+
+INSTITUTION_TYPES = (
+    ('国立大学法人', 'national_university'),
+    ('大学共同利用機関法人', 'inter_university_research_institute'),
+    ('公立大学法人', 'public_university'),
+    ('独立行政法人', 'incorporated_administrative_agency'),
+    ('学校法人', 'private_school_corporation')
+)
+
+# Units the figures arrive in, relative to the store's unit (千円)
+UNIT_DIVISORS = {'円': 1000, '千円': 1}
+
+COLUMNS = ('institution', 'institution_type', 'fiscal_year', 'statement', 'section', 'account', 'amount',
+           'source_format', 'document_sha256', 'source_path')
+
+# Keys of a batch_extractor result, one per rendered output format
+OUTPUT_FORMATS = ('financial_data', 'tables', 'complete')
+
+Row = Tuple[str, str, int, str, str, str, int, str, Optional[str], Optional[str]]
+
+
+def parse_fiscal_year(value: Any) -> Optional[int]:
+    """Gregorian start year of a fiscal year such as 平成27年度, 令和元事業年度, 2015 or '2015年度'"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if not isinstance(value, str):
+        return None
+    match = re.search(r'(令和|平成|昭和)\s*(元|\d+)', value)
+    if match:
+        era_year = 1 if match.group(2) == '元' else int(match.group(2))
+        return ERA_START_YEARS[match.group(1)] + era_year - 1
+    match = re.search(r'(\d{4})', value)
+    return int(match.group(1)) if match else None
+
+
+def institution_type(institution: str) -> str:
+    for prefix, name in INSTITUTION_TYPES:
+        if institution.startswith(prefix):
+            return name
+    return 'other'
+
+
+def _normalise_statement(table_name: str) -> Tuple[str, str]:
+    """Statement name and section prefix, e.g. '貸借対照表 - 資産の部' -> ('貸借対照表', '資産の部')"""
+    statement, _, section = table_name.partition(' - ')
+    return statement.replace('キャッシュ・フロー', 'キャッシュフロー').strip(), section.strip()
+
+
+def _is_amount(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _flatten(node: Any, path: Tuple[str, ...], skip_zero: bool) -> Iterator[Tuple[str, str, float]]:
+    """(section, account, amount) for every figure in a nested statement body.
+
+    Dict keys become the section path. A 'total' leaf is the account named by
+    its parent key; list items are named by their account or segment.
+    """
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if _is_amount(value):
+                if skip_zero and value == 0:
+                    continue
+                if key == 'total' and path:
+                    yield '/'.join(path[:-1]), path[-1], value
+                else:
+                    yield '/'.join(path), key, value
+            else:
+                # An 'items' list belongs to the section that holds it
+                yield from _flatten(value, path if key == 'items' else path + (key,), skip_zero)
+    elif isinstance(node, list):
+        for item in node:
+            if not isinstance(item, dict):
+                continue
+            name = item.get('account') or item.get('segment')
+            amount = item.get('amount')
+            if name and _is_amount(amount) and not (skip_zero and amount == 0):
+                category = item.get('category')
+                yield '/'.join(path + ((category,) if category else ())), name, amount
+            elif not name:
+                yield from _flatten(item, path, skip_zero)
+
+
+def _document_identity(financial_data: Any) -> Dict[str, Any]:
+    """Cover-page institution and fiscal year recorded in extract_financial_data output, if any"""
+    if not isinstance(financial_data, dict):
+        return {}
+    return (financial_data.get('extraction_metadata') or {}).get('document') or {}
+
+
+class FinancialStore:
+    """SQLite store of extracted figures keyed by institution, fiscal year, statement and account.
+
+    Every supported extraction output is flattened to one row per figure,
+    with amounts normalised to 千円. Re-ingesting a figure replaces it, so
+    the store always holds the latest extraction. Indexes on (account,
+    fiscal_year) and (statement, account, fiscal_year) keep range queries
+    across institutions and years fast.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_STORE_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS figures (
+                    institution TEXT NOT NULL,
+                    institution_type TEXT NOT NULL,
+                    fiscal_year INTEGER NOT NULL,
+                    statement TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    account TEXT NOT NULL,
+                    amount INTEGER NOT NULL,
+                    source_format TEXT NOT NULL,
+                    document_sha256 TEXT,
+                    source_path TEXT,
+                    ingested_at REAL NOT NULL,
+                    PRIMARY KEY (institution, fiscal_year, statement, section, account)
+                ) WITHOUT ROWID
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_figures_account_year '
+                         'ON figures(account, fiscal_year, institution_type)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_figures_statement_account_year '
+                         'ON figures(statement, account, fiscal_year)')
+
+    @classmethod
+    def from_env(cls) -> 'FinancialStore':
+        """Open the store at FINANCIAL_STORE_PATH (default: financial_store.sqlite3)"""
+        return cls(os.getenv('FINANCIAL_STORE_PATH', DEFAULT_STORE_PATH))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def rows(self, result: Any, institution: Optional[str] = None, fiscal_year: Any = None,
+             source_path: Optional[str] = None) -> List[Row]:
+        """Flatten one extraction output into store rows.
+
+        Accepts extract_financial_data output, the structured table list, the
+        complete statement list (``financial_statements`` or the master file's
+        ``financialStatements``), or a dict of those keyed by output format
+        as written by batch_extractor. ``institution`` and ``fiscal_year``
+        override the names carried by the output itself.
+
+        extract_financial_data's companyName and fiscalYear are fixed
+        placeholders, so for that shape only the cover-page identity in
+        extraction_metadata.document counts. Output that names no institution
+        or fiscal year raises ValueError instead of landing on another
+        document's key.
+        """
+        if isinstance(result, dict) and result and set(result) <= set(OUTPUT_FORMATS):
+            identity = _document_identity(result.get('financial_data'))
+            institution = institution or identity.get('institution')
+            fiscal_year = fiscal_year or identity.get('fiscal_year')
+            return [row for value in result.values()
+                    for row in self.rows(value, institution, fiscal_year, source_path)]
+
+        meta = result if isinstance(result, dict) else {}
+        if 'statements' in meta:
+            identity = _document_identity(meta)
+        else:
+            identity = {'institution': meta.get('companyName'), 'fiscal_year': meta.get('fiscalYear')}
+        institution = institution or identity.get('institution')
+        year = parse_fiscal_year(fiscal_year or identity.get('fiscal_year'))
+        if not institution or year is None:
+            raise ValueError('Extraction output names no institution or fiscal year; pass them explicitly')
+        document_sha256 = (meta.get('extraction_metadata') or {}).get('document_sha256')
+        kind = institution_type(institution)
+
+        figures: List[Tuple[str, str, str, float, str]] = []
+        if 'statements' in meta:
+            # extract_financial_data nests its statements in yen
+            for table_name, body in meta['statements'].items():
+                statement, prefix = _normalise_statement(table_name)
+                for section, account, amount in _flatten(body, (prefix,) if prefix else (), False):
+                    figures.append((statement, section, account, amount / UNIT_DIVISORS['円'], 'financial_data'))
+        else:
+            complete = 'financial_statements' in meta
+            tables = meta.get('financial_statements') or meta.get('financialStatements') or (
+                result if isinstance(result, list) else [])
+            for table in tables:
+                if not isinstance(table, dict) or not table.get('tableName'):
+                    continue
+                statement, prefix = _normalise_statement(table['tableName'])
+                divisor = UNIT_DIVISORS.get(table.get('unit', '千円'), 1)
+                # The complete statements use 0 as the placeholder the model fills in
+                for section, account, amount in _flatten(table.get('data'), (prefix,) if prefix else (), complete):
+                    figures.append((statement, section, account, amount / divisor,
+                                    'complete' if complete else 'tables'))
+
+        return [(institution, kind, year, statement, section, account, round(amount), source_format,
+                 document_sha256, source_path)
+                for statement, section, account, amount, source_format in figures]
+
+    def ingest(self, result: Any, institution: Optional[str] = None, fiscal_year: Any = None,
+               source_path: Optional[str] = None) -> int:
+        """Store every figure of one extraction output and return how many were written"""
+        return self.ingest_rows(self.rows(result, institution, fiscal_year, source_path))
+
+    def ingest_rows(self, rows: Iterable[Row]) -> int:
+        now = time.time()
+        rows = [row + (now,) for row in rows]
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN')
+            conn.executemany(f"""
+                INSERT OR REPLACE INTO figures ({', '.join(COLUMNS)}, ingested_at)
+                VALUES ({', '.join('?' * (len(COLUMNS) + 1))})
+            """, rows)
+            conn.execute('COMMIT')
+        return len(rows)
+
+    def ingest_file(self, path: str, institution: Optional[str] = None, fiscal_year: Any = None) -> int:
+        """Ingest a single-document JSON output, or a batch_extractor JSONL file.
+
+        Batch records carry their own ``institution`` and ``fiscal_year``,
+        which take precedence over the arguments. Failed records, and records
+        naming no institution or fiscal year, are skipped with a warning.
+        """
+        rows: List[Row] = []
+        with open(path, 'r', encoding='utf-8') as f:
+            if not path.endswith('.jsonl'):
+                rows = self.rows(json.load(f), institution, fiscal_year, os.path.abspath(path))
+            else:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    if record.get('status') != 'ok':
+                        continue
+                    try:
+                        rows.extend(self.rows(record['result'], record.get('institution') or institution,
+                                              record.get('fiscal_year') or fiscal_year, record.get('pdf_path')))
+                    except ValueError as error:
+                        print(f"⚠️  Skipped {record.get('pdf_path')}: {error}", file=sys.stderr)
+        return self.ingest_rows(rows)
+
+    def _where(self, account: Optional[str], start_year: Optional[int], end_year: Optional[int],
+               institutions: Optional[Sequence[str]], kind: Optional[str],
+               statement: Optional[str]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, value in (('account', account), ('statement', statement), ('institution_type', kind)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if start_year is not None:
+            clauses.append('fiscal_year >= ?')
+            params.append(start_year)
+        if end_year is not None:
+            clauses.append('fiscal_year <= ?')
+            params.append(end_year)
+        if institutions:
+            clauses.append(f"institution IN ({', '.join('?' * len(institutions))})")
+            params.extend(institutions)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, account: Optional[str] = None, start_year: Optional[int] = None,
+              end_year: Optional[int] = None, institutions: Optional[Sequence[str]] = None,
+              institution_type: Optional[str] = None, statement: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Figures matching every given filter, ordered by institution, fiscal year and account.
+
+        e.g. ``query('附属病院収益', 2015, 2024, institution_type='national_university')``
+        """
+        where, params = self._where(account, start_year, end_year, institutions, institution_type, statement)
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(f"""
+                SELECT {', '.join(COLUMNS)} FROM figures{where}
+                ORDER BY institution, fiscal_year, statement, section, account
+            """, params)
+            return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def series(self, account: str, **filters: Any) -> Dict[str, Dict[int, int]]:
+        """{institution: {fiscal_year: amount}} for one account"""
+        series: Dict[str, Dict[int, int]] = {}
+        for row in self.query(account, **filters):
+            series.setdefault(row['institution'], {})[row['fiscal_year']] = row['amount']
+        return series
+
+    def export_columns(self, **filters: Any) -> Dict[str, list]:
+        """Matching figures as one list per column"""
+        rows = self.query(**filters)
+        return {column: [row[column] for row in rows] for column in COLUMNS}
+
+    def export(self, path: str, **filters: Any) -> int:
+        """Write matching figures column-wise to ``path``: .npz (NumPy arrays) or .json (one list per column)"""
+        columns = self.export_columns(**filters)
+        if path.endswith('.npz'):
+            import numpy as np
+            np.savez_compressed(path, **{
+                name: np.asarray(values, dtype=np.int64) if name in ('fiscal_year', 'amount')
+                else np.asarray(['' if value is None else value for value in values], dtype=str)
+                for name, values in columns.items()
+            })
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(columns, f, ensure_ascii=False)
+        return len(columns['amount'])
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            figures, institutions, years = conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT institution), COUNT(DISTINCT fiscal_year) FROM figures'
+            ).fetchone()
+        return {'figures': figures, 'institutions': institutions, 'fiscal_years': years}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Store extracted figures and query them across institutions and years')
+    parser.add_argument('--store', default=os.getenv('FINANCIAL_STORE_PATH', DEFAULT_STORE_PATH),
+                        help='SQLite file (default: FINANCIAL_STORE_PATH or financial_store.sqlite3)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help='add extraction outputs (.json) or batch results (.jsonl)')
+    ingest.add_argument('paths', nargs='+')
+    ingest.add_argument('--institution', help='institution name, when the output does not carry the right one')
+    ingest.add_argument('--fiscal-year', help='fiscal year (e.g. 2015 or 平成27年度), likewise')
+
+    for name, help_text in (('query', 'print matching figures as JSON lines'),
+                            ('export', 'write matching figures column-wise (.npz or .json)')):
+        command = commands.add_parser(name, help=help_text)
+        if name == 'export':
+            command.add_argument('output')
+        command.add_argument('--account')
+        command.add_argument('--statement')
+        command.add_argument('--from', dest='start_year', type=int)
+        command.add_argument('--to', dest='end_year', type=int)
+        command.add_argument('--institution', dest='institutions', action='append')
+        command.add_argument('--type', dest='institution_type',
+                             choices=[name for _, name in INSTITUTION_TYPES] + ['other'])
+    args = parser.parse_args()
+
+    store = FinancialStore(args.store)
+    if args.command == 'ingest':
+        for path in args.paths:
+            count = store.ingest_file(path, args.institution, args.fiscal_year)
+            print(f"📥 {path}: {count} figure(s)", file=sys.stderr)
+        print(f"🗃️  {store.stats()}", file=sys.stderr)
+        return
+
+    filters = {name: getattr(args, name) for name in
+               ('account', 'statement', 'start_year', 'end_year', 'institutions', 'institution_type')}
+    if args.command == 'query':
+        for row in store.query(**filters):
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        count = store.export(args.output, **filters)
+        print(f"💾 {count} figure(s) written to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+
+import os
+import io
+import time
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import google.generativeai as genai
+from pypdf import PdfReader
+from pdf_text_layer import TextLayerIndex, cover_identity
+from pdf_slicing import build_page_slice
+from rate_limiter import RateLimiter, get_rate_limiter
+from call_metrics import CallRecord, metrics, timing_summary
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+
+DEFAULT_MODEL_NAME = 'gemini-2.0-flash-exp'
+PDF_MIME_TYPE = 'application/pdf'
+
+
+@dataclass
+class ModelResponse:
+    """Text answer returned by a transport plus any usage metadata it reported"""
+    text: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+def document_key(sha256: str, pages: Sequence[int] = ()) -> str:
+    """Stable name for a document, or for the given pages of it, that does not depend on how a slice is written"""
+    if not pages:
+        return sha256
+    return f"{sha256}:p{'-'.join(str(page) for page in pages)}"
+
+
+@dataclass
+class UploadedDocument:
+    """Reference to a document that has already been uploaded to the model backend.
+
+    A page slice also records the document it was cut from and its pages.
+    """
+    handle: Any
+    sha256: str
+    size: int
+    source_sha256: Optional[str] = None
+    pages: Tuple[int, ...] = ()
+
+    def key(self) -> str:
+        """document_key of the whole source document, or of the source and pages for a slice"""
+        return document_key(self.source_sha256 or self.sha256, self.pages)
+
+
+class ModelTransport:
+    """Pluggable model backend: uploads documents once and runs prompts against them"""
+
+    model_name = DEFAULT_MODEL_NAME
+    rate_limiter: Optional[RateLimiter] = None
+
+    def upload(self, data: bytes, mime_type: str, display_name: str) -> Any:
+        """Upload document bytes and return a backend-specific handle"""
+        raise NotImplementedError
+
+    def generate(self, prompt: str, document: UploadedDocument,
+                 generation_config: Optional[Dict[str, Any]] = None, sample: Optional[int] = None) -> ModelResponse:
+        """Run a prompt against an uploaded document.
+
+        ``sample`` numbers repeated draws of the same sampled prompt (as in
+        self-consistency voting); only backends that key responses use it.
+        """
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str, document: UploadedDocument,
+                             generation_config: Optional[Dict[str, Any]] = None,
+                             sample: Optional[int] = None) -> ModelResponse:
+        """Awaitable generate; backends without an async API run generate on a worker thread"""
+        return await asyncio.to_thread(self.generate, prompt, document, generation_config, sample)
+
+    def release(self, document: UploadedDocument) -> None:
+        """Free an uploaded document; backends without server-side storage ignore this"""
+
+
+class GeminiTransport(ModelTransport):
+    """Gemini backend using the File API so each PDF is uploaded only once.
+
+    Setting ``api_endpoint`` (or ``GEMINI_API_ENDPOINT``) points the SDK at a
+    local stand-in server speaking the Gemini REST protocol. Calls share the
+    process-wide rate limiter for ``api_key``.
+    """
+
+    def __init__(self, api_key: str, model_name: str = DEFAULT_MODEL_NAME,
+                 api_endpoint: Optional[str] = None, requests_per_minute: Optional[float] = None):
+        api_endpoint = api_endpoint or os.getenv('GEMINI_API_ENDPOINT')
+        if api_endpoint:
+            genai.configure(api_key=api_key, transport='rest',
+                            client_options={'api_endpoint': api_endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.rate_limiter = get_rate_limiter(api_key, requests_per_minute)
+
+    def upload(self, data: bytes, mime_type: str, display_name: str) -> Any:
+        uploaded = genai.upload_file(io.BytesIO(data), mime_type=mime_type, display_name=display_name)
+        while uploaded.state.name == 'PROCESSING':
+            time.sleep(1)
+            uploaded = genai.get_file(uploaded.name)
+        if uploaded.state.name == 'FAILED':
+            raise RuntimeError(f'File upload failed: {display_name}')
+        return uploaded
+
+    def generate(self, prompt: str, document: UploadedDocument,
+                 generation_config: Optional[Dict[str, Any]] = None, sample: Optional[int] = None) -> ModelResponse:
+        response = self.model.generate_content([prompt, document.handle],
+                                               generation_config=generation_config)
+        return self._model_response(response)
+
+    async def generate_async(self, prompt: str, document: UploadedDocument,
+                             generation_config: Optional[Dict[str, Any]] = None,
+                             sample: Optional[int] = None) -> ModelResponse:
+        response = await self.model.generate_content_async([prompt, document.handle],
+                                                           generation_config=generation_config)
+        return self._model_response(response)
+
+    @staticmethod
+    def _model_response(response: Any) -> ModelResponse:
+        usage = {}
+        metadata = getattr(response, 'usage_metadata', None)
+        if metadata is not None:
+            usage = {
+                'prompt_tokens': metadata.prompt_token_count,
+                'output_tokens': metadata.candidates_token_count,
+                'total_tokens': metadata.total_token_count
+            }
+        return ModelResponse(text=response.text, usage=usage)
+
+    def release(self, document: UploadedDocument) -> None:
+        try:
+            genai.delete_file(document.handle.name)
+        except Exception:
+            pass
+
+
+class DocumentSession:
+    """A PDF uploaded once and shared by every extraction call made against it.
+
+    Calls that only need a few pages can ask for a page slice instead: a
+    small PDF holding just those pages, with fonts cut down to the glyphs
+    they draw (see pdf_slicing), built and uploaded once per page set.
+
+    Uploads run outside the session lock: concurrent callers wanting the
+    same document or page set wait on that upload only, while the counters,
+    call records and other uploads carry on.
+
+    A session created with ``uploads_from`` sends its calls through its own
+    transport but borrows the other session's uploads, page slices and text
+    layer. File uploads do not depend on the model, so e.g. the tiers of a
+    cascade upload a document once; only the lending session releases them.
+    """
+
+    def __init__(self, pdf_path: str, transport: ModelTransport, uploads_from: Optional['DocumentSession'] = None):
+        self.pdf_path = pdf_path
+        self.transport = transport
+        self.uploads_from = uploads_from
+        if uploads_from is not None:
+            self.pdf_bytes = uploads_from.pdf_bytes
+            self.sha256 = uploads_from.sha256
+        else:
+            with open(pdf_path, 'rb') as f:
+                self.pdf_bytes = f.read()
+            self.sha256 = hashlib.sha256(self.pdf_bytes).hexdigest()
+        self.bytes_uploaded = 0
+        self.upload_count = 0
+        self.call_count = 0
+        self.retry_count = 0
+        self._document: Optional[UploadedDocument] = None
+        self._slices: Dict[Tuple[int, ...], UploadedDocument] = {}
+        self._uploads: Dict[Optional[Tuple[int, ...]], Future] = {}
+        self._reader: Optional[PdfReader] = None
+        self._text_layer: Optional[TextLayerIndex] = None
+        self._identity: Optional[Dict[str, str]] = None
+        self.resolved_by: Dict[str, int] = {}
+        self.calls: List[CallRecord] = []
+        self._lock = threading.Lock()
+        self._reader_lock = threading.Lock()
+        self._text_layer_lock = threading.Lock()
+
+    def document(self) -> UploadedDocument:
+        """Return the uploaded document, uploading it on first use"""
+        if self.uploads_from is not None:
+            return self.uploads_from.document()
+        return self._uploaded(None, lambda: (self.pdf_bytes, os.path.basename(self.pdf_path)))
+
+    def page_count(self) -> int:
+        if self.uploads_from is not None:
+            return self.uploads_from.page_count()
+        with self._reader_lock:
+            return len(self._pdf_reader().pages)
+
+    def _pdf_reader(self) -> PdfReader:
+        if self._reader is None:
+            self._reader = PdfReader(io.BytesIO(self.pdf_bytes))
+        return self._reader
+
+    def page_slice(self, pages: Sequence[int]) -> UploadedDocument:
+        """Return an uploaded PDF holding only the given 1-based pages, building it on first use"""
+        if self.uploads_from is not None:
+            return self.uploads_from.page_slice(pages)
+        key = tuple(sorted(set(pages)))
+
+        def build() -> Tuple[bytes, str]:
+            with self._reader_lock:
+                data = build_page_slice(self._pdf_reader(), key)
+            name, _ = os.path.splitext(os.path.basename(self.pdf_path))
+            return data, f"{name}_p{'-'.join(str(page) for page in key)}.pdf"
+
+        return self._uploaded(key, build)
+
+    def _uploaded(self, key: Optional[Tuple[int, ...]], build: Callable[[], Tuple[bytes, str]]) -> UploadedDocument:
+        """The whole document (``key`` None) or a page slice, built and uploaded by the first caller only"""
+        with self._lock:
+            document = self._document if key is None else self._slices.get(key)
+            if document is not None:
+                return document
+            pending = self._uploads.get(key)
+            if pending is None:
+                pending = self._uploads[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return pending.result()
+        try:
+            document = self._upload(*build(), pages=key or ())
+        except BaseException as error:
+            with self._lock:
+                del self._uploads[key]
+            pending.set_exception(error)
+            raise
+        with self._lock:
+            if key is None:
+                self._document = document
+            else:
+                self._slices[key] = document
+            del self._uploads[key]
+        pending.set_result(document)
+        return document
+
+    def text_layer(self) -> TextLayerIndex:
+        """Return the local text-layer index, parsing the PDF text on first use"""
+        if self.uploads_from is not None:
+            return self.uploads_from.text_layer()
+        with self._text_layer_lock:
+            if self._text_layer is None:
+                self._text_layer = TextLayerIndex(self.pdf_bytes)
+            return self._text_layer
+
+    def identity(self) -> Dict[str, str]:
+        """Institution and fiscal year printed on the cover page, read on first use (see cover_identity)"""
+        if self.uploads_from is not None:
+            return self.uploads_from.identity()
+        with self._reader_lock:
+            if self._identity is None:
+                self._identity = cover_identity(self._pdf_reader())
+            return dict(self._identity)
+
+    def record_resolution(self, source: str) -> None:
+        """Count a field as resolved by ``source`` (e.g. 'text_layer' or 'model')"""
+        with self._lock:
+            self.resolved_by[source] = self.resolved_by.get(source, 0) + 1
+
+    def _upload(self, data: bytes, display_name: str, pages: Tuple[int, ...] = ()) -> UploadedDocument:
+        handle = self.transport.upload(data, PDF_MIME_TYPE, display_name)
+        with self._lock:
+            self.bytes_uploaded += len(data)
+            self.upload_count += 1
+        return UploadedDocument(handle=handle, sha256=hashlib.sha256(data).hexdigest(), size=len(data),
+                                source_sha256=self.sha256 if pages else None, pages=pages)
+
+    def generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                 pages: Optional[Sequence[int]] = None, field: str = 'unknown',
+                 sample: Optional[int] = None) -> ModelResponse:
+        """Run a prompt against the uploaded document, or against a slice of it when ``pages`` is given.
+
+        Every call is recorded as a CallRecord tagged with ``field``, both on
+        this session and in the process-wide metrics. ``sample`` is passed on
+        to the transport (see ModelTransport.generate).
+        """
+        document = self.page_slice(pages) if pages else self.document()
+        with self._lock:
+            self.call_count += 1
+        retries = 0
+
+        def call() -> ModelResponse:
+            return self.transport.generate(prompt, document, generation_config, sample)
+
+        def on_retry(attempt: int, delay: float, error: Exception) -> None:
+            nonlocal retries
+            retries += 1
+            self._record_retry(attempt, delay, error)
+
+        limiter = self.transport.rate_limiter
+        started = time.perf_counter()
+        response = None
+        try:
+            response = call() if limiter is None else limiter.call(call, on_retry=on_retry)
+            return response
+        finally:
+            self._record_call(field, prompt, document, time.perf_counter() - started, response, retries)
+
+    async def generate_async(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                             pages: Optional[Sequence[int]] = None, field: str = 'unknown',
+                             sample: Optional[int] = None) -> ModelResponse:
+        """Awaitable generate: the call, its rate-limit waits and retries run on the event loop.
+
+        Only the one-off upload of the document or page slice goes to a
+        worker thread. Cancelling the awaiting task abandons the call.
+        """
+        with self._lock:
+            key = tuple(sorted(set(pages))) if pages else None
+            document = self._slices.get(key) if key else self._document
+        if document is None:
+            document = await (asyncio.to_thread(self.page_slice, pages) if pages else asyncio.to_thread(self.document))
+        with self._lock:
+            self.call_count += 1
+        retries = 0
+
+        def call() -> Awaitable[ModelResponse]:
+            return self.transport.generate_async(prompt, document, generation_config, sample)
+
+        def on_retry(attempt: int, delay: float, error: Exception) -> None:
+            nonlocal retries
+            retries += 1
+            self._record_retry(attempt, delay, error)
+
+        limiter = self.transport.rate_limiter
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await (call() if limiter is None else limiter.call_async(call, on_retry=on_retry))
+            return response
+        finally:
+            self._record_call(field, prompt, document, time.perf_counter() - started, response, retries)
+
+    def _record_call(self, field: str, prompt: str, document: UploadedDocument, duration: float,
+                     response: Optional[ModelResponse], retries: int) -> None:
+        usage = response.usage if response is not None else {}
+        record = CallRecord(
+            field=field,
+            document_sha256=self.sha256,
+            model_name=self.transport.model_name,
+            duration=duration,
+            request_bytes=len(prompt.encode('utf-8')),
+            document_bytes=document.size,
+            response_chars=len(response.text or '') if response is not None else 0,
+            prompt_tokens=usage.get('prompt_tokens'),
+            output_tokens=usage.get('output_tokens'),
+            total_tokens=usage.get('total_tokens'),
+            retries=retries,
+            outcome='ok' if response is not None else 'error'
+        )
+        with self._lock:
+            self.calls.append(record)
+        metrics.record(record)
+
+    def _record_retry(self, attempt: int, delay: float, error: Exception) -> None:
+        with self._lock:
+            self.retry_count += 1
+        print(f"⏳ Rate limited ({error.__class__.__name__}), retry {attempt} in {delay:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Upload accounting for this document"""
+        with self._lock:
+            return {
+                'document_sha256': self.sha256,
+                'document_bytes': len(self.pdf_bytes),
+                'bytes_uploaded': self.bytes_uploaded,
+                'uploads': self.upload_count,
+                'page_slices': len(self._slices),
+                'page_slice_bytes': {'-'.join(str(page) for page in key): document.size
+                                     for key, document in self._slices.items()},
+                'model_calls': self.call_count,
+                'retries': self.retry_count,
+                'fields_resolved_by': dict(self.resolved_by),
+                'inline_bytes_equivalent': len(self.pdf_bytes) * self.call_count
+            }
+
+    def timing_summary(self) -> Dict[str, Any]:
+        """Per-call timings for this document, for the output JSON"""
+        with self._lock:
+            calls = list(self.calls)
+        return {'document_sha256': self.sha256, **timing_summary(calls)}
+
+    def close(self) -> None:
+        """Release the uploaded document and its page slices on the backend, outside the session lock"""
+        with self._lock:
+            documents = ([self._document] if self._document is not None else []) + list(self._slices.values())
+            self._document = None
+            self._slices.clear()
+        for document in documents:
+            self.transport.release(document)
@@ -2,17 +2,51 @@
 
 import os
 import json
-import google.generativeai as genai
-from typing import Dict, Any, Optional
-from test_financial_extractor import FinancialDataExtractor
+import argparse
+from itertools import product
+from typing import Dict, Any, List, Optional, Tuple
+from gemini_client import ModelTransport, DocumentSession
+from extraction_cache import ExtractionCache
+from data_extractor import FinancialDataExtractor
+from field_registry import VotePolicy
+from self_consistency import vote
+from accounting_identities import check_statements, failing_statements
+from structural_diff import Difference, FlatTree, diff, matches, format_differences
+
+# Statement extractors in output order: extractor method -> progress label
+STATEMENT_METHODS = {
+    'extract_balance_sheet_assets': 'balance sheet assets',
+    'extract_balance_sheet_liabilities': 'balance sheet liabilities',
+    'extract_income_statement': 'income statement',
+    'extract_cash_flow_statement': 'cash flow statement',
+    'extract_segment_information': 'segment information'
+}
+
+# Statements voted on when voting is switched on, by the field tag of their call
+VOTING_STATEMENTS: Dict[str, VotePolicy] = {
+    'segment_information': VotePolicy(samples=3, agree=2)
+}
+
 
 class HighPrecisionFinancialExtractor(FinancialDataExtractor):
-    """Schema-driven high-precision financial data extractor"""
+    """Schema-driven high-precision financial data extractor
+    
+    Every statement lives on a known page, so by default each call sends only
+    that page (plus ``neighbour_pages`` on either side) instead of the whole PDF.
+    """
     
-    def __init__(self, api_key: str, schema_path: str):
-        super().__init__(api_key)
-        with open(schema_path, 'r', encoding='utf-8') as f:
-            self.target_schema = json.load(f)
+    def __init__(self, api_key: str, schema_path: Optional[str] = None, transport: Optional[ModelTransport] = None,
+                 cache: Optional[ExtractionCache] = None, slice_pages: bool = True,
+                 neighbour_pages: int = 0, voting: bool = False):
+        super().__init__(api_key, transport, cache, voting=voting)
+        self.target_schema = None
+        if schema_path:
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                self.target_schema = json.load(f)
+        self.slice_pages = slice_pages
+        self.neighbour_pages = neighbour_pages
+        self.identity_checks: List[Dict[str, Any]] = []
+        self._flat_schema: Optional[FlatTree] = None
     
     def extract_balance_sheet_assets(self, pdf_path: str) -> Dict[str, Any]:
         """Extract 貸借対照表 - 資産の部 from page 3"""
@@ -76,7 +110,7 @@ class HighPrecisionFinancialExtractor(FinancialDataExtractor):
 
 △記号は負の値を意味します。JSONのみを返してください。"""
         
-        return self._extract_structured_data(pdf_path, prompt)
+        return self._extract_structured_data(pdf_path, prompt, page=3, field='balance_sheet_assets')
     
     def extract_balance_sheet_liabilities(self, pdf_path: str) -> Dict[str, Any]:
         """Extract 貸借対照表 - 負債・純資産の部 from page 4"""
@@ -143,7 +177,7 @@ class HighPrecisionFinancialExtractor(FinancialDataExtractor):
 
 △記号は負の値を意味します。JSONのみを返してください。"""
         
-        return self._extract_structured_data(pdf_path, prompt)
+        return self._extract_structured_data(pdf_path, prompt, page=4, field='balance_sheet_liabilities')
     
     def extract_income_statement(self, pdf_path: str) -> Dict[str, Any]:
         """Extract 損益計算書 from page 5"""
@@ -213,7 +247,7 @@ class HighPrecisionFinancialExtractor(FinancialDataExtractor):
 
 △記号は負の値を意味します。JSONのみを返してください。"""
         
-        return self._extract_structured_data(pdf_path, prompt)
+        return self._extract_structured_data(pdf_path, prompt, page=5, field='income_statement')
     
     def extract_cash_flow_statement(self, pdf_path: str) -> Dict[str, Any]:
         """Extract キャッシュ・フロー計算書 from page 6"""
@@ -243,7 +277,7 @@ class HighPrecisionFinancialExtractor(FinancialDataExtractor):
 
 △記号は負の値を意味します。JSONのみを返してください。"""
         
-        return self._extract_structured_data(pdf_path, prompt)
+        return self._extract_structured_data(pdf_path, prompt, page=6, field='cash_flow_statement')
     
     def extract_segment_information(self, pdf_path: str) -> Dict[str, Any]:
         """Extract セグメント情報 from page 24"""
@@ -294,30 +328,60 @@ class HighPrecisionFinancialExtractor(FinancialDataExtractor):
 
 △記号は負の値を意味します。△記号がない数値は正の値です。JSONのみを返してください。"""
         
-        return self._extract_structured_data(pdf_path, prompt)
+        return self._extract_structured_data(pdf_path, prompt, page=24, field='segment_information')
+    
+    def _page_range(self, session: DocumentSession, page: Optional[int]) -> Optional[List[int]]:
+        """Pages to send for a statement on ``page``, or None to send the whole document"""
+        if not self.slice_pages or page is None:
+            return None
+        page_count = session.page_count()
+        if page > page_count:
+            return None
+        first = max(1, page - self.neighbour_pages)
+        last = min(page_count, page + self.neighbour_pages)
+        return list(range(first, last + 1))
     
-    def _extract_structured_data(self, pdf_path: str, prompt: str) -> Dict[str, Any]:
-        """Extract structured data using Gemini API"""
+    def _extract_structured_data(self, pdf_path: str, prompt: str, page: Optional[int] = None,
+                                 field: str = 'statement') -> Dict[str, Any]:
+        """Extract structured data using Gemini API; ``field`` tags the call in the metrics"""
         try:
-            with open(pdf_path, 'rb') as f:
-                pdf_content = f.read()
+            session = self.open_document(pdf_path)
+            pages = self._page_range(session, page)
+            if pages:
+                page_list = '、'.join(f'{p}ページ' for p in pages)
+                prompt = (f"このPDFファイルは元の文書から{page_list}のみを抜き出したものです。"
+                          f"以下の指示にあるページ番号は元の文書のページ番号です。\n\n{prompt}")
             
-            response = self.model.generate_content([
-                prompt,
-                {
-                    "mime_type": "application/pdf",
-                    "data": pdf_content
-                }
-            ])
+            policy = VOTING_STATEMENTS.get(field) if self.voting else None
             
-            extracted_text = response.text.strip()
+            def compute() -> Dict[str, Any]:
+                response = session.generate(prompt, pages=pages, field=field)
+                return self._parse_json_text(response.text)
             
-            if extracted_text.startswith('```json'):
-                extracted_text = extracted_text[7:]
-            if extracted_text.endswith('```'):
-                extracted_text = extracted_text[:-3]
+            def draw(index: int) -> Dict[str, Any]:
+                try:
+                    response = session.generate(prompt, generation_config={'temperature': policy.temperature},
+                                                pages=pages, field=field, sample=index)
+                    return self._parse_json_text(response.text)
+                except Exception as error:
+                    print(f"Error extracting structured data: {error}")
+                    return {}
             
-            extracted_data = json.loads(extracted_text.strip())
+            agreed = False
+            
+            def compute_voted() -> Dict[str, Any]:
+                nonlocal agreed
+                data, votes = vote(draw, lambda data: json.dumps(data, sort_keys=True) if data else None, policy)
+                print(f"🗳️  {field}: {votes['agreeing']}/{votes['samples']} samples agree")
+                agreed = votes['agreed']
+                return data
+            
+            if policy:
+                # Like the voted fields, only a statement the vote agreed on is cached
+                extracted_data = self._cached(session, f'{prompt}\n[vote {policy.agree}/{policy.samples}]',
+                                              compute_voted, lambda data: bool(data) and agreed)
+            else:
+                extracted_data = self._cached(session, prompt, compute, lambda data: bool(data))
             
             return extracted_data
             
@@ -329,94 +393,92 @@ class HighPrecisionFinancialExtractor(FinancialDataExtractor):
         """Extract all financial data using schema-driven approach"""
         print("🔍 Starting schema-driven extraction...")
         
-        result = {"financial_statements": []}
+        document = self.open_document(pdf_path)
         
-        print("📊 Extracting balance sheet assets...")
-        balance_sheet_assets = self.extract_balance_sheet_assets(pdf_path)
-        if balance_sheet_assets:
-            result["financial_statements"].append(balance_sheet_assets)
+        statements = {}
+        for method_name, label in STATEMENT_METHODS.items():
+            print(f"📊 Extracting {label}...")
+            statements[method_name] = getattr(self, method_name)(document)
         
-        print("📊 Extracting balance sheet liabilities...")
-        balance_sheet_liabilities = self.extract_balance_sheet_liabilities(pdf_path)
-        if balance_sheet_liabilities:
-            result["financial_statements"].append(balance_sheet_liabilities)
+        statements, self.identity_checks = self.check_statement_identities(document, statements)
+        result = {"financial_statements": [statement for statement in statements.values() if statement]}
         
-        print("📊 Extracting income statement...")
-        income_statement = self.extract_income_statement(pdf_path)
-        if income_statement:
-            result["financial_statements"].append(income_statement)
-        
-        print("📊 Extracting cash flow statement...")
-        cash_flow = self.extract_cash_flow_statement(pdf_path)
-        if cash_flow:
-            result["financial_statements"].append(cash_flow)
-        
-        print("📊 Extracting segment information...")
-        segment_info = self.extract_segment_information(pdf_path)
-        if segment_info:
-            result["financial_statements"].append(segment_info)
+        upload_stats = document.stats()
+        print(f"📤 Uploaded {upload_stats['bytes_uploaded'] / 1024:.2f} KB for {upload_stats['model_calls']} model calls")
+        self.close_document(document)
         
         return result
     
-    def validate_against_ground_truth(self, extracted_data: Dict[str, Any]) -> bool:
-        """Validate extracted data matches ground truth perfectly"""
-        def deep_equal(obj1, obj2):
-            if type(obj1) != type(obj2):
-                return False
-            if isinstance(obj1, dict):
-                return (obj1.keys() == obj2.keys() and 
-                       all(deep_equal(obj1[k], obj2[k]) for k in obj1.keys()))
-            elif isinstance(obj1, list):
-                return (len(obj1) == len(obj2) and 
-                       all(deep_equal(obj1[i], obj2[i]) for i in range(len(obj1))))
-            return obj1 == obj2
+    def check_statement_identities(self, pdf_path: str, statements: Dict[str, Dict[str, Any]]
+                                   ) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+        """Check the segment identities and re-extract only the statements taking part in a failing one.
         
-        return deep_equal(extracted_data, self.target_schema)
-    
-    def compare_and_report_differences(self, extracted_data: Dict[str, Any]) -> None:
-        """Compare extracted data with ground truth and report differences"""
-        def find_differences(obj1, obj2, path=""):
-            differences = []
-            
-            if type(obj1) != type(obj2):
-                differences.append(f"{path}: Type mismatch - Expected {type(obj2)}, Got {type(obj1)}")
-                return differences
-            
-            if isinstance(obj1, dict):
-                all_keys = set(obj1.keys()) | set(obj2.keys())
-                for key in all_keys:
-                    new_path = f"{path}.{key}" if path else key
-                    if key not in obj1:
-                        differences.append(f"{new_path}: Missing in extracted data")
-                    elif key not in obj2:
-                        differences.append(f"{new_path}: Extra key in extracted data")
-                    else:
-                        differences.extend(find_differences(obj1[key], obj2[key], new_path))
-            elif isinstance(obj1, list):
-                if len(obj1) != len(obj2):
-                    differences.append(f"{path}: Length mismatch - Expected {len(obj2)}, Got {len(obj1)}")
-                else:
-                    for i in range(len(obj1)):
-                        differences.extend(find_differences(obj1[i], obj2[i], f"{path}[{i}]"))
-            else:
-                if obj1 != obj2:
-                    differences.append(f"{path}: Value mismatch - Expected {obj2}, Got {obj1}")
-            
-            return differences
+        ``statements`` maps STATEMENT_METHODS names to extracted statements.
+        Each suspect statement is asked again without the cache; the original
+        or the new copy is kept, whichever combination satisfies the most
+        identities. Returns the updated statements and the final checks.
+        """
+        checks = check_statements(statements)
+        suspects = [name for name in failing_statements(checks) if name in STATEMENT_METHODS]
+        if not suspects:
+            return statements, checks
+        
+        print(f"🧮 Statement identity check(s) failed, re-extracting {[STATEMENT_METHODS[name] for name in suspects]}")
+        retried = {}
+        with self.refreshing():
+            for method_name in suspects:
+                retried[method_name] = getattr(self, method_name)(pdf_path)
+        
+        def score(candidate: Dict[str, Dict[str, Any]]) -> int:
+            return sum(1 for check in check_statements(candidate) if check['status'] == 'pass')
         
-        differences = find_differences(extracted_data, self.target_schema)
+        best, best_score = statements, None
+        for choice in product((False, True), repeat=len(suspects)):
+            candidate = dict(statements)
+            candidate.update({name: retried[name] for name, use in zip(suspects, choice) if use and retried[name]})
+            candidate_score = (score(candidate), -sum(choice))
+            if best_score is None or candidate_score > best_score:
+                best, best_score = candidate, candidate_score
+        
+        checks = check_statements(best)
+        failed = [check['identity'] for check in checks if check['status'] == 'fail']
+        print(f"🧮 After re-extraction: {'all identities hold' if not failed else f'still failing {failed}'}")
+        return best, checks
+    
+    def validate_against_ground_truth(self, extracted_data: Dict[str, Any], tolerance: float = 0) -> bool:
+        """Validate extracted data matches ground truth; items are matched by account, numbers within ``tolerance``"""
+        return matches(extracted_data, self._ground_truth(), tolerance)
+    
+    def compare_and_report_differences(self, extracted_data: Dict[str, Any], tolerance: float = 0) -> List[Difference]:
+        """Compare extracted data with ground truth, report differences and return them"""
+        differences = diff(extracted_data, self._ground_truth(), tolerance)
         
         if differences:
             print("❌ DIFFERENCES FOUND:")
-            for diff in differences[:20]:  # Show first 20 differences
-                print(f"   {diff}")
-            if len(differences) > 20:
-                print(f"   ... and {len(differences) - 20} more differences")
+            for line in format_differences(differences):
+                print(line)
         else:
             print("✅ No differences found - perfect match!")
+        
+        return differences
+    
+    def _ground_truth(self) -> FlatTree:
+        """The target schema flattened once and reused by every comparison"""
+        if self._flat_schema is None:
+            self._flat_schema = FlatTree(self.target_schema)
+        return self._flat_schema
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Extract every statement from one PDF and check it against its '
+                                                 'ground truth (see extraction_evaluation.py for a whole corpus)')
+    parser.add_argument('pdf_path', nargs='?', default='./b67155c2806c76359d1b3637d7ff2ac7.pdf')
+    parser.add_argument('--ground-truth', default='./financial_statements.json',
+                        help='ground-truth JSON in the complete financial_statements format')
+    parser.add_argument('--tolerance', type=float, default=0, help='allowed absolute difference per amount')
+    parser.add_argument('--vote', action='store_true', help='decide segment information by self-consistency voting')
+    args = parser.parse_args()
+    
     print('=' * 80)
     print('HIGH-PRECISION FINANCIAL DATA EXTRACTOR')
     print('=' * 80)
@@ -428,8 +490,8 @@ def main():
         print("Please set EXPO_PUBLIC_GEMINI_API_KEY environment variable")
         return False
     
-    schema_path = '/home/ubuntu/attachments/9ecb54e1-d14f-44ea-9fe4-fa3fbaec1310/financial_statements.json'
-    pdf_path = './b67155c2806c76359d1b3637d7ff2ac7.pdf'
+    schema_path = args.ground_truth
+    pdf_path = args.pdf_path
     
     if not os.path.exists(schema_path):
         print(f"❌ SETUP FAILED: Ground truth schema not found: {schema_path}")
@@ -446,7 +508,7 @@ def main():
     print()
     
     try:
-        extractor = HighPrecisionFinancialExtractor(api_key, schema_path)
+        extractor = HighPrecisionFinancialExtractor(api_key, schema_path, voting=args.vote)
         
         print("🔍 Starting high-precision extraction...")
         extracted_data = extractor.extract_complete_financial_data(pdf_path)
@@ -458,7 +520,7 @@ def main():
         print(f"📊 Extracted {len(extracted_data['financial_statements'])} financial statements")
         
         print("\n✅ Validating against ground truth...")
-        is_perfect_match = extractor.validate_against_ground_truth(extracted_data)
+        is_perfect_match = extractor.validate_against_ground_truth(extracted_data, args.tolerance)
         
         if is_perfect_match:
             print("🎉 SUCCESS: Perfect match with ground truth!")
@@ -472,7 +534,7 @@ def main():
             return True
         else:
             print("❌ FAILED: Output does not match ground truth")
-            extractor.compare_and_report_differences(extracted_data)
+            extractor.compare_and_report_differences(extracted_data, args.tolerance)
             
             output_file = 'extracted_financial_data_failed.json'
             with open(output_file, 'w', encoding='utf-8') as f:
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+
+# Amount units relative to one yen
+UNIT_SCALES = {
+    '円': 1,
+    '千円': 1_000,
+    '百万円': 1_000_000,
+    '億円': 100_000_000,
+    '千': 1_000,
+    '百万': 1_000_000,
+    '億': 100_000_000
+}
+DEFAULT_UNIT = '千円'
+
+# \d also matches full-width digits, which int() accepts, so full-width input needs no folding pass
+NUMBER_PATTERN = re.compile(r"""
+    (?:(?P<open>[(（])\s*)?
+    (?:(?P<sign>[△▲\-－−])\s*)?
+    (?P<digits>\d{1,3}(?:[,，]\d{3})+(?!\d)|\d+)(?P<fraction>[.．]\d+)?
+    (?:\s*(?P<unit>百万円|千円|億円|円|百万|千|億))?
+    (?P<close>[)）])?
+""", re.VERBOSE)
+
+Number = Union[int, float]
+
+
+def _to_number(match: 're.Match', unit: str) -> Number:
+    opening, sign, digits, fraction, suffix, closing = match.groups()
+    value: Number = int(digits.replace(',', '').replace('，', ''))
+    if fraction:
+        value = float(f"{value}.{''.join(str(int(digit)) for digit in fraction[1:])}")
+    if suffix and suffix != unit:
+        value = value * UNIT_SCALES[suffix] / UNIT_SCALES[unit]
+        if value.is_integer():
+            value = int(value)
+    grouped = ',' in digits or '，' in digits
+    if sign or (opening and closing and (grouped or suffix)):
+        return -value
+    return value
+
+
+def parse_numbers(text: str, unit: str = DEFAULT_UNIT) -> List[Number]:
+    """Every amount in ``text``, in ``unit``.
+
+    Full-width digits and punctuation are accepted. A leading △, ▲ or - makes
+    an amount negative, as do enclosing parentheses around a comma-grouped or
+    unit-suffixed amount; a bare (19) is a note number. An amount followed by
+    千円, 百万円 or 億円 (or 円) is converted to ``unit``; an amount without a
+    suffix is taken to be in ``unit`` already.
+    """
+    if not text or not isinstance(text, str):
+        return []
+    return [_to_number(match, unit) for match in NUMBER_PATTERN.finditer(text)]
+
+
+def _is_amount(match: 're.Match') -> bool:
+    """Whether a match looks like an amount: comma-grouped, with a unit suffix, or signed with △/▲/-"""
+    opening, sign, digits, fraction, suffix, closing = match.groups()
+    return bool(sign or suffix or ',' in digits or '，' in digits)
+
+
+def parse_number(text: str, unit: str = DEFAULT_UNIT) -> Optional[int]:
+    """The first amount in ``text`` as an integer in ``unit``, or None when there is none.
+
+    Amount-shaped numbers (see _is_amount) win over bare integers, so the 3
+    of 第3期 or the 27 of 平成27年度 is only taken when nothing else is there.
+    """
+    if not text or not isinstance(text, str):
+        return None
+    match = NUMBER_PATTERN.search(text)
+    if match is None:
+        return None
+    if not _is_amount(match):
+        match = next((candidate for candidate in NUMBER_PATTERN.finditer(text, match.end()) if _is_amount(candidate)),
+                     match)
+    value = _to_number(match, unit)
+    return value if type(value) is int else round(value)
+
+
+def parse_number_batch(texts: Iterable[str], unit: str = DEFAULT_UNIT) -> List[Optional[int]]:
+    """parse_number over many strings; repeated strings are parsed once"""
+    parsed: Dict[str, Optional[int]] = {}
+    results = []
+    for text in texts:
+        if text in parsed:
+            results.append(parsed[text])
+            continue
+        value = parse_number(text, unit)
+        if isinstance(text, str):
+            parsed[text] = value
+        results.append(value)
+    return results
+
+
+def _legacy_parse_japanese_number(value: str) -> Optional[int]:
+    """The character-by-character parser parse_number replaced, kept for the benchmark"""
+    if not value or not isinstance(value, str):
+        return None
+    clean_value = value.strip()
+    is_negative = False
+    if clean_value.startswith('△'):
+        is_negative = True
+        clean_value = clean_value[1:]
+    elif clean_value.startswith('-'):
+        is_negative = True
+        clean_value = clean_value[1:]
+    clean_value = clean_value.replace(',', '')
+    clean_value = ''.join(c for c in clean_value if c.isdigit())
+    try:
+        numeric_value = int(clean_value)
+        return -numeric_value if is_negative else numeric_value
+    except ValueError:
+        return None
+
+
+BENCHMARK_SAMPLES = [
+    '27,947,258',
+    '△410,984',
+    '▲654,006',
+    '(598,995)',
+    '１２，３４５，６７８',
+    '27,947,258千円（前年 25,000,000）',
+    '719億円',
+    '34,723,539',
+    '7,020,870',
+    '△10,489,748',
+    '第3期 27,947,258千円',
+    '平成27年度: △410,984'
+]
+
+
+def run_benchmark(count: int = 1_000_000, distinct: int = 1_000) -> None:
+    """Time the legacy parser against parse_number_batch on ``count`` cached-style raw strings"""
+    texts = [f"{sample}{' ' * (i % 8)}" for i in range(distinct // len(BENCHMARK_SAMPLES) + 1) for sample in BENCHMARK_SAMPLES]
+    texts = (texts * (count // len(texts) + 1))[:count]
+
+    print(f"⏱️  Parsing {count:,} strings ({len(set(texts)):,} distinct)")
+    started = time.perf_counter()
+    legacy = [_legacy_parse_japanese_number(text) for text in texts]
+    legacy_seconds = time.perf_counter() - started
+    print(f"   legacy per-character parser: {legacy_seconds:.3f}s")
+
+    started = time.perf_counter()
+    single = [parse_number(text) for text in texts]
+    single_seconds = time.perf_counter() - started
+    print(f"   parse_number loop:           {single_seconds:.3f}s ({legacy_seconds / single_seconds:.2f}x)")
+
+    started = time.perf_counter()
+    batch = parse_number_batch(texts)
+    batch_seconds = time.perf_counter() - started
+    print(f"   parse_number_batch:          {batch_seconds:.3f}s ({legacy_seconds / batch_seconds:.2f}x)")
+
+    assert batch == single
+    differing = sorted({text.strip() for text, old, new in zip(texts, legacy, batch) if old != new})
+    for text in differing:
+        print(f"   differs: {text!r} legacy={_legacy_parse_japanese_number(text)} new={parse_number(text)}")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
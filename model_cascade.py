@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple, Union
+from gemini_client import ModelTransport, GeminiTransport, DocumentSession, DEFAULT_MODEL_NAME
+from cassette_transport import transport_from_env
+from extraction_cache import ExtractionCache
+from data_extractor import ComprehensiveFinancialExtractor
+from accounting_identities import FIELD_IDENTITIES, check_identities, failing_fields, reconcile
+
+
+TEXT_LAYER_TIER = 'text_layer'
+CASCADE_ENV = 'GEMINI_MODEL_CASCADE'
+DEFAULT_CASCADE = (TEXT_LAYER_TIER, 'gemini-1.5-flash-8b', DEFAULT_MODEL_NAME)
+
+
+def parse_cascade(spec: str) -> List[str]:
+    """Tiers from a comma-separated spec such as 'text_layer,gemini-1.5-flash-8b,gemini-2.0-flash-exp'"""
+    tiers = [tier.strip() for tier in spec.split(',') if tier.strip()]
+    if TEXT_LAYER_TIER in tiers[1:]:
+        raise ValueError(f"'{TEXT_LAYER_TIER}' can only be the first cascade tier")
+    if not [tier for tier in tiers if tier != TEXT_LAYER_TIER]:
+        raise ValueError('A cascade needs at least one model tier')
+    return tiers
+
+
+def cascade_from_env() -> Optional[List[str]]:
+    """Tiers from GEMINI_MODEL_CASCADE, or None when it is unset"""
+    spec = os.getenv(CASCADE_ENV)
+    return parse_cascade(spec) if spec else None
+
+
+class ModelCascade:
+    """Resolve fields on the cheapest tier that gives a trustworthy answer.
+
+    Tiers run cheapest first: the PDF text layer (when listed first), then
+    each model in order. A model's answer escalates to the next model when
+    it does not parse as an amount, or when it disagrees with the text
+    layer's reading of the same row. Once every field is settled, fields of
+    a failing accounting identity that a weaker model answered are asked
+    again one tier up, and per field the answer satisfying the most
+    identities is kept. ``resolved_by`` records the tier that produced each
+    final value; a model's extractor is only created once a field reaches it.
+    Every tier shares one upload of the document (see
+    DocumentSession.uploads_from). ``use_text_layer`` turns the text-layer
+    tier and cross-check off when False.
+
+    ``transports`` maps model names to ready transports; any other model
+    gets one from transport_from_env, so EXTRACTION_CASSETTE records and
+    replays every tier.
+    """
+
+    def __init__(self, tiers: Sequence[str] = DEFAULT_CASCADE, api_key: Optional[str] = None,
+                 transports: Optional[Dict[str, ModelTransport]] = None,
+                 cache: Optional[ExtractionCache] = None, max_workers: int = 1, use_text_layer: bool = True):
+        self.tiers = parse_cascade(','.join(tiers))
+        self.models = [tier for tier in self.tiers if tier != TEXT_LAYER_TIER]
+        self.api_key = api_key
+        self.transports = dict(transports or {})
+        self.cache = cache
+        self.max_workers = max_workers
+        self.use_text_layer = use_text_layer
+        self.extractors: Dict[str, ComprehensiveFinancialExtractor] = {}
+        # Session lending its uploads to every tier, per PDF path; one passed to extract stays the caller's to close
+        self.documents: Dict[str, DocumentSession] = {}
+        self.resolved_by: Dict[str, str] = {}
+        self.escalations: List[Dict[str, Any]] = []
+
+    def extractor(self, model: str) -> ComprehensiveFinancialExtractor:
+        """Field extractor for one model tier, created on first use"""
+        if model not in self.extractors:
+            transport = (self.transports.get(model) or transport_from_env(self.api_key, model)
+                         or GeminiTransport(self.api_key, model))
+            self.extractors[model] = ComprehensiveFinancialExtractor(self.api_key, transport, self.cache,
+                                                                     self.use_text_layer)
+        return self.extractors[model]
+
+    def session(self, model: str, pdf_path: str) -> DocumentSession:
+        """``model``'s session for ``pdf_path``, borrowing the uploads of the first session opened for it"""
+        extractor = self.extractor(model)
+        lender = self.documents.get(pdf_path)
+        if lender is None:
+            return self.documents.setdefault(pdf_path, extractor.open_document(pdf_path))
+        return extractor.open_document(pdf_path, uploads_from=lender)
+
+    def _ask(self, model: str, pdf_path: str, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Each field's dedicated prompt on ``model``, ``max_workers`` calls at a time"""
+        extractor = self.extractor(model)
+        session = self.session(model, pdf_path)
+        if self.max_workers <= 1 or len(names) <= 1:
+            return {name: extractor.extract_field(session, name) for name in names}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(names))) as executor:
+            return dict(zip(names, executor.map(lambda name: extractor.extract_field(session, name), names)))
+
+    def _escalate(self, name: str, model: str, reason: str) -> None:
+        next_model = self.models[self.models.index(model) + 1]
+        self.escalations.append({'field': name, 'from': model, 'to': next_model, 'reason': reason})
+
+    def extract(self, pdf_path: Union[str, DocumentSession], names: List[str],
+                verify_identities: bool = True,
+                report: Optional[Callable[[str, Dict[str, Any], str, float], None]] = None,
+                known: Optional[Dict[str, Dict[str, Any]]] = None
+                ) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+        """Results for ``names`` and the final identity checks.
+
+        Given an open DocumentSession, every tier reuses its uploads and the
+        caller keeps closing it. ``report(name, result, tier, latency)`` is
+        called as each field resolves. ``known`` results (e.g. reused from an
+        earlier run) take part in the identity checks but are never asked again.
+        """
+        if isinstance(pdf_path, DocumentSession):
+            self.documents[pdf_path.pdf_path] = pdf_path
+            pdf_path = pdf_path.pdf_path
+        started = time.time()
+        first = self.extractor(self.models[0])
+        reference = first.resolve_from_text_layer(self.session(self.models[0], pdf_path), names, report=False)
+
+        def resolve(name: str, result: Dict[str, Any], tier: str) -> None:
+            results[name] = result
+            self.resolved_by[name] = tier
+            if report is not None:
+                report(name, result, tier, time.time() - started)
+
+        results: Dict[str, Dict[str, Any]] = dict(known or {})
+        if self.tiers[0] == TEXT_LAYER_TIER:
+            for name in names:
+                if name in reference:
+                    resolve(name, reference[name], TEXT_LAYER_TIER)
+
+        pending = [name for name in names if name not in results]
+        fallback: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        for model in self.models:
+            if not pending:
+                break
+            answers = self._ask(model, pdf_path, pending)
+            escalated = []
+            for name in pending:
+                answer = answers[name]
+                expected = reference.get(name, {}).get('numeric_value')
+                if not answer['success']:
+                    reason = 'parse'
+                elif expected is not None and answer['numeric_value'] != expected:
+                    reason = 'text_layer_disagreement'
+                else:
+                    reason = None
+                if answer['success']:
+                    fallback.setdefault(name, (answer, model))
+                if reason and model != self.models[-1]:
+                    self._escalate(name, model, reason)
+                    escalated.append(name)
+                elif not answer['success'] and name in fallback:
+                    resolve(name, *fallback[name])
+                else:
+                    resolve(name, answer, model)
+            pending = escalated
+
+        checks: List[Dict[str, Any]] = []
+        if verify_identities:
+            results, checks = self._escalate_identities(pdf_path, results, resolve)
+        return {name: results[name] for name in names}, checks
+
+    def _escalate_identities(self, pdf_path: str, results: Dict[str, Dict[str, Any]],
+                             resolve: Callable[[str, Dict[str, Any], str], None]
+                             ) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+        """Ask the fields of failing identities one tier up until the identities hold or no tier is left"""
+        values = {name: result.get('numeric_value') for name, result in results.items()}
+        checks = check_identities(FIELD_IDENTITIES, values)
+        asked = {name: tier for name, tier in self.resolved_by.items() if tier in self.models}
+        while True:
+            suspects = [name for name in failing_fields(checks)
+                        if name in asked and asked[name] != self.models[-1]]
+            if not suspects:
+                return results, checks
+            by_model: Dict[str, List[str]] = {}
+            for name in suspects:
+                self._escalate(name, asked[name], 'identity')
+                asked[name] = self.models[self.models.index(asked[name]) + 1]
+                by_model.setdefault(asked[name], []).append(name)
+            answers = {}
+            for model, names in by_model.items():
+                answers.update(self._ask(model, pdf_path, names))
+            candidates = {
+                name: [values[name]] + ([answers[name]['numeric_value']]
+                                        if answers[name]['success'] and answers[name]['numeric_value'] != values[name]
+                                        else [])
+                for name in suspects
+            }
+            chosen = reconcile(values, candidates, FIELD_IDENTITIES)
+            for name in suspects:
+                if chosen[name] != values[name]:
+                    resolve(name, answers[name], asked[name])
+            values = chosen
+            checks = check_identities(FIELD_IDENTITIES, values)
+
+    def stats(self, pdf_path: str) -> Dict[str, Any]:
+        """Which tier resolved each field, every escalation and the calls and uploads per model"""
+        resolved_by_tier: Dict[str, int] = {}
+        for tier in self.resolved_by.values():
+            resolved_by_tier[tier] = resolved_by_tier.get(tier, 0) + 1
+        per_model = {}
+        for model, extractor in self.extractors.items():
+            session_stats = self.session(model, pdf_path).stats()
+            per_model[model] = {
+                'model_calls': session_stats['model_calls'],
+                'bytes_uploaded': session_stats['bytes_uploaded'],
+                'retries': session_stats['retries']
+            }
+        return {
+            'tiers': self.tiers,
+            'resolved_by': dict(self.resolved_by),
+            'resolved_by_tier': resolved_by_tier,
+            'escalations': list(self.escalations),
+            'models': per_model
+        }
+
+    def close(self, pdf_path: str) -> None:
+        """Release the cascade's sessions for ``pdf_path`` and, unless the caller passed it in, the shared upload"""
+        self.documents.pop(pdf_path, None)
+        for extractor in self.extractors.values():
+            extractor.close_document(pdf_path)
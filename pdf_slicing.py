@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import io
+from typing import Any, Dict, Sequence, Set, Tuple
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ByteStringObject, ContentStream, NameObject, NumberObject, TextStringObject
+
+
+TEXT_SHOWING_OPERATORS = (b'Tj', b"'", b'"', b'TJ')
+
+
+def _show_strings(operands: list, operator: bytes) -> list:
+    """The strings a text-showing operation draws"""
+    if operator == b'TJ':
+        return [item for item in operands[0] if isinstance(item, (TextStringObject, ByteStringObject))]
+    return [operands[-1]]
+
+
+def _collect_codes(content: Any, resources: Any, reader: Any,
+                   used: Dict[int, Tuple[Any, Set[int]]], seen: Set[int]) -> None:
+    """Add the 2-byte character codes drawn with each font of ``resources`` to ``used``, following form XObjects"""
+    fonts = resources.get('/Font', {}) if resources else {}
+    font = None
+    for operands, operator in ContentStream(content, reader).operations:
+        if operator == b'Tf':
+            font = fonts.get(operands[0])
+            font = font.get_object() if font is not None else None
+        elif operator in TEXT_SHOWING_OPERATORS and font is not None:
+            codes = used.setdefault(id(font), (font, set()))[1]
+            for text in _show_strings(operands, operator):
+                raw = text.original_bytes if isinstance(text, TextStringObject) else bytes(text)
+                codes.update(int.from_bytes(raw[i:i + 2], 'big') for i in range(0, len(raw) - 1, 2))
+        elif operator == b'Do':
+            xobject = (resources.get('/XObject') or {}).get(operands[0])
+            xobject = xobject.get_object() if xobject is not None else None
+            if xobject is not None and xobject.get('/Subtype') == '/Form' and id(xobject) not in seen:
+                seen.add(id(xobject))
+                _collect_codes(xobject, xobject.get('/Resources') or resources, reader, used, seen)
+
+
+def _embedded_truetype(font: Any) -> Any:
+    """The FontFile2 stream of a Type0 / Identity-H / CIDFontType2 font with identity CID-to-glyph mapping, else None"""
+    if font.get('/Subtype') != '/Type0' or font.get('/Encoding') != '/Identity-H':
+        return None
+    descendant = font['/DescendantFonts'][0].get_object()
+    if descendant.get('/Subtype') != '/CIDFontType2' or descendant.get('/CIDToGIDMap', '/Identity') != '/Identity':
+        return None
+    font_file = descendant['/FontDescriptor'].get_object().get('/FontFile2')
+    return font_file.get_object() if font_file is not None else None
+
+
+def subset_fonts(writer: PdfWriter) -> int:
+    """Cut each embedded CID TrueType font down to the glyphs the written pages draw; returns bytes saved.
+
+    Glyph ids are kept, so the content streams stay valid untouched. The
+    font's timestamps are kept too, so the same pages always subset to the
+    same bytes. Needs fontTools; without it, or for font kinds it does not
+    handle, fonts are left whole.
+    """
+    try:
+        from fontTools.ttLib import TTFont
+        from fontTools import subset
+    except ImportError:
+        return 0
+    used: Dict[int, Tuple[Any, Set[int]]] = {}
+    seen: Set[int] = set()
+    for page in writer.pages:
+        content = page.get_contents()
+        if content is not None:
+            _collect_codes(content, page.get('/Resources'), writer, used, seen)
+
+    saved = 0
+    for font, codes in used.values():
+        try:
+            font_file = _embedded_truetype(font)
+            if font_file is None:
+                continue
+            original = font_file.get_data()
+            truetype = TTFont(io.BytesIO(original), recalcTimestamp=False)
+            created, modified = truetype['head'].created, truetype['head'].modified
+            options = subset.Options()
+            options.retain_gids = True
+            options.notdef_outline = True
+            options.name_IDs = []
+            options.drop_tables += ['GSUB', 'GPOS', 'FFTM']
+            subsetter = subset.Subsetter(options)
+            subsetter.populate(gids=sorted(codes | {0}))
+            subsetter.subset(truetype)
+            truetype['head'].created, truetype['head'].modified = created, modified
+            buffer = io.BytesIO()
+            truetype.save(buffer)
+        except Exception:
+            continue
+        font_file.set_data(buffer.getvalue())
+        font_file[NameObject('/Length1')] = NumberObject(len(buffer.getvalue()))
+        saved += len(original) - len(buffer.getvalue())
+    return saved
+
+
+def build_page_slice(reader: PdfReader, pages: Sequence[int]) -> bytes:
+    """A PDF holding only the given 1-based pages, with unused objects and glyphs pruned"""
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(reader.pages[page - 1])
+    subset_fonts(writer)
+    writer.compress_identical_objects(remove_orphans=True)
+    for page in writer.pages:
+        page.compress_content_streams()
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import io
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from pypdf import PdfReader
+
+
+AMOUNT_PATTERN = re.compile(r'[△▲\-]?\s?\d[\d,]*')
+TRAILING_AMOUNTS_PATTERN = re.compile(r'^(.*?)((?:[\s　]+[△▲\-]?\s?\d[\d,]*)+)\s*$')
+LEADING_NUMBERING_PATTERN = re.compile(r'^[ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩ0-9０-９()（）.．\s　]+')
+LABEL_NOISE_PATTERN = re.compile(r'[\s　・･]')
+INSTITUTION_PATTERN = re.compile(r'^(?:国立大学法人|大学共同利用機関法人|公立大学法人|独立行政法人|学校法人)\S+$')
+FISCAL_YEAR_PATTERN = re.compile(r'(?:令和|平成|昭和)(?:元|\d+)(?:事業)?年度')
+
+
+def normalize_label(label: str) -> str:
+    """Drop leading section numbering, spaces and middle dots so labels compare loosely"""
+    return LABEL_NOISE_PATTERN.sub('', LEADING_NUMBERING_PATTERN.sub('', label))
+
+
+def cover_identity(reader: PdfReader, pages: int = 2) -> Dict[str, str]:
+    """Institution and fiscal year printed on the cover, e.g. 国立大学法人山梨大学 / 平成27事業年度.
+
+    Only the first ``pages`` pages are read; a value that is not found is
+    left out rather than guessed.
+    """
+    identity: Dict[str, str] = {}
+    for page in reader.pages[:pages]:
+        try:
+            text = page.extract_text() or ''
+        except Exception:
+            continue
+        for line in text.splitlines():
+            line = re.sub(r'[\s　]', '', line)
+            if 'institution' not in identity and INSTITUTION_PATTERN.match(line):
+                identity['institution'] = line
+            match = FISCAL_YEAR_PATTERN.search(line)
+            if 'fiscal_year' not in identity and match:
+                identity['fiscal_year'] = match.group(0)
+    return identity
+
+
+class TextLayerIndex:
+    """Row label -> amount lookup built once from a PDF's embedded text layer.
+
+    A row only counts when its label and its amount sit on the same text line.
+    Lookups can be restricted to the pages titled with a given statement name
+    (a line reading e.g. 貸　借　対　照　表). A label resolves only when every
+    matching row carries a single amount and all of those amounts agree.
+    Anything ambiguous is left for the model.
+    """
+
+    def __init__(self, pdf_bytes: bytes):
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        self.rows: Dict[str, List[Tuple[int, List[str]]]] = {}
+        self.titled_pages: Dict[str, Set[int]] = {}
+        for page_number, page in enumerate(reader.pages, start=1):
+            try:
+                text = page.extract_text() or ''
+            except Exception:
+                continue
+            for line in text.splitlines():
+                self.titled_pages.setdefault(normalize_label(line), set()).add(page_number)
+                match = TRAILING_AMOUNTS_PATTERN.match(line.strip())
+                if not match:
+                    continue
+                label = normalize_label(match.group(1))
+                if not label:
+                    continue
+                amounts = [amount.replace(' ', '') for amount in AMOUNT_PATTERN.findall(match.group(2))]
+                self.rows.setdefault(label, []).append((page_number, amounts))
+
+    @property
+    def has_text(self) -> bool:
+        return bool(self.rows)
+
+    def statement_pages(self, title: str) -> Set[int]:
+        """Pages carrying a line that reads exactly ``title``"""
+        return self.titled_pages.get(normalize_label(title), set())
+
+    def find_amount(self, labels: Sequence[str], statement: Optional[str] = None,
+                    pages: Optional[Sequence[int]] = None) -> Optional[str]:
+        """Return the raw amount for the first label that resolves unambiguously, else None"""
+        if statement is not None:
+            pages = self.statement_pages(statement)
+            if not pages:
+                return None
+        for label in labels:
+            rows = self.rows.get(normalize_label(label), [])
+            if pages:
+                rows = [row for row in rows if row[0] in pages]
+            if not rows or any(len(amounts) != 1 for _, amounts in rows):
+                continue
+            values = {amounts[0] for _, amounts in rows}
+            if len(values) == 1:
+                return values.pop()
+        return None
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import time
+import asyncio
+import random
+import hashlib
+import threading
+from google.api_core import exceptions as google_exceptions
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_MAX_RETRIES = 6
+
+RETRYABLE_EXCEPTIONS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded
+)
+RETRYABLE_MESSAGE_PATTERN = re.compile(r'\b429\b|quota|rate limit|resource.?exhausted|too many requests|overloaded', re.I)
+RETRY_AFTER_PATTERNS = [
+    re.compile(r'retry in ([\d.]+)\s*s', re.I),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.I),
+    re.compile(r'retry-after:?\s*([\d.]+)', re.I)
+]
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Quota, rate-limit and transient server errors are worth retrying"""
+    if isinstance(error, RETRYABLE_EXCEPTIONS):
+        return True
+    return bool(RETRYABLE_MESSAGE_PATTERN.search(str(error)))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-provided retry hint carried by an error, if any"""
+    hint = getattr(error, 'retry_after', None)
+    if hint is not None:
+        return float(hint)
+    message = str(error)
+    for pattern in RETRY_AFTER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``requests_per_minute``"""
+
+    def __init__(self, requests_per_minute: float, capacity: Optional[float] = None):
+        if requests_per_minute <= 0:
+            raise ValueError(f"requests_per_minute must be positive, got {requests_per_minute}")
+        self.rate = requests_per_minute / 60.0
+        self.capacity = capacity or max(1.0, requests_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token and return 0, or return how long to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Block until a request may be sent"""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait without blocking the event loop until a request may be sent"""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for ``seconds`` and restart the refill afterwards"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.blocked_until
+
+
+class RateLimiter:
+    """Client-side quota guard shared by every extractor using the same API key.
+
+    Each call waits for a token, and quota or transient errors are retried
+    with jittered exponential backoff. A retry-after hint from the server
+    takes precedence over the computed delay, and the wait applies to the
+    whole bucket so concurrent callers back off together.
+    """
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.bucket = TokenBucket(requests_per_minute)
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        return min(self.max_delay, self.base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+    def call(self, fn: Callable[[], Any],
+             on_retry: Optional[Callable[[int, float, Exception], None]] = None) -> Any:
+        """Run ``fn`` under the rate limit, retrying quota and transient failures"""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                return fn()
+            except Exception as error:
+                if attempt >= self.max_retries or not is_retryable_error(error):
+                    raise
+                delay = self.backoff_delay(attempt, retry_after_seconds(error))
+                self.bucket.pause(delay)
+                attempt += 1
+                if on_retry is not None:
+                    on_retry(attempt, delay, error)
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]],
+                         on_retry: Optional[Callable[[int, float, Exception], None]] = None) -> Any:
+        """Await ``fn()`` under the rate limit, retrying quota and transient failures like call"""
+        attempt = 0
+        while True:
+            await self.bucket.acquire_async()
+            try:
+                return await fn()
+            except Exception as error:
+                if attempt >= self.max_retries or not is_retryable_error(error):
+                    raise
+                delay = self.backoff_delay(attempt, retry_after_seconds(error))
+                self.bucket.pause(delay)
+                attempt += 1
+                if on_retry is not None:
+                    on_retry(attempt, delay, error)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key: Optional[str], requests_per_minute: Optional[float] = None) -> RateLimiter:
+    """Return the process-wide limiter for ``api_key``, creating it on first use.
+
+    The rate defaults to GEMINI_REQUESTS_PER_MINUTE, or 60 when that is unset.
+    """
+    key = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            if requests_per_minute is None:
+                requests_per_minute = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', DEFAULT_REQUESTS_PER_MINUTE))
+            limiter = RateLimiter(requests_per_minute)
+            _limiters[key] = limiter
+        return limiter
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Awaitable, Callable, Hashable, List, Optional, Sequence, Tuple
+from field_registry import VotePolicy
+
+
+def samples_needed(keys: Sequence[Optional[Hashable]], policy: VotePolicy) -> int:
+    """How many more answers to draw in parallel: the fewest that could still reach ``agree`` matching ones.
+
+    0 once some answer has ``agree`` votes or ``samples`` answers are drawn.
+    Answers whose key is None (unparseable) never count as a vote.
+    """
+    counts = Counter(key for key in keys if key is not None)
+    leading = max(counts.values(), default=0)
+    if leading >= policy.agree or len(keys) >= policy.samples:
+        return 0
+    return min(policy.agree - leading, policy.samples - len(keys))
+
+
+def tally(answers: List[Dict[str, Any]], keys: Sequence[Optional[Hashable]],
+          policy: VotePolicy) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """The winning answer (most votes, earliest first on a tie) and the vote record kept with it"""
+    counts = Counter(key for key in keys if key is not None)
+    if not counts:
+        return answers[0], {'samples': len(answers), 'agreeing': 0, 'agreed': False, 'votes': {}}
+    winner, agreeing = max(counts.items(), key=lambda item: (item[1], -keys.index(item[0])))
+    return answers[keys.index(winner)], {
+        'samples': len(answers),
+        'agreeing': agreeing,
+        'agreed': agreeing >= policy.agree,
+        'votes': {str(key): count for key, count in counts.items()}
+    }
+
+
+def vote(draw: Callable[[int], Dict[str, Any]], key: Callable[[Dict[str, Any]], Optional[Hashable]],
+         policy: VotePolicy) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Draw answers in parallel waves until ``policy.agree`` of them share a key or the budget runs out.
+
+    The first wave draws ``agree`` answers at once, so when the model is
+    consistent the vote costs one round trip; each later wave draws only
+    as many as could still complete a majority. ``draw(index)`` returns
+    one answer.
+    """
+    answers: List[Dict[str, Any]] = []
+    keys: List[Optional[Hashable]] = []
+    with ThreadPoolExecutor(max_workers=policy.agree) as executor:
+        while True:
+            count = samples_needed(keys, policy)
+            if not count:
+                break
+            wave = list(executor.map(draw, range(len(answers), len(answers) + count)))
+            answers.extend(wave)
+            keys.extend(key(answer) for answer in wave)
+    return tally(answers, keys, policy)
+
+
+async def vote_async(draw: Callable[[int], Awaitable[Dict[str, Any]]],
+                     key: Callable[[Dict[str, Any]], Optional[Hashable]],
+                     policy: VotePolicy) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """vote with awaitable draws; each wave is gathered on the event loop"""
+    answers: List[Dict[str, Any]] = []
+    keys: List[Optional[Hashable]] = []
+    while True:
+        count = samples_needed(keys, policy)
+        if not count:
+            break
+        wave = await asyncio.gather(*(draw(index) for index in range(len(answers), len(answers) + count)))
+        answers.extend(wave)
+        keys.extend(key(answer) for answer in wave)
+    return tally(answers, keys, policy)
@@ -1,7 +1,8 @@
 import { GoogleGenerativeAI } from '@google/generative-ai';
 import { ChainOfThoughtPrompts } from '../../utils/chainOfThoughtPrompts';
 import { ExtractedFinancialData } from '../../types/financialStatements';
-import { spawn } from 'child_process';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import * as readline from 'readline';
 import * as fs from 'fs';
 import * as path from 'path';
 import { v4 as uuidv4 } from 'uuid';
@@ -411,28 +412,159 @@ export async function analyzeDocument(content: string) {
   }
 }
 
-export async function extractStructuredDataFromPdf(base64Content: string): Promise<ExtractedFinancialData | null> {
-  try {
-    const pythonCheck = spawn('python3', ['-c', 'import google.generativeai; print("OK")'], {
+const PYTHON_WORKER_HEALTH_TIMEOUT_MS = 15000;
+const PYTHON_WORKER_JOB_TIMEOUT_MS = 10 * 60 * 1000;
+
+interface PythonWorkerResponse {
+  id: string;
+  status: 'ok' | 'error';
+  type?: string;
+  result?: any;
+  error?: string;
+  api_key_configured?: boolean;
+}
+
+interface PythonFieldEvent {
+  id: string;
+  event: 'field';
+  field: string;
+  value: number | null;
+  raw: string | null;
+  success: boolean;
+  source: string;
+  latency_ms: number;
+  error?: string;
+}
+
+interface PendingPythonJob {
+  resolve: (response: PythonWorkerResponse) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+  onEvent?: (event: PythonFieldEvent) => void;
+}
+
+/**
+ * data_extractor.py --worker を常駐させ、JSON Lines でジョブを送受信する
+ * （インタプリタ起動と SDK の import をリクエストごとに繰り返さない）
+ */
+class PythonExtractorWorker {
+  private child: ChildProcessWithoutNullStreams | null = null;
+  private pending = new Map<string, PendingPythonJob>();
+
+  private start(): ChildProcessWithoutNullStreams {
+    if (this.child) {
+      return this.child;
+    }
+
+    const child = spawn('python3', ['data_extractor.py', '--worker'], {
       cwd: process.cwd(),
       env: { ...process.env }
     });
-    
-    let checkOutput = '';
-    let checkError = '';
-    pythonCheck.stdout.on('data', (data) => { checkOutput += data.toString(); });
-    pythonCheck.stderr.on('data', (data) => { checkError += data.toString(); });
-    
-    const checkResult = await new Promise((resolve) => {
-      pythonCheck.on('close', (code) => {
-        console.log(`Python dependency check: code=${code}, output="${checkOutput}", error="${checkError}"`);
-        resolve(code === 0 && checkOutput.includes('OK'));
-      });
+
+    readline.createInterface({ input: child.stdout }).on('line', (line) => this.handleLine(line));
+    child.stderr.on('data', (data) => {
+      console.log(`[python-worker] ${data.toString().trimEnd()}`);
     });
-    
-    if (!checkResult) {
+    child.stdin.on('error', (error) => {
+      console.error('Python worker stdin error:', error);
+    });
+    child.on('error', (error) => this.handleExit(child, `failed to start: ${error.message}`));
+    child.on('close', (code) => this.handleExit(child, `exited with code=${code}`));
+
+    this.child = child;
+    return child;
+  }
+
+  private handleExit(child: ChildProcessWithoutNullStreams, reason: string) {
+    if (this.child !== child) {
+      return;
+    }
+    console.error(`Python extractor worker ${reason}`);
+    this.child = null;
+    for (const job of this.pending.values()) {
+      clearTimeout(job.timer);
+      job.reject(new Error(`Python worker ${reason}`));
+    }
+    this.pending.clear();
+  }
+
+  private handleLine(line: string) {
+    let response: PythonWorkerResponse | PythonFieldEvent;
+    try {
+      response = JSON.parse(line);
+    } catch (parseError) {
+      console.warn('Unparseable Python worker output:', line);
+      return;
+    }
+
+    const job = this.pending.get(response.id);
+    if (!job) {
+      return;
+    }
+    if ('event' in response && response.event === 'field') {
+      job.onEvent?.(response);
+      return;
+    }
+    clearTimeout(job.timer);
+    this.pending.delete(response.id);
+    job.resolve(response as PythonWorkerResponse);
+  }
+
+  /**
+   * 子プロセスを切り離して強制終了し、終了を待つ（次の send で新しいワーカーが起動する）
+   */
+  private stop(child: ChildProcessWithoutNullStreams, reason: string): Promise<void> {
+    return new Promise((resolve) => {
+      if (child.exitCode !== null || child.signalCode !== null) {
+        this.handleExit(child, reason);
+        resolve();
+        return;
+      }
+      child.once('close', () => resolve());
+      this.handleExit(child, reason);
+      child.kill('SIGKILL');
+    });
+  }
+
+  send(
+    job: Record<string, any>,
+    timeoutMs: number,
+    onEvent?: (event: PythonFieldEvent) => void
+  ): Promise<PythonWorkerResponse> {
+    const child = this.start();
+    const id = uuidv4();
+
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        // ワーカーはまだこのジョブを処理中なので止めてから reject する
+        // （呼び出し側が一時ファイルを消すのはワーカー終了後になり、以降のリクエストも詰まらない）
+        this.stop(child, `killed after a job timed out after ${timeoutMs}ms`)
+          .then(() => reject(new Error(`Python worker job timed out after ${timeoutMs}ms`)));
+      }, timeoutMs);
+      this.pending.set(id, { resolve, reject, timer, onEvent });
+      child.stdin.write(JSON.stringify({ ...job, id }) + '\n');
+    });
+  }
+
+  async isHealthy(): Promise<boolean> {
+    try {
+      const response = await this.send({ type: 'health' }, PYTHON_WORKER_HEALTH_TIMEOUT_MS);
+      console.log(`Python worker health check: ${JSON.stringify(response)}`);
+      return response.status === 'ok' && response.api_key_configured !== false;
+    } catch (error) {
+      console.error('Python worker health check failed:', error);
+      return false;
+    }
+  }
+}
+
+const pythonExtractorWorker = new PythonExtractorWorker();
+
+export async function extractStructuredDataFromPdf(base64Content: string): Promise<ExtractedFinancialData | null> {
+  try {
+    if (!(await pythonExtractorWorker.isHealthy())) {
       console.error('Python dependencies not available - falling back to UnifiedFinancialExtractor');
-      console.error('Python check error:', checkError);
       return await enhanceWithUnifiedExtractor(base64Content);
     }
 
@@ -447,48 +579,32 @@ export async function extractStructuredDataFromPdf(base64Content: string): Promi
     
     console.log('Running Python data extractor...');
     
-    return new Promise((resolve, reject) => {
-      const pythonProcess = spawn('python3', ['data_extractor.py', tempPdfPath], {
-        cwd: process.cwd(),
-        env: { ...process.env }
-      });
-      
-      let output = '';
-      let errorOutput = '';
-      
-      pythonProcess.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-      
-      pythonProcess.stderr.on('data', (data) => {
-        errorOutput += data.toString();
-      });
-      
-      pythonProcess.on('close', async (code) => {
-        try {
-          fs.unlinkSync(tempPdfPath);
-        } catch (cleanupError) {
-          console.warn('Failed to clean up temp file:', cleanupError);
-        }
-        
-        if (code === 0) {
-          try {
-            const structuredData = JSON.parse(output);
-            console.log('Python extractor success - structured data extracted');
-            resolve(structuredData);
-          } catch (parseError) {
-            console.error('Failed to parse Python extractor output:', parseError);
-            const enhancedData = await enhanceWithUnifiedExtractor(base64Content);
-            resolve(enhancedData);
-          }
-        } else {
-          console.error('Python extractor failed:', errorOutput);
-          console.log('Python extraction failed - attempting UnifiedFinancialExtractor as fallback');
-          const enhancedData = await enhanceWithUnifiedExtractor(base64Content);
-          resolve(enhancedData);
-        }
-      });
-    });
+    let response: PythonWorkerResponse;
+    try {
+      response = await pythonExtractorWorker.send(
+        { type: 'extract', pdf_path: tempPdfPath, format: 'financial_data', stream: true },
+        PYTHON_WORKER_JOB_TIMEOUT_MS,
+        (event) => console.log(`Python extractor field ${event.field}: ${event.value} (${event.source}, ${event.latency_ms}ms)`)
+      );
+    } catch (workerError) {
+      response = { id: '', status: 'error', error: String(workerError) };
+    } finally {
+      try {
+        fs.unlinkSync(tempPdfPath);
+      } catch (cleanupError) {
+        console.warn('Failed to clean up temp file:', cleanupError);
+      }
+    }
+    
+    const failedFields: string[] = response.result?.extraction_metadata?.failed_fields ?? [];
+    if (response.status === 'ok' && failedFields.length === 0) {
+      console.log('Python extractor success - structured data extracted');
+      return response.result;
+    }
+
+    console.error('Python extractor failed:', response.error ?? `fields not extracted: ${failedFields.join(', ')}`);
+    console.log('Python extraction failed - attempting UnifiedFinancialExtractor as fallback');
+    return await enhanceWithUnifiedExtractor(base64Content);
   } catch (error) {
     console.error('Error in extractStructuredDataFromPdf:', error);
     return null;
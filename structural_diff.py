@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# Fields that identify an item in a list of dicts, tried in order
+KEY_FIELDS = ('tableName', 'account', 'segment')
+
+
+@dataclass
+class Difference:
+    """One path where the extracted tree and the ground truth disagree"""
+    path: str
+    kind: str
+    expected: Any = None
+    actual: Any = None
+
+    def __str__(self) -> str:
+        if self.kind == 'missing':
+            return f"{self.path}: Missing in extracted data"
+        if self.kind == 'extra':
+            return f"{self.path}: Extra key in extracted data"
+        if self.kind == 'type':
+            expected, actual = (f"{type(value).__name__}" + ('' if isinstance(value, (dict, list)) else f" {value!r}")
+                                for value in (self.expected, self.actual))
+            return f"{self.path}: Type mismatch - Expected {expected}, Got {actual}"
+        return f"{self.path}: Value mismatch - Expected {self.expected}, Got {self.actual}"
+
+
+def _list_keys(items: List[Any]) -> Optional[List[str]]:
+    """Path step for each item when every item is a dict named by the same KEY_FIELDS field.
+
+    Repeated names get a #2, #3... suffix in order of appearance.
+    """
+    if not all(isinstance(item, dict) for item in items):
+        return None
+    for field in KEY_FIELDS:
+        if all(isinstance(item.get(field), str) for item in items):
+            seen: Dict[str, int] = {}
+            keys = []
+            for item in items:
+                name = item[field]
+                seen[name] = seen.get(name, 0) + 1
+                keys.append(f'{field}={name}' + (f'#{seen[name]}' if seen[name] > 1 else ''))
+            return keys
+    return None
+
+
+def _children(path: str, node: Any, order_sensitive: bool) -> List[Tuple[str, Any]]:
+    """(path, child) for each child of a dict or list node, in order.
+
+    Lists of named dicts (see KEY_FIELDS) are addressed by name, so their
+    order does not matter unless ``order_sensitive`` is set; other lists
+    are addressed by position.
+    """
+    if isinstance(node, dict):
+        return [(f'{path}.{key}' if path else str(key), node[key]) for key in node]
+    keys = None if order_sensitive else _list_keys(node)
+    steps = keys or [str(index) for index in range(len(node))]
+    return [(f'{path}[{step}]', item) for step, item in zip(steps, node)]
+
+
+def _is_container(node: Any) -> bool:
+    return isinstance(node, (dict, list)) and bool(node)
+
+
+def iter_leaves(tree: Any, order_sensitive: bool = False) -> Iterator[Tuple[str, Any]]:
+    """(path, value) for every leaf of ``tree``, depth first without recursion.
+
+    Empty dicts and lists are leaves themselves.
+    """
+    stack: List[Tuple[str, Any]] = [('', tree)]
+    while stack:
+        path, node = stack.pop()
+        if _is_container(node):
+            stack.extend(reversed(_children(path, node, order_sensitive)))
+        else:
+            yield path, node
+
+
+class FlatTree:
+    """A ground-truth tree indexed once by path, for comparing many extractions against it.
+
+    ``nodes`` maps the path of every node, containers included, to the
+    node; ``children`` maps each container path to its child paths.
+    """
+
+    def __init__(self, tree: Any, order_sensitive: bool = False):
+        self.order_sensitive = order_sensitive
+        self.nodes: Dict[str, Any] = {'': tree}
+        self.children: Dict[str, List[str]] = {}
+        stack = [('', tree)]
+        while stack:
+            path, node = stack.pop()
+            if _is_container(node):
+                children = _children(path, node, order_sensitive)
+                self.children[path] = [child_path for child_path, _ in children]
+                self.nodes.update(children)
+                stack.extend(children)
+
+    @property
+    def leaves(self) -> Dict[str, Any]:
+        return {path: node for path, node in self.nodes.items() if path not in self.children}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compare_leaf(path: str, value: Any, target: Any, tolerance: float,
+                  relative_tolerance: float) -> Optional[Difference]:
+    if _is_number(value) and _is_number(target):
+        if abs(value - target) > max(tolerance, relative_tolerance * abs(target)):
+            return Difference(path, 'value', target, value)
+    elif type(value) is not type(target):
+        return Difference(path, 'type', target, value)
+    elif value != target:
+        return Difference(path, 'value', target, value)
+    return None
+
+
+def diff(actual: Any, expected: Union[FlatTree, Any], tolerance: float = 0,
+         relative_tolerance: float = 0.0, fail_fast: bool = False,
+         order_sensitive: bool = False) -> List[Difference]:
+    """Every difference between ``actual`` and ``expected`` in a single pass over ``actual``.
+
+    Each node of ``actual`` is looked up by path in the ground-truth index;
+    a subtree equal to its ground truth is skipped without descending.
+    Numbers compare by value (27947258 equals 27947258.0) and match when
+    they are within ``tolerance`` or ``relative_tolerance`` × |expected|.
+    Other leaves must have the same type and value. A subtree missing from
+    ``actual`` is reported once at its root. With ``fail_fast`` the
+    comparison stops at the first difference. Pass a FlatTree as
+    ``expected`` to index the ground truth only once across documents.
+    """
+    flat = expected if isinstance(expected, FlatTree) else FlatTree(expected, order_sensitive)
+    nodes, children = flat.nodes, flat.children
+    differences: List[Difference] = []
+    stack: List[Tuple[str, Any]] = [('', actual)]
+    while stack:
+        path, node = stack.pop()
+        target = nodes[path]
+        if node == target and type(node) is type(target):
+            continue
+        if isinstance(node, (dict, list)) and type(node) is type(target):
+            present = set()
+            for child_path, child in reversed(_children(path, node, flat.order_sensitive)):
+                if child_path in nodes:
+                    present.add(child_path)
+                    stack.append((child_path, child))
+                else:
+                    differences.append(Difference(child_path, 'extra', actual=child))
+            differences.extend(Difference(child_path, 'missing', expected=nodes[child_path])
+                               for child_path in children.get(path, ()) if child_path not in present)
+        elif isinstance(node, (dict, list)) or isinstance(target, (dict, list)):
+            differences.append(Difference(path, 'type', target, node))
+        else:
+            difference = _compare_leaf(path, node, target, tolerance, relative_tolerance)
+            if difference:
+                differences.append(difference)
+        if fail_fast and differences:
+            return differences[:1]
+    return differences
+
+
+def matches(actual: Any, expected: Union[FlatTree, Any], tolerance: float = 0,
+            relative_tolerance: float = 0.0, order_sensitive: bool = False) -> bool:
+    """True when ``actual`` has no difference from ``expected``; stops at the first difference"""
+    return not diff(actual, expected, tolerance, relative_tolerance, fail_fast=True, order_sensitive=order_sensitive)
+
+
+def format_differences(differences: Sequence[Difference], limit: int = 20) -> List[str]:
+    """Report lines for the first ``limit`` differences"""
+    lines = [f"   {difference}" for difference in differences[:limit]]
+    if len(differences) > limit:
+        lines.append(f"   ... and {len(differences) - limit} more differences")
+    return lines
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import io
+import os
+from contextlib import redirect_stdout
+from accounting_identities import FIELD_IDENTITIES, Identity, reconcile
+from data_extractor import ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS
+from extraction_benchmark import SimulatedGeminiTransport
+from field_registry import FIELD_REGISTRY
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+ASSETS_SPLIT = Identity('assets_split', '資産合計 = 流動資産合計 + 固定資産合計',
+                        'total_assets', ('current_assets', 'fixed_assets'))
+
+
+class _MisreadOnceTransport(SimulatedGeminiTransport):
+    """Simulated backend that gives ``misread`` as the first answer for its field, and the canned one after"""
+
+    def __init__(self, field, misread):
+        super().__init__(latency='fixed:0')
+        self.field_prompt, self.misread = FIELD_REGISTRY[field].prompt, misread
+        self.asked = 0
+
+    def _answer(self, prompt: str) -> str:
+        if prompt.endswith(self.field_prompt):
+            self.asked += 1
+            if self.asked == 1:
+                return self.misread
+        return super()._answer(prompt)
+
+
+def test_identity_allows_rounding_per_term_and_skips_missing_values():
+    assert ASSETS_SPLIT.check({'total_assets': 71892603, 'current_assets': 8838001,
+                               'fixed_assets': 63054601})['status'] == 'pass'
+    assert ASSETS_SPLIT.check({'total_assets': 71892606, 'current_assets': 8838001,
+                               'fixed_assets': 63054601})['status'] == 'fail'
+    assert ASSETS_SPLIT.check({'total_assets': 71892603, 'current_assets': None,
+                               'fixed_assets': 63054601})['status'] == 'skipped'
+
+
+def test_reconcile_picks_the_candidates_that_satisfy_the_identities():
+    values = {'total_assets': 81892603, 'current_assets': 8838001, 'fixed_assets': 63054601,
+              'total_liabilities': 27947258, 'total_equity': 43945344}
+    candidates = {'total_assets': [81892603, 71892603], 'current_assets': [8838001, 18838001]}
+
+    chosen = reconcile(values, candidates, FIELD_IDENTITIES)
+
+    assert chosen == dict(values, total_assets=71892603)
+
+
+def test_reconcile_keeps_the_original_on_a_tie():
+    values = {'total_assets': 100, 'current_assets': 60, 'fixed_assets': 50}
+
+    assert reconcile(values, {'total_assets': [100, 200]}, [ASSETS_SPLIT]) == values
+
+
+def test_only_fields_of_a_failing_identity_are_extracted_again():
+    transport = _MisreadOnceTransport('total_assets', '81,892,603')
+    extractor = ComprehensiveFinancialExtractor(None, transport)
+    methods = {name: method for name, (method, _) in FINANCIAL_DATA_FIELDS.items()}
+    with redirect_stdout(io.StringIO()):
+        results = extractor.extract_many(SAMPLE_PDF, methods)
+        calls = transport.calls
+        results, checks = extractor.check_identities(SAMPLE_PDF, results)
+
+    assert results['total_assets']['numeric_value'] == 71892603
+    assert [check['status'] for check in checks] == ['pass'] * len(FIELD_IDENTITIES)
+    # Both balance-sheet identities fail, so their five fields are asked again; the income statement is not
+    assert transport.calls - calls == 5
+    assert transport.asked == 2
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import asyncio
+import pytest
+from contextlib import redirect_stdout
+from async_extractor import extract_financial_data_async, extract_many_documents
+from data_extractor import extract_financial_data
+from extraction_benchmark import SimulatedGeminiTransport
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+STABLE_METADATA = ('confidence', 'failed_fields', 'fields', 'fields_resolved_by', 'identity_checks', 'votes',
+                   'model_calls', 'bytes_uploaded')
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.delenv('EXTRACTION_CACHE_DIR', raising=False)
+
+
+def _comparable(financial_data):
+    """The extraction output without its timestamps and timings"""
+    metadata = financial_data['extraction_metadata']
+    return {
+        **{key: value for key, value in financial_data.items() if key != 'extraction_metadata'},
+        'extraction_metadata': {key: metadata.get(key) for key in STABLE_METADATA}
+    }
+
+
+@pytest.mark.parametrize('voting', [False, True])
+def test_async_output_matches_the_sync_extractor(voting):
+    sync_transport = SimulatedGeminiTransport(latency='fixed:0')
+    async_transport = SimulatedGeminiTransport(latency='uniform:0:0.01')
+    with redirect_stdout(io.StringIO()):
+        expected = extract_financial_data(SAMPLE_PDF, sync_transport, voting=voting)
+        actual = asyncio.run(extract_financial_data_async(SAMPLE_PDF, async_transport, voting=voting))
+
+    assert _comparable(actual) == _comparable(expected)
+    assert async_transport.calls == sync_transport.calls
+
+
+def test_one_missing_document_does_not_fail_the_others(tmp_path):
+    missing = str(tmp_path / 'missing.pdf')
+    with redirect_stdout(io.StringIO()):
+        results = asyncio.run(extract_many_documents([SAMPLE_PDF, missing],
+                                                     transport=SimulatedGeminiTransport(latency='fixed:0')))
+
+    assert list(results) == [SAMPLE_PDF, missing]
+    assert results[SAMPLE_PDF]['extraction_metadata']['confidence'] == 'high'
+    assert 'not found' in results[missing]['error']
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+from contextlib import redirect_stdout
+from data_extractor import ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS
+from extraction_benchmark import CANNED_ANSWERS, GROUP_KEY_PATTERN, SimulatedGeminiTransport
+from field_registry import apply_sign_rule
+from japanese_numbers import parse_number
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+
+
+class _GroupAnswerTransport(SimulatedGeminiTransport):
+    """Simulated backend whose group call answers ``group_answer``, recording which fields were asked alone"""
+
+    def __init__(self, group_answer):
+        super().__init__(latency='fixed:0')
+        self.group_answer = group_answer
+        self.single_fields = []
+
+    def _answer(self, prompt: str) -> str:
+        keys = GROUP_KEY_PATTERN.findall(prompt)
+        if keys:
+            return self.group_answer(keys)
+        self.single_fields.extend(key for field_prompt, key in self.prompt_fields.items()
+                                  if prompt.endswith(field_prompt))
+        return super()._answer(prompt)
+
+
+def _expected(name):
+    return apply_sign_rule(name, parse_number(CANNED_ANSWERS[name]))
+
+
+def _extract_batch(transport):
+    with redirect_stdout(io.StringIO()):
+        return ComprehensiveFinancialExtractor(None, transport).extract_fields_batch(SAMPLE_PDF)
+
+
+def test_fields_missing_from_the_batch_answer_are_retried_individually():
+    def answer(keys):
+        values = {key: CANNED_ANSWERS[key] for key in keys}
+        values.update(total_assets=None, total_equity='記載なし')
+        return json.dumps(values, ensure_ascii=False)
+
+    transport = _GroupAnswerTransport(answer)
+    results = _extract_batch(transport)
+
+    assert list(results) == list(FINANCIAL_DATA_FIELDS)
+    assert {name: result['numeric_value'] for name, result in results.items()} == {
+        name: _expected(name) for name in FINANCIAL_DATA_FIELDS
+    }
+    assert sorted(transport.single_fields) == ['total_assets', 'total_equity']
+    assert transport.calls == 3
+
+
+def test_unparseable_batch_answer_falls_back_to_every_field():
+    transport = _GroupAnswerTransport(lambda keys: 'Sorry, I cannot read this table.')
+    results = _extract_batch(transport)
+
+    assert all(result['success'] for result in results.values())
+    assert sorted(transport.single_fields) == sorted(FINANCIAL_DATA_FIELDS)
+    assert transport.calls == 1 + len(FINANCIAL_DATA_FIELDS)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import json
+from batch_extractor import completed_documents, find_documents, manifest_identities
+
+
+def test_directory_is_searched_recursively_for_pdfs(tmp_path):
+    (tmp_path / 'b.pdf').write_bytes(b'%PDF')
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'a.PDF').write_bytes(b'%PDF')
+    (tmp_path / 'notes.txt').write_text('not a pdf')
+
+    assert find_documents(str(tmp_path)) == [str(tmp_path / 'b.pdf'), str(tmp_path / 'sub' / 'a.PDF')]
+    assert manifest_identities(str(tmp_path)) == {}
+
+
+def test_manifest_paths_are_relative_to_the_manifest(tmp_path):
+    manifest = tmp_path / 'manifest.jsonl'
+    manifest.write_text('\n'.join([
+        '# 2015 reports',
+        'univA.pdf',
+        '',
+        json.dumps({'pdf_path': 'sub/univB.pdf', 'institution': '国立大学法人B大学', 'fiscal_year': '平成27事業年度'},
+                   ensure_ascii=False)
+    ]), encoding='utf-8')
+
+    assert find_documents(str(manifest)) == [str(tmp_path / 'univA.pdf'), str(tmp_path / 'sub' / 'univB.pdf')]
+    assert manifest_identities(str(manifest)) == {
+        str(tmp_path / 'univA.pdf'): {},
+        str(tmp_path / 'sub' / 'univB.pdf'): {'institution': '国立大学法人B大学', 'fiscal_year': '平成27事業年度'}
+    }
+
+
+def test_resume_skips_only_successful_records(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    output.write_text('\n'.join([
+        json.dumps({'pdf_path': '/x/ok.pdf', 'status': 'ok', 'result': {}}),
+        json.dumps({'pdf_path': '/x/failed.pdf', 'status': 'error', 'error': 'quota'}),
+        '{"pdf_path": "/x/interrupted.pdf", "status": "o'
+    ]), encoding='utf-8')
+
+    assert completed_documents(str(output)) == {'/x/ok.pdf'}
+    assert completed_documents(str(tmp_path / 'missing.jsonl')) == set()
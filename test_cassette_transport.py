@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import pytest
+from contextlib import redirect_stdout
+import gemini_client
+from cassette_transport import CassetteMiss, CassetteTransport
+from data_extractor import ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS
+from high_precision_extractor import HighPrecisionFinancialExtractor
+from extraction_benchmark import SimulatedGeminiTransport
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+
+
+def _planned(transport):
+    extractor = ComprehensiveFinancialExtractor(None, transport)
+    with redirect_stdout(io.StringIO()):
+        return extractor.extract_planned(SAMPLE_PDF, list(FINANCIAL_DATA_FIELDS), 'statement', slice_pages=True)
+
+
+def _complete(transport):
+    with redirect_stdout(io.StringIO()):
+        return HighPrecisionFinancialExtractor(None, transport=transport).extract_complete_financial_data(SAMPLE_PDF)
+
+
+@pytest.mark.parametrize('run', [_planned, _complete])
+def test_strict_replay_answers_sliced_calls_from_the_recording(tmp_path, monkeypatch, run):
+    path = str(tmp_path / 'calls.cassette')
+    inner = SimulatedGeminiTransport(latency='fixed:0')
+    recorded = run(CassetteTransport(path, inner, mode='record'))
+    assert inner.calls > 0
+
+    # A slice written out differently (another pypdf or fontTools version) must still replay
+    build_page_slice = gemini_client.build_page_slice
+    monkeypatch.setattr(gemini_client, 'build_page_slice', lambda reader, pages: build_page_slice(reader, pages) + b'\n%')
+    replay = CassetteTransport(path, mode='replay', strict=True, model_name=inner.model_name)
+
+    assert run(replay) == recorded
+    assert replay.hits == inner.calls
+    assert replay.recorded == 0
+
+
+def test_strict_replay_raises_on_an_unrecorded_call(tmp_path):
+    path = str(tmp_path / 'calls.cassette')
+    replay = CassetteTransport(path, mode='replay', strict=True, model_name='simulated-gemini')
+    session = gemini_client.DocumentSession(SAMPLE_PDF, replay)
+
+    with pytest.raises(CassetteMiss):
+        session.generate('「資産合計」の値を抽出してください', pages=[3])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import pytest
+from contextlib import redirect_stdout
+import extraction_cache
+from extraction_cache import ExtractionCache
+from data_extractor import ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS
+from extraction_benchmark import SimulatedGeminiTransport
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+DOCUMENT = 'a' * 64
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Cache time that only moves when the test advances ``clock.now``"""
+    clock = _Clock()
+    monkeypatch.setattr(extraction_cache.time, 'time', clock)
+    return clock
+
+
+def test_hit_only_for_same_document_prompt_and_model(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    cache.put(DOCUMENT, '資産合計', 'gemini-2.0-flash-exp', {'numeric_value': 71892603})
+
+    assert cache.get(DOCUMENT, '資産合計', 'gemini-2.0-flash-exp') == {'numeric_value': 71892603}
+    assert cache.get(DOCUMENT, '負債合計', 'gemini-2.0-flash-exp') is None
+    assert cache.get(DOCUMENT, '資産合計', 'gemini-1.5-flash-8b') is None
+    assert cache.get('b' * 64, '資産合計', 'gemini-2.0-flash-exp') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 3
+
+
+def test_least_recently_used_entry_is_evicted_past_max_bytes(tmp_path, clock):
+    value = 'x' * 100
+    cache = ExtractionCache(str(tmp_path), max_bytes=250)
+    cache.put(DOCUMENT, 'first', 'model', value)
+    clock.now += 1
+    cache.put(DOCUMENT, 'second', 'model', value)
+    clock.now += 1
+    assert cache.get(DOCUMENT, 'first', 'model') == value
+    clock.now += 1
+
+    cache.put(DOCUMENT, 'third', 'model', value)
+
+    assert cache.get(DOCUMENT, 'second', 'model') is None
+    assert cache.get(DOCUMENT, 'first', 'model') == value
+    assert cache.get(DOCUMENT, 'third', 'model') == value
+    assert cache.stats()['entries'] == 2
+
+
+def test_entry_expires_after_max_age(tmp_path, clock):
+    cache = ExtractionCache(str(tmp_path), max_age_seconds=5)
+    cache.put(DOCUMENT, 'prompt', 'model', 1)
+    assert cache.get(DOCUMENT, 'prompt', 'model') == 1
+
+    clock.now += 6
+
+    assert cache.get(DOCUMENT, 'prompt', 'model') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_second_extraction_is_served_from_the_cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    methods = {name: method for name, (method, _) in FINANCIAL_DATA_FIELDS.items()}
+    first, second = SimulatedGeminiTransport(latency='fixed:0'), SimulatedGeminiTransport(latency='fixed:0')
+    with redirect_stdout(io.StringIO()):
+        expected = ComprehensiveFinancialExtractor(None, first, cache).extract_many(SAMPLE_PDF, methods)
+        cached = ComprehensiveFinancialExtractor(None, second, cache).extract_many(SAMPLE_PDF, methods)
+
+    assert cached == expected
+    assert first.calls == len(methods)
+    assert second.calls == 0
+    assert cache.stats()['hits'] == len(methods)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import dataclasses
+import pytest
+from contextlib import redirect_stdout
+import field_registry
+from data_extractor import FINANCIAL_DATA_FIELDS, extract_financial_data
+from extraction_benchmark import SimulatedGeminiTransport
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+
+
+class _OtherModelTransport(SimulatedGeminiTransport):
+    model_name = 'simulated-gemini-pro'
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.delenv('EXTRACTION_CACHE_DIR', raising=False)
+
+
+def _extract(transport, previous_fields=None):
+    with redirect_stdout(io.StringIO()):
+        return extract_financial_data(SAMPLE_PDF, transport, use_text_layer=False, previous_fields=previous_fields)
+
+
+@pytest.fixture
+def first_run():
+    return _extract(SimulatedGeminiTransport(latency='fixed:0'))
+
+
+def test_unchanged_fields_are_reused_without_model_calls(first_run):
+    transport = SimulatedGeminiTransport(latency='fixed:0')
+    second_run = _extract(transport, first_run['extraction_metadata']['fields'])
+
+    assert transport.calls == 0
+    assert second_run['extraction_metadata']['fields_resolved_by'] == {'previous': len(FINANCIAL_DATA_FIELDS)}
+    assert second_run['statements'] == first_run['statements']
+
+
+def test_editing_a_prompt_only_invalidates_that_field(first_run, monkeypatch):
+    spec = field_registry.FIELD_REGISTRY['total_equity']
+    monkeypatch.setitem(field_registry.FIELD_REGISTRY, 'total_equity',
+                        dataclasses.replace(spec, prompt=spec.prompt + '\n千円単位で回答してください。'))
+    transport = SimulatedGeminiTransport(latency='fixed:0')
+    second_run = _extract(transport, first_run['extraction_metadata']['fields'])
+
+    assert transport.calls == 1
+    assert second_run['extraction_metadata']['fields_resolved_by'] == {'previous': len(FINANCIAL_DATA_FIELDS) - 1,
+                                                                       'model': 1}
+
+
+def test_another_model_invalidates_every_field(first_run):
+    transport = _OtherModelTransport(latency='fixed:0')
+    _extract(transport, first_run['extraction_metadata']['fields'])
+
+    assert transport.calls == len(FINANCIAL_DATA_FIELDS)
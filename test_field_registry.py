@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import pytest
+from contextlib import redirect_stdout
+from field_registry import FIELD_REGISTRY, apply_sign_rule, plan_calls
+from data_extractor import ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS
+from extraction_benchmark import CANNED_ANSWERS, SimulatedGeminiTransport
+from japanese_numbers import parse_number
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+BALANCE_SHEET = ['total_liabilities', 'current_liabilities', 'total_assets', 'current_assets', 'fixed_assets',
+                 'total_equity']
+
+
+def _layout(plan):
+    return [(call.group, call.pages, call.fields) for call in plan]
+
+
+def test_fields_are_grouped_by_statement_in_request_order():
+    plan = plan_calls(['operating_cf', 'total_assets', 'investing_cf', 'total_liabilities', 'borrowing_details'])
+
+    assert _layout(plan) == [
+        ('キャッシュ・フロー計算書', (6,), ['operating_cf', 'investing_cf']),
+        ('貸借対照表', (3, 4), ['total_assets', 'total_liabilities']),
+        ('借入金の明細', (13,), ['borrowing_details'])
+    ]
+
+
+def test_page_grouping_splits_a_statement_across_its_pages():
+    plan = plan_calls(BALANCE_SHEET, group_by='page')
+
+    assert _layout(plan) == [
+        ('page 4', (4,), ['total_liabilities', 'current_liabilities', 'total_equity']),
+        ('page 3', (3,), ['total_assets', 'current_assets', 'fixed_assets'])
+    ]
+
+
+def test_groups_larger_than_the_limit_are_split():
+    plan = plan_calls(BALANCE_SHEET, max_fields_per_call=4)
+
+    assert [call.fields for call in plan] == [BALANCE_SHEET[:4], BALANCE_SHEET[4:]]
+    assert [call.pages for call in plan] == [(3, 4), (3, 4)]
+
+
+def test_single_grouping_keeps_tables_on_their_own():
+    plan = plan_calls(list(FIELD_REGISTRY), group_by='single')
+
+    assert plan[0].group == 'batch'
+    assert plan[0].fields == list(FINANCIAL_DATA_FIELDS)
+    assert [call.fields for call in plan[1:]] == [[key] for key, spec in FIELD_REGISTRY.items() if spec.kind == 'table']
+
+
+def test_unknown_grouping_is_rejected():
+    with pytest.raises(ValueError):
+        plan_calls(BALANCE_SHEET, group_by='section')
+
+
+def test_planned_extraction_makes_one_call_per_planned_group():
+    transport = SimulatedGeminiTransport(latency='fixed:0')
+    extractor = ComprehensiveFinancialExtractor(None, transport)
+    with redirect_stdout(io.StringIO()):
+        plan = extractor.plan_fields(SAMPLE_PDF, list(FINANCIAL_DATA_FIELDS))
+        results = extractor.extract_planned(SAMPLE_PDF, list(FINANCIAL_DATA_FIELDS))
+
+    assert transport.calls == len(plan) == 4
+    assert {name: result['numeric_value'] for name, result in results.items()} == {
+        name: apply_sign_rule(name, parse_number(CANNED_ANSWERS[name])) for name in FINANCIAL_DATA_FIELDS
+    }
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import json
+from financial_store import FinancialStore
+
+
+def _financial_data(total_assets: int, document=None):
+    """Minimal extract_financial_data output, with the extractor's placeholder companyName/fiscalYear"""
+    return {
+        'companyName': '国立大学法人山梨大学',
+        'fiscalYear': '平成27年度',
+        'statements': {'貸借対照表': {'資産の部': {'資産合計': total_assets * 1000}}},
+        'extraction_metadata': {'document': document or {}}
+    }
+
+
+def _write_batch(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def test_batch_documents_keep_their_own_institution(tmp_path):
+    batch = tmp_path / 'batch.jsonl'
+    _write_batch(batch, [
+        {'pdf_path': '/x/univA.pdf', 'institution': '国立大学法人A大学', 'fiscal_year': '平成27事業年度',
+         'status': 'ok', 'result': {'financial_data': _financial_data(100)}},
+        {'pdf_path': '/x/univB.pdf', 'status': 'ok', 'result': {'financial_data': _financial_data(
+            200, {'institution': '国立大学法人B大学', 'fiscal_year': '平成28事業年度'})}}
+    ])
+    store = FinancialStore(str(tmp_path / 'store.sqlite3'))
+
+    assert store.ingest_file(str(batch)) == 2
+    assert store.series('資産合計') == {'国立大学法人A大学': {2015: 100}, '国立大学法人B大学': {2016: 200}}
+
+
+def test_record_without_identity_is_skipped(tmp_path):
+    batch = tmp_path / 'batch.jsonl'
+    _write_batch(batch, [
+        {'pdf_path': '/x/univA.pdf', 'institution': '国立大学法人A大学', 'fiscal_year': 2015,
+         'status': 'ok', 'result': {'financial_data': _financial_data(100)}},
+        {'pdf_path': '/x/univB.pdf', 'status': 'ok', 'result': {'financial_data': _financial_data(200)}}
+    ])
+    store = FinancialStore(str(tmp_path / 'store.sqlite3'))
+
+    assert store.ingest_file(str(batch)) == 1
+    assert store.series('資産合計') == {'国立大学法人A大学': {2015: 100}}
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+import pytest
+from japanese_numbers import parse_number
+
+# Inputs the legacy parser (or an earlier parse_number) got wrong, with the value parse_number must give
+PARSE_EXAMPLES = {
+    '(598,995)': -598995,
+    '▲654,006': -654006,
+    '719億円': 71900000,
+    '27,947,258千円（前年 25,000,000）': 27947258,
+    '第3期 27,947,258千円': 27947258,
+    '平成27年度: △410,984': -410984,
+    '2015年度 12345': 2015,
+    '(19) 開示すべきセグメント情報 △410,984': -410984,
+    '(1) 27,947,258': 27947258,
+    '(19)': 19
+}
+
+
+@pytest.mark.parametrize('text, expected', list(PARSE_EXAMPLES.items()))
+def test_parse_number_examples(text, expected):
+    assert parse_number(text) == expected
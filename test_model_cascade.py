@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import pytest
+from contextlib import redirect_stdout
+from model_cascade import ModelCascade, parse_cascade
+from data_extractor import FINANCIAL_DATA_FIELDS
+from extraction_benchmark import CANNED_ANSWERS, SimulatedGeminiTransport
+from field_registry import apply_sign_rule
+from japanese_numbers import parse_number
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+TEXT_LAYER_FIELDS = ['current_liabilities', 'current_assets', 'fixed_assets', 'hospital_revenue',
+                     'operating_grant_revenue', 'education_costs', 'research_costs']
+
+
+def _transport(model_name, answers=None):
+    transport = SimulatedGeminiTransport(latency='fixed:0', answers=answers)
+    transport.model_name = model_name
+    return transport
+
+
+def _extract(tiers, flash, pro):
+    cascade = ModelCascade(tiers, transports={'sim-flash': flash, 'sim-pro': pro})
+    with redirect_stdout(io.StringIO()):
+        results, checks = cascade.extract(SAMPLE_PDF, list(FINANCIAL_DATA_FIELDS))
+        stats = cascade.stats(SAMPLE_PDF)
+        cascade.close(SAMPLE_PDF)
+    return results, checks, stats
+
+
+def _expected():
+    return {name: apply_sign_rule(name, parse_number(CANNED_ANSWERS[name])) for name in FINANCIAL_DATA_FIELDS}
+
+
+def test_only_unparsed_and_identity_breaking_answers_escalate():
+    flash = _transport('sim-flash', {'ordinary_expenses': '該当なし', 'total_equity': '53,945,344'})
+    pro = _transport('sim-pro')
+    results, checks, stats = _extract(['text_layer', 'sim-flash', 'sim-pro'], flash, pro)
+
+    assert {name: result['numeric_value'] for name, result in results.items()} == _expected()
+    assert {check['status'] for check in checks} == {'pass'}
+    assert sorted((escalation['field'], escalation['reason']) for escalation in stats['escalations']) == [
+        ('ordinary_expenses', 'parse'),
+        ('total_assets', 'identity'),
+        ('total_equity', 'identity'),
+        ('total_liabilities', 'identity')
+    ]
+    assert all(stats['resolved_by'][name] == 'text_layer' for name in TEXT_LAYER_FIELDS)
+    assert stats['resolved_by']['ordinary_expenses'] == stats['resolved_by']['total_equity'] == 'sim-pro'
+    assert flash.calls == len(FINANCIAL_DATA_FIELDS) - len(TEXT_LAYER_FIELDS)
+    assert pro.calls == 4
+    # Both tiers answer from the one upload
+    assert flash.bytes_uploaded + pro.bytes_uploaded == os.path.getsize(SAMPLE_PDF)
+
+
+def test_answer_disagreeing_with_the_text_layer_escalates():
+    flash = _transport('sim-flash', {'current_assets': '9,838,001'})
+    pro = _transport('sim-pro')
+    results, _, stats = _extract(['sim-flash', 'sim-pro'], flash, pro)
+
+    assert results['current_assets']['numeric_value'] == 8838001
+    assert stats['escalations'] == [{'field': 'current_assets', 'from': 'sim-flash', 'to': 'sim-pro',
+                                     'reason': 'text_layer_disagreement'}]
+    assert pro.calls == 1
+
+
+def test_text_layer_can_only_be_the_first_tier():
+    with pytest.raises(ValueError):
+        parse_cascade('sim-flash,text_layer,sim-pro')
+    with pytest.raises(ValueError):
+        parse_cascade('text_layer')
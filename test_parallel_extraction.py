@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import io
+import os
+from contextlib import redirect_stdout
+from data_extractor import ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS
+from extraction_benchmark import CANNED_ANSWERS, SimulatedGeminiTransport
+from field_registry import apply_sign_rule
+from japanese_numbers import parse_number
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+METHODS = {name: method for name, (method, _) in FINANCIAL_DATA_FIELDS.items()}
+
+
+def _extract_many(extractor, methods, max_workers):
+    with redirect_stdout(io.StringIO()):
+        return extractor.extract_many(SAMPLE_PDF, methods, max_workers=max_workers)
+
+
+def test_parallel_results_match_sequential_in_request_order():
+    methods = dict(reversed(list(METHODS.items())))
+    sequential = _extract_many(ComprehensiveFinancialExtractor(None, SimulatedGeminiTransport(latency='fixed:0')),
+                               methods, max_workers=1)
+    # Random per-call latency makes the calls finish out of order
+    transport = SimulatedGeminiTransport(latency='uniform:0:0.02', seed=3)
+    parallel = _extract_many(ComprehensiveFinancialExtractor(None, transport), methods, max_workers=8)
+
+    assert list(parallel) == list(methods)
+    assert parallel == sequential
+    assert transport.calls == len(methods)
+
+
+def test_one_failing_field_does_not_fail_the_others():
+    extractor = ComprehensiveFinancialExtractor(None, SimulatedGeminiTransport(latency='fixed:0'))
+
+    def broken(pdf_path):
+        raise RuntimeError('table not found')
+
+    extractor.extract_total_assets = broken
+    results = _extract_many(extractor, METHODS, max_workers=8)
+
+    assert results['total_assets'] == {'raw_string': None, 'numeric_value': None, 'success': False,
+                                       'error': 'table not found'}
+    assert {name: result['numeric_value'] for name, result in results.items() if name != 'total_assets'} == {
+        name: apply_sign_rule(name, parse_number(CANNED_ANSWERS[name])) for name in METHODS if name != 'total_assets'
+    }
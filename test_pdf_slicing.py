@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+
+import itertools
+import os
+import pytest
+from pypdf import PdfReader
+from pdf_slicing import build_page_slice
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+
+
+def test_page_slice_bytes_are_reproducible(monkeypatch):
+    head = pytest.importorskip('fontTools.ttLib.tables._h_e_a_d')
+    clock = itertools.count(3_800_000_000, 60)
+    monkeypatch.setattr(head, 'timestampNow', lambda: next(clock))
+
+    first = build_page_slice(PdfReader(SAMPLE_PDF), [24])
+    second = build_page_slice(PdfReader(SAMPLE_PDF), [24])
+
+    assert first == second
+    assert len(first) < os.path.getsize(SAMPLE_PDF)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import io
+import os
+from contextlib import redirect_stdout
+from pdf_text_layer import TextLayerIndex
+from data_extractor import ComprehensiveFinancialExtractor, FINANCIAL_DATA_FIELDS
+from extraction_benchmark import SimulatedGeminiTransport
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+
+# Fields the sample report's text layer answers on its own, with their values in 千円
+TEXT_LAYER_FIELDS = {
+    'current_liabilities': 7020870,
+    'current_assets': 8838001,
+    'fixed_assets': 63054601,
+    'hospital_revenue': 17100614,
+    'operating_grant_revenue': 9665735,
+    'education_costs': 1557327,
+    'research_costs': 1569518
+}
+
+
+def _index(rows):
+    """TextLayerIndex over hand-written (label, page, amounts) rows, all on a page titled 貸借対照表"""
+    index = TextLayerIndex.__new__(TextLayerIndex)
+    index.rows = {}
+    for label, page, amounts in rows:
+        index.rows.setdefault(label, []).append((page, amounts))
+    index.titled_pages = {'貸借対照表': {page for _, page, _ in rows}}
+    return index
+
+
+def test_sample_rows_are_found_on_their_statement_pages():
+    with open(SAMPLE_PDF, 'rb') as f:
+        index = TextLayerIndex(f.read())
+
+    assert index.find_amount(['流動資産合計'], statement='貸借対照表') == '8,838,001'
+    assert index.find_amount(['流動資産合計'], statement='キャッシュ・フロー計算書') is None
+
+
+def test_ambiguous_rows_are_left_for_the_model():
+    index = _index([('資産合計', 3, ['71,892,603']), ('資産合計', 4, ['71,892,603']),
+                    ('負債合計', 3, ['27,947,258']), ('負債合計', 4, ['27,000,000']),
+                    ('純資産合計', 3, ['43,945,344', '43,000,000'])])
+
+    assert index.find_amount(['資産合計'], statement='貸借対照表') == '71,892,603'
+    assert index.find_amount(['負債合計'], statement='貸借対照表') is None
+    assert index.find_amount(['純資産合計'], statement='貸借対照表') is None
+    assert index.find_amount(['純資産合計', '資産合計'], statement='貸借対照表') == '71,892,603'
+
+
+def test_text_layer_fields_skip_the_model():
+    transport = SimulatedGeminiTransport(latency='fixed:0')
+    extractor = ComprehensiveFinancialExtractor(None, transport, use_text_layer=True)
+    sources = {}
+    extractor.on_field = lambda name, result, source, latency: sources.setdefault(name, source)
+    methods = {name: method for name, (method, _) in FINANCIAL_DATA_FIELDS.items()}
+    with redirect_stdout(io.StringIO()):
+        results = extractor.extract_many(SAMPLE_PDF, methods)
+
+    assert {name: results[name]['numeric_value'] for name in TEXT_LAYER_FIELDS} == TEXT_LAYER_FIELDS
+    assert {name for name, source in sources.items() if source == 'text_layer'} == set(TEXT_LAYER_FIELDS)
+    assert transport.calls == len(methods) - len(TEXT_LAYER_FIELDS)
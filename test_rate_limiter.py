@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+from rate_limiter import TokenBucket, is_retryable_error
+
+
+@pytest.mark.parametrize('error', [
+    google_exceptions.ResourceExhausted('quota'),
+    google_exceptions.TooManyRequests('slow down'),
+    RuntimeError('HTTP 429 from upstream'),
+    RuntimeError('Resource exhausted for this project')
+])
+def test_quota_errors_are_retryable(error):
+    assert is_retryable_error(error)
+
+
+@pytest.mark.parametrize('message', ['file 14293 is not a PDF', 'page 4290 not found', 'read 1429 bytes'])
+def test_429_inside_other_numbers_is_not_retryable(message):
+    assert not is_retryable_error(ValueError(message))
+
+
+@pytest.mark.parametrize('requests_per_minute', [0, -5])
+def test_token_bucket_rejects_non_positive_rate(requests_per_minute):
+    with pytest.raises(ValueError):
+        TokenBucket(requests_per_minute)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import os
+import asyncio
+from field_registry import VotePolicy
+from self_consistency import samples_needed, vote, vote_async
+from data_extractor import ComprehensiveFinancialExtractor
+from extraction_benchmark import SimulatedGeminiTransport
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'b67155c2806c76359d1b3637d7ff2ac7.pdf')
+POLICY = VotePolicy(samples=5, agree=3)
+
+
+def _scripted(values):
+    """draw(index) answering values[index], recording the indexes drawn"""
+    drawn = []
+
+    def draw(index):
+        drawn.append(index)
+        return {'numeric_value': values[index]}
+
+    return draw, drawn
+
+
+def _key(answer):
+    return answer['numeric_value']
+
+
+def test_consistent_answers_stop_after_one_wave():
+    draw, drawn = _scripted([-410984] * 5)
+    answer, record = vote(draw, _key, POLICY)
+
+    assert answer == {'numeric_value': -410984}
+    assert record == {'samples': 3, 'agreeing': 3, 'agreed': True, 'votes': {'-410984': 3}}
+    assert sorted(drawn) == [0, 1, 2]
+
+
+def test_later_waves_draw_only_what_could_still_agree():
+    draw, drawn = _scripted([-410984, 410984, -410984, -410984, 410984])
+    answer, record = vote(draw, _key, POLICY)
+
+    assert answer == {'numeric_value': -410984}
+    assert record['samples'] == 4
+    assert record['agreed']
+    assert sorted(drawn) == [0, 1, 2, 3]
+
+
+def test_budget_runs_out_without_agreement():
+    draw, _ = _scripted([1, 2, None, 1, 2])
+    answer, record = vote(draw, _key, POLICY)
+
+    assert answer == {'numeric_value': 1}
+    assert record == {'samples': 5, 'agreeing': 2, 'agreed': False, 'votes': {'1': 2, '2': 2}}
+
+
+def test_unparsed_answers_never_count_as_votes():
+    assert samples_needed([None, None, None], POLICY) == 2
+    assert samples_needed([1, 1, 1], POLICY) == 0
+    assert samples_needed([1, 2, 3, 4, 5], POLICY) == 0
+
+
+def test_async_vote_matches_the_threaded_one():
+    values = [-410984, 410984, -410984, -410984, 410984]
+    draw, _ = _scripted(values)
+
+    async def draw_async(index):
+        return {'numeric_value': values[index]}
+
+    assert asyncio.run(vote_async(draw_async, _key, POLICY)) == vote(draw, _key, POLICY)
+
+
+def test_voting_extractor_spends_one_wave_on_a_consistent_model():
+    transport = SimulatedGeminiTransport(latency='fixed:0')
+    result = ComprehensiveFinancialExtractor(None, transport, voting=True).extract_segment_profit_loss(SAMPLE_PDF)
+
+    assert result['numeric_value'] == -410984
+    assert result['votes']['agreed']
+    assert transport.calls == 3
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+from structural_diff import FlatTree, diff, matches
+
+EXPECTED = {
+    'companyName': '国立大学法人山梨大学',
+    'tables': [
+        {'tableName': '貸借対照表', 'rows': [{'account': '資産合計', 'amount': 71892603},
+                                              {'account': '負債合計', 'amount': 27947258}]},
+        {'tableName': '損益計算書', 'rows': [{'account': '経常費用合計', 'amount': 34723539}]}
+    ]
+}
+
+
+def _describe(differences):
+    return [(difference.path, difference.kind) for difference in differences]
+
+
+def test_identical_trees_have_no_differences():
+    assert diff(EXPECTED, EXPECTED) == []
+    assert matches(EXPECTED, FlatTree(EXPECTED))
+
+
+def test_numbers_match_within_tolerance():
+    actual = {**EXPECTED, 'tables': [
+        {'tableName': '貸借対照表', 'rows': [{'account': '資産合計', 'amount': 71892604.0},
+                                              {'account': '負債合計', 'amount': 27947258}]},
+        EXPECTED['tables'][1]
+    ]}
+
+    assert _describe(diff(actual, EXPECTED)) == [('tables[tableName=貸借対照表].rows[account=資産合計].amount', 'value')]
+    assert diff(actual, EXPECTED, tolerance=1) == []
+    assert diff(actual, EXPECTED, relative_tolerance=1e-6) == []
+
+
+def test_named_list_items_are_matched_by_name_not_position():
+    reordered = {**EXPECTED, 'tables': list(reversed(EXPECTED['tables']))}
+
+    assert diff(reordered, EXPECTED) == []
+    assert ('tables[0].tableName', 'value') in _describe(diff(reordered, EXPECTED, order_sensitive=True))
+
+
+def test_missing_extra_and_type_differences():
+    actual = {
+        'companyName': None,
+        'tables': [{'tableName': '貸借対照表', 'rows': [{'account': '資産合計', 'amount': 71892603}]},
+                   {'tableName': '注記', 'rows': []}],
+        'extra': 1
+    }
+
+    assert sorted(_describe(diff(actual, EXPECTED))) == [
+        ('companyName', 'type'),
+        ('extra', 'extra'),
+        ('tables[tableName=損益計算書]', 'missing'),
+        ('tables[tableName=注記]', 'extra'),
+        ('tables[tableName=貸借対照表].rows[account=負債合計]', 'missing')
+    ]
+
+
+def test_fail_fast_stops_at_the_first_difference():
+    actual = {'companyName': '山梨大学', 'tables': []}
+
+    assert len(diff(actual, EXPECTED)) == 3
+    assert len(diff(actual, EXPECTED, fail_fast=True)) == 1
+    assert not matches(actual, EXPECTED)